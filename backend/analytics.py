@@ -0,0 +1,137 @@
+"""
+Usage analytics for Juridik AI
+Set-based time series: one generate_series + GROUP BY date_trunc query per request,
+or precomputed daily_stats rows for UTC daily views
+"""
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+GRANULARITIES = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+    "week": timedelta(weeks=1),
+    "month": timedelta(days=31),
+}
+
+LABEL_FORMATS = {
+    "hour": "%Y-%m-%dT%H:00",
+    "day": "%Y-%m-%d",
+    "week": "%Y-%m-%d",
+    "month": "%Y-%m",
+}
+
+MAX_BUCKETS = 10000
+
+
+class AnalyticsRangeError(ValueError):
+    """Raised for an invalid granularity, timezone or time range"""
+
+
+def resolve_range(
+    days: int,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    granularity: str,
+    tz_name: str,
+    now: Optional[datetime] = None,
+) -> Tuple[datetime, datetime, ZoneInfo]:
+    """
+    Work out the [start, end) window as aware datetimes
+    Without explicit bounds the window is the last `days` days in tz_name,
+    starting at local midnight and ending now
+    """
+    if granularity not in GRANULARITIES:
+        raise AnalyticsRangeError(f"Invalid granularity. Must be one of: {', '.join(GRANULARITIES)}")
+
+    try:
+        tz = ZoneInfo(tz_name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise AnalyticsRangeError(f"Unknown timezone: {tz_name}")
+
+    now = now or datetime.now(timezone.utc)
+
+    if end is None:
+        end = now
+    elif end.tzinfo is None:
+        end = end.replace(tzinfo=tz)
+
+    if start is None:
+        local_end = end.astimezone(tz)
+        first_day = (local_end - timedelta(days=days - 1)).date()
+        start = datetime(first_day.year, first_day.month, first_day.day, tzinfo=tz)
+    elif start.tzinfo is None:
+        start = start.replace(tzinfo=tz)
+
+    if start >= end:
+        raise AnalyticsRangeError("start must be before end")
+
+    if (end - start) / GRANULARITIES[granularity] > MAX_BUCKETS:
+        raise AnalyticsRangeError(f"Range too large for {granularity} granularity")
+
+    return start, end, tz
+
+
+def format_bucket(bucket: datetime, granularity: str) -> str:
+    return bucket.strftime(LABEL_FORMATS[granularity])
+
+
+async def usage_series(
+    db,
+    start: datetime,
+    end: datetime,
+    granularity: str,
+    tz: ZoneInfo,
+) -> Dict[str, List[Dict]]:
+    """Message counts and distinct active users per bucket, gaps filled with zero"""
+    from sqlalchemy import text
+
+    tz_name = str(tz)
+
+    if granularity == "day" and tz_name == "UTC":
+        # Served from the precomputed rollup
+        result = await db.execute(
+            text("""
+                SELECT d.day, COALESCE(ds.messages, 0), COALESCE(ds.active_users, 0)
+                FROM generate_series(CAST(:start_day AS date), CAST(:end_day AS date), INTERVAL '1 day') AS d(day)
+                LEFT JOIN daily_stats ds ON ds.stat_date = d.day::date
+                ORDER BY d.day
+            """),
+            {"start_day": start.astimezone(tz).date(), "end_day": (end - timedelta(microseconds=1)).astimezone(tz).date()}
+        )
+    else:
+        # granularity is whitelisted above, so it is safe to inline
+        result = await db.execute(
+            text(f"""
+                WITH buckets AS (
+                    SELECT generate_series(
+                        date_trunc('{granularity}', CAST(:start AS timestamptz) AT TIME ZONE :tz),
+                        date_trunc('{granularity}', (CAST(:end AS timestamptz) - INTERVAL '1 microsecond') AT TIME ZONE :tz),
+                        INTERVAL '1 {granularity}'
+                    ) AS bucket
+                ),
+                usage AS (
+                    SELECT
+                        date_trunc('{granularity}', m.created_at AT TIME ZONE :tz) AS bucket,
+                        COUNT(*) AS messages,
+                        COUNT(DISTINCT c.user_id) AS active_users
+                    FROM all_messages m
+                    JOIN conversations c ON c.conversation_id = m.conversation_id
+                    WHERE m.created_at >= :start AND m.created_at < :end
+                    GROUP BY 1
+                )
+                SELECT b.bucket, COALESCE(u.messages, 0), COALESCE(u.active_users, 0)
+                FROM buckets b
+                LEFT JOIN usage u ON u.bucket = b.bucket
+                ORDER BY b.bucket
+            """),
+            {"start": start, "end": end, "tz": tz_name}
+        )
+
+    rows = result.all()
+    return {
+        "messages": [{"date": format_bucket(row[0], granularity), "count": row[1]} for row in rows],
+        "activeUsers": [{"date": format_bucket(row[0], granularity), "count": row[2]} for row in rows],
+    }
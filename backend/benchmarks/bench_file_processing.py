@@ -0,0 +1,257 @@
+"""
+File processing benchmarks
+Times FileProcessor's hot paths - PDF and DOCX extraction, chunk_text,
+create_context_for_ai and process_file - on generated documents of 1 to 500
+pages (see documents.py), and measures the peak memory of each call.
+
+Every case is checked against file_processing_baseline.json and fails when it
+is more than BENCH_TIME_TOLERANCE (default 0.5, i.e. 50%) slower or uses more
+than BENCH_MEMORY_TOLERANCE (default 0.25) more peak memory than recorded
+there. Timings depend on the machine - re-record the baseline on the machine
+that runs the check:
+    BENCH_UPDATE_BASELINE=1 python -m pytest benchmarks/bench_file_processing.py
+
+Peak memory is the growth of the process's peak RSS while the call runs, in
+a fresh interpreter (Linux), or the tracemalloc peak elsewhere. Each case runs
+until it has taken BENCH_MIN_SECONDS (default 1) or 50 rounds; the median is
+reported.
+
+Run from the backend directory, as a test:
+    python -m pytest benchmarks/bench_file_processing.py -s
+    BENCH_PAGES=1,10 python -m pytest benchmarks/bench_file_processing.py -k docx
+or for a report without pass/fail:
+    python benchmarks/bench_file_processing.py --pages 1,10,100,500
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple
+
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+sys.path.insert(0, BENCHMARKS_DIR)
+
+from file_processing import FileProcessor
+from lazy_imports import optional_import
+from documents import read_fixture
+
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "file_processing_baseline.json")
+
+PAGES = [int(pages) for pages in os.getenv("BENCH_PAGES", "1,10,100,500").split(",")]
+MIN_SECONDS = float(os.getenv("BENCH_MIN_SECONDS", 1))
+MAX_ROUNDS = 50
+TIME_TOLERANCE = float(os.getenv("BENCH_TIME_TOLERANCE", 0.5))
+MEMORY_TOLERANCE = float(os.getenv("BENCH_MEMORY_TOLERANCE", 0.25))
+# Below these, differences are noise rather than regressions
+TIME_FLOOR_MS = 2.0
+MEMORY_FLOOR_MIB = 4.0
+UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE", "false").lower() in ("1", "true")
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+TXT = "text/plain"
+QUESTION = "Vilken uppsägningstid gäller enligt avtalet?"
+
+
+def _cases() -> Dict[str, Callable[[int], Tuple[Callable, tuple]]]:
+    """case name -> pages -> (function, args); inputs are loaded before timing starts"""
+    def text(pages):
+        return read_fixture("txt", pages).decode()
+
+    return {
+        "extract_text_from_pdf": lambda pages: (FileProcessor.extract_text_from_pdf, (read_fixture("pdf", pages),)),
+        "extract_text_from_docx": lambda pages: (FileProcessor.extract_text_from_docx, (read_fixture("docx", pages),)),
+        "chunk_text": lambda pages: (FileProcessor.chunk_text, (text(pages),)),
+        "create_context_for_ai": lambda pages: (
+            FileProcessor.create_context_for_ai, (FileProcessor.chunk_text(text(pages)), QUESTION)
+        ),
+        "process_file[pdf]": lambda pages: (FileProcessor.process_file, (read_fixture("pdf", pages), PDF, "avtal.pdf")),
+        "process_file[docx]": lambda pages: (
+            FileProcessor.process_file, (read_fixture("docx", pages), DOCX, "avtal.docx")
+        ),
+        "process_file[txt]": lambda pages: (FileProcessor.process_file, (read_fixture("txt", pages), TXT, "avtal.txt")),
+    }
+
+
+CASES = _cases()
+
+
+@dataclass
+class Measurement:
+    median_ms: float
+    min_ms: float
+    rounds: int
+    peak_mib: float
+
+
+def _rss_kib(field: str) -> int:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+    raise RuntimeError(f"{field} not in /proc/self/status")
+
+
+def import_document_libraries():
+    # Imported on first use by FileProcessor - import them up front, so the
+    # first case is not charged for it
+    for name in ("pdfplumber", "PyPDF2", "docx"):
+        optional_import(name)
+
+
+def tracemalloc_only() -> bool:
+    return not os.path.exists("/proc/self/clear_refs")
+
+
+def peak_memory(func: Callable, args: tuple) -> Tuple[float, float]:
+    """Run func once; returns (ms, peak memory growth in MiB)"""
+    gc.collect()
+    if not tracemalloc_only():
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # reset the peak RSS (VmHWM) to the current RSS
+        before = _rss_kib("VmRSS")
+        started = time.perf_counter()
+        func(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return elapsed_ms, (_rss_kib("VmHWM") - before) / 1024
+
+    tracemalloc.start()
+    try:
+        started = time.perf_counter()
+        func(*args)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return elapsed_ms, tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def peak_memory_in_subprocess(case: str, pages: int) -> Tuple[float, float]:
+    """
+    Measure one call in a fresh interpreter, so memory freed by earlier cases
+    and rounds cannot hide how much this one needs
+    """
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--peak-memory", case, str(pages)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+    elapsed_ms, peak_mib = json.loads(result.stdout.strip().splitlines()[-1])
+    return elapsed_ms, peak_mib
+
+
+def measure(case: str, pages: int) -> Measurement:
+    first_ms, peak_mib = peak_memory_in_subprocess(case, pages)
+
+    # Slow cases are timed by the memory run alone; fast ones get more rounds.
+    # tracemalloc slows calls down several times, so those are always re-timed.
+    samples = [] if tracemalloc_only() else [first_ms]
+    func, args = CASES[case](pages)
+    while not samples or (sum(samples) < MIN_SECONDS * 1000 and len(samples) < MAX_ROUNDS):
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+
+    return Measurement(statistics.median(samples), min(samples), len(samples), peak_mib)
+
+
+def load_baseline() -> Dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+def save_baseline_entry(key: str, result: Measurement):
+    baseline = load_baseline()
+    baseline[key] = {"ms": round(result.median_ms, 3), "peakMiB": round(result.peak_mib, 2)}
+    with open(BASELINE_PATH, "w") as f:
+        json.dump(dict(sorted(baseline.items(), key=lambda item: _sort_key(item[0]))), f, indent=2)
+        f.write("\n")
+
+
+def _sort_key(key: str):
+    case, _, pages = key.rpartition("/")
+    return case, int(pages)
+
+
+def format_result(key: str, result: Measurement) -> str:
+    return (f"{key:<32} median {result.median_ms:10.2f}ms  min {result.min_ms:10.2f}ms  "
+            f"rounds {result.rounds:>3}  peak {result.peak_mib:8.2f}MiB")
+
+
+# ----- pytest -----
+
+@pytest.fixture(scope="module", autouse=True)
+def warm_imports():
+    import_document_libraries()
+
+
+@pytest.mark.parametrize("pages", PAGES)
+@pytest.mark.parametrize("case", list(CASES))
+def test_file_processing_benchmark(case: str, pages: int):
+    key = f"{case}/{pages}"
+    result = measure(case, pages)
+    print("\n" + format_result(key, result))
+
+    if UPDATE_BASELINE:
+        save_baseline_entry(key, result)
+        return
+
+    expected = load_baseline().get(key)
+    if expected is None:
+        pytest.skip(f"no baseline for {key} - record one with BENCH_UPDATE_BASELINE=1")
+
+    time_limit = max(expected["ms"] * (1 + TIME_TOLERANCE), expected["ms"] + TIME_FLOOR_MS)
+    memory_limit = max(expected["peakMiB"] * (1 + MEMORY_TOLERANCE), expected["peakMiB"] + MEMORY_FLOOR_MIB)
+    assert result.median_ms <= time_limit, (
+        f"{key} took {result.median_ms:.2f}ms, baseline {expected['ms']:.2f}ms (limit {time_limit:.2f}ms)"
+    )
+    assert result.peak_mib <= memory_limit, (
+        f"{key} peaked at {result.peak_mib:.2f}MiB, baseline {expected['peakMiB']:.2f}MiB "
+        f"(limit {memory_limit:.2f}MiB)"
+    )
+
+
+# ----- report -----
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=",".join(str(pages) for pages in PAGES))
+    parser.add_argument("--case", action="append", choices=list(CASES), help="default: all")
+    parser.add_argument("--peak-memory", nargs=2, metavar=("CASE", "PAGES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.peak_memory:
+        # Child process of peak_memory_in_subprocess()
+        case, pages = args.peak_memory
+        # Warm up on one page - imports only what this case needs, and fills its caches
+        func, call_args = CASES[case](1)
+        func(*call_args)
+        func, call_args = CASES[case](int(pages))
+        print(json.dumps(peak_memory(func, call_args)))
+        return
+
+    import_document_libraries()
+    baseline = load_baseline()
+    for case in args.case or list(CASES):
+        for pages in (int(pages) for pages in args.pages.split(",")):
+            key = f"{case}/{pages}"
+            line = format_result(key, measure(case, pages))
+            if key in baseline:
+                line += f"  (baseline {baseline[key]['ms']:.2f}ms, {baseline[key]['peakMiB']:.2f}MiB)"
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Login latency benchmark
+Compares bcrypt on the event loop against the bounded password hashing pool
+
+Simulates a burst of concurrent logins while a probe task stands in for chat
+requests sharing the same worker, and reports p50/p95/p99 for both.
+
+Run from the backend directory:
+    python benchmarks/bench_login.py --logins 200 --concurrency 50
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from percentiles import percentile
+from security import get_pwd_context, verify_password, password_hasher
+
+
+def summarize(name, samples_ms):
+    print(
+        f"  {name:<14} n={len(samples_ms):<5} "
+        f"p50={percentile(samples_ms, 50, 0.0):8.1f}ms "
+        f"p95={percentile(samples_ms, 95, 0.0):8.1f}ms "
+        f"p99={percentile(samples_ms, 99, 0.0):8.1f}ms "
+        f"mean={statistics.mean(samples_ms) if samples_ms else 0:8.1f}ms"
+    )
+
+
+async def probe_loop(stop: asyncio.Event, samples: list, interval: float = 0.01):
+    """Measures how late a short sleep wakes up - i.e. event loop stall"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append((time.perf_counter() - started - interval) * 1000)
+
+
+async def run_scenario(mode: str, password_hash: str, logins: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    login_samples = []
+    probe_samples = []
+    stop = asyncio.Event()
+
+    async def login():
+        async with semaphore:
+            started = time.perf_counter()
+            if mode == "inline":
+                get_pwd_context().verify("correct horse battery staple", password_hash)
+            else:
+                await verify_password("correct horse battery staple", password_hash)
+            login_samples.append((time.perf_counter() - started) * 1000)
+
+    probe = asyncio.create_task(probe_loop(stop, probe_samples))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+
+    print(f"\n[{mode}] {logins} logins, concurrency {concurrency}, {logins / elapsed:.1f} logins/s")
+    summarize("login", login_samples)
+    summarize("loop stall", probe_samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=25)
+    args = parser.parse_args()
+
+    password_hash = get_pwd_context().hash("correct horse battery staple")
+    print(f"bcrypt hash: {password_hash[:7]}... workers={password_hasher.max_workers}")
+
+    await run_scenario("inline", password_hash, args.logins, args.concurrency)
+    await run_scenario("executor", password_hash, args.logins, args.concurrency)
+    print("\nPassword hasher stats:", password_hasher.get_stats())
+    password_hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
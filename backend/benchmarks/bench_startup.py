@@ -0,0 +1,125 @@
+"""
+Cold start benchmark
+Reports how long importing main.py takes, per module (python -X importtime),
+and how long a fresh uvicorn worker takes to answer its first request - with
+the heavy dependencies imported lazily as the app does now, and imported
+eagerly up front as they used to be
+
+Uses the DATABASE_URL and other settings from the environment / .env, as the
+app itself does; startup runs the usual database checks.
+
+Run from the backend directory:
+    python benchmarks/bench_startup.py --runs 3 --top 15
+"""
+
+import os
+import re
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+# Imports everything lazy_imports would otherwise defer
+EAGER_PRELUDE = "import lazy_imports; lazy_imports.ImportWarmer.import_all(); "
+
+
+def run_importtime(prelude: str = ""):
+    """Import main in a fresh interpreter; returns [(module, self_us, cumulative_us, depth)]"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", prelude + "import main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr[-2000:])
+
+    modules = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append((name, int(self_us), int(cumulative_us), len(indent) // 2))
+    return modules
+
+
+def top_level_totals(modules):
+    """
+    Cumulative import time per package, for what main.py (or the eager
+    prelude) imports directly - nested imports are counted in their parent
+    """
+    totals = {}
+    for name, _, cumulative_us, depth in modules:
+        if (depth == 0 and name != "main") or depth == 1:
+            root = name.split(".")[0]
+            totals[root] = totals.get(root, 0) + cumulative_us
+    return totals
+
+
+def report_importtime(label: str, modules, top: int):
+    total_us = sum(self_us for _, self_us, _, _ in modules)
+    print(f"\n[{label}] import main: {total_us / 1000:.0f}ms, {len(modules)} modules")
+    totals = top_level_totals(modules)
+    for root, us in sorted(totals.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {root:<28} {us / 1000:8.1f}ms")
+    return total_us / 1000
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_first_request(prelude: str, path: str, timeout: float = 60.0) -> float:
+    """Start a uvicorn worker and time it from spawn to the first 200 response, in ms"""
+    port = free_port()
+    code = prelude + f"import uvicorn; uvicorn.run('main:app', host='127.0.0.1', port={port}, log_level='warning')"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", code], cwd=BACKEND_DIR,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - started) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.01)
+        raise RuntimeError(f"no successful response within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--path", default="/", help="request to wait for")
+    args = parser.parse_args()
+
+    results = {}
+    for label, prelude in (("lazy", ""), ("eager", EAGER_PRELUDE)):
+        import_ms = [report_importtime(label, run_importtime(prelude), args.top)]
+        import_ms += [sum(m[1] for m in run_importtime(prelude)) / 1000 for _ in range(args.runs - 1)]
+        first_request_ms = [time_to_first_request(prelude, args.path) for _ in range(args.runs)]
+        results[label] = (statistics.median(import_ms), statistics.median(first_request_ms))
+
+    print(f"\nmedian of {args.runs} runs:")
+    for label, (import_ms, first_request_ms) in results.items():
+        print(f"  {label:<6} import main {import_ms:8.0f}ms   first GET {args.path} {first_request_ms:8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
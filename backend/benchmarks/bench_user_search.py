@@ -0,0 +1,205 @@
+"""
+Admin user search benchmark
+Times the admin panel's user search against a synthetic users table, first with
+only the btree indexes (sequential scans) and then with the pg_trgm GIN and
+prefix indexes from database/migrations/003_user_search_trgm.sql and
+010_user_name_prefix.sql
+
+Works in a throwaway `bench_user_search` schema, so real users are untouched.
+Needs a Postgres with the pg_trgm extension available, unless run with
+--no-trigram: that skips the extension and the trigram indexes and times only
+the cases served by the text_pattern_ops btrees (email prefix, short terms).
+
+Run from the backend directory:
+    python benchmarks/bench_user_search.py --users 1000000 --runs 20
+    python benchmarks/bench_user_search.py --users 1000000 --runs 20 --no-trigram
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import MetaData, Table, Column, String, DateTime, select, desc, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from database import engine
+from percentiles import percentile
+from user_search import user_search
+
+
+SCHEMA = "bench_user_search"
+
+bench_users = Table(
+    "users", MetaData(schema=SCHEMA),
+    Column("user_id", UUID(as_uuid=True), primary_key=True),
+    Column("email", String(255)),
+    Column("first_name", String(100)),
+    Column("last_name", String(100)),
+    Column("created_at", DateTime(timezone=True)),
+)
+
+FIRST_NAMES = ["Anna", "Erik", "Maria", "Lars", "Karin", "Johan", "Eva", "Anders", "Sara", "Mikael",
+               "Elin", "Per", "Emma", "Nils", "Ida", "Oskar", "Linnea", "Gustav", "Maja", "Henrik"]
+LAST_NAMES = ["Andersson", "Johansson", "Karlsson", "Nilsson", "Eriksson", "Larsson", "Olsson", "Persson",
+              "Svensson", "Gustafsson", "Pettersson", "Jonsson", "Lindberg", "Lindqvist", "Bergström",
+              "Holm", "Sandberg", "Forsberg", "Sjöberg", "Wallin"]
+
+# (label, term, mode, needs pg_trgm) - what an admin types into the search box
+CASES = [
+    ("substring", "lindqvist", "contains", True),
+    ("email-substring", "a.sjo", "contains", True),
+    ("email-prefix", "karin.sandberg12", "prefix", False),
+    ("fuzzy", "svenson", "fuzzy", True),
+    ("short-term", "an", "contains", False),
+]
+
+TRIGRAM_INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.users USING gin (email gin_trgm_ops)",
+    f"CREATE INDEX ON {SCHEMA}.users USING gin (first_name gin_trgm_ops)",
+    f"CREATE INDEX ON {SCHEMA}.users USING gin (last_name gin_trgm_ops)",
+]
+
+PREFIX_INDEXES = [
+    f"CREATE INDEX ON {SCHEMA}.users (lower(email) text_pattern_ops)",
+    f"CREATE INDEX ON {SCHEMA}.users (lower(first_name) text_pattern_ops)",
+    f"CREATE INDEX ON {SCHEMA}.users (lower(last_name) text_pattern_ops)",
+]
+
+
+def search_query(term: str, mode: str):
+    """Same query shape as GET /api/admin/users?search=..."""
+    condition, rank = user_search(bench_users.c, term, mode)
+    query = select(bench_users.c.user_id, bench_users.c.email).where(condition)
+    if rank is not None:
+        query = query.order_by(desc(rank))
+    return query.order_by(desc(bench_users.c.created_at), desc(bench_users.c.user_id)).limit(51)
+
+
+async def setup(conn, users: int, trigram: bool):
+    if trigram:
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+    await conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    await conn.execute(text(f"""
+        CREATE TABLE {SCHEMA}.users (
+            user_id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            email VARCHAR(255) UNIQUE NOT NULL,
+            first_name VARCHAR(100),
+            last_name VARCHAR(100),
+            created_at TIMESTAMP WITH TIME ZONE
+        )
+    """))
+    await conn.execute(text(f"CREATE INDEX ON {SCHEMA}.users (email)"))
+    await conn.execute(text(f"CREATE INDEX ON {SCHEMA}.users (created_at)"))
+    await conn.execute(
+        text(f"""
+            INSERT INTO {SCHEMA}.users (email, first_name, last_name, created_at)
+            SELECT
+                lower(translate(f.name || '.' || l.name, 'åäö', 'aao')) || g || '@example.se',
+                f.name, l.name,
+                NOW() - g * INTERVAL '30 seconds'
+            FROM generate_series(1, :users) AS g
+            CROSS JOIN LATERAL (SELECT (CAST(:first_names AS text[]))[1 + (g * 7) % :first_count] AS name) f
+            CROSS JOIN LATERAL (SELECT (CAST(:last_names AS text[]))[1 + (g * 13) % :last_count] AS name) l
+        """),
+        {
+            "users": users,
+            "first_names": FIRST_NAMES, "first_count": len(FIRST_NAMES),
+            "last_names": LAST_NAMES, "last_count": len(LAST_NAMES),
+        }
+    )
+    await conn.execute(text(f"ANALYZE {SCHEMA}.users"))
+
+
+async def measure(conn, runs: int, trigram: bool):
+    results = {}
+    for label, term, mode, needs_trigram in CASES:
+        if needs_trigram and not trigram:
+            continue
+        query = search_query(term, mode)
+        samples = []
+        rows = 0
+        for _ in range(runs):
+            started = time.perf_counter()
+            rows = len((await conn.execute(query)).all())
+            samples.append((time.perf_counter() - started) * 1000)
+        results[label] = (samples, rows, await scan_type(conn, query))
+    return results
+
+
+async def scan_type(conn, query) -> str:
+    """Names the scan nodes the planner picked for the users table"""
+    compiled = query.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True})
+    plan = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")).scalar()
+    nodes = []
+
+    def walk(node):
+        if node.get("Relation Name") == "users" or "Index Name" in node:
+            nodes.append(node["Node Type"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return ", ".join(dict.fromkeys(nodes)) or "-"
+
+
+def report(title: str, results: dict):
+    print(f"\n{title}")
+    for label, (samples, rows, scans) in results.items():
+        print(
+            f"  {label:<16} rows={rows:<3} "
+            f"p50={percentile(samples, 50):9.2f}ms "
+            f"p95={percentile(samples, 95):9.2f}ms "
+            f"mean={statistics.mean(samples):9.2f}ms  [{scans}]"
+        )
+
+
+async def main(users: int, runs: int, keep: bool, trigram: bool):
+    async with engine.begin() as conn:
+        print(f"Creating {users:,} synthetic users in schema {SCHEMA}...")
+        started = time.perf_counter()
+        await setup(conn, users, trigram)
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+
+    async with engine.connect() as conn:
+        before = await measure(conn, runs, trigram)
+        report("Without search indexes", before)
+
+    indexes = (TRIGRAM_INDEXES if trigram else []) + PREFIX_INDEXES
+    async with engine.begin() as conn:
+        print(f"\nBuilding {'trigram and ' if trigram else ''}prefix indexes...")
+        started = time.perf_counter()
+        for statement in indexes:
+            await conn.execute(text(statement))
+        await conn.execute(text(f"ANALYZE {SCHEMA}.users"))
+        print(f"  done in {time.perf_counter() - started:.1f}s")
+
+    async with engine.connect() as conn:
+        after = await measure(conn, runs, trigram)
+        report("With search indexes", after)
+
+    print("\nSpeedup (p50)")
+    for label in after:
+        print(f"  {label:<16} {percentile(before[label][0], 50) / max(percentile(after[label][0], 50), 0.001):8.1f}x")
+
+    if not keep:
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1_000_000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--keep", action="store_true", help="keep the bench schema for manual EXPLAINs")
+    parser.add_argument("--no-trigram", action="store_true",
+                        help="skip pg_trgm and time only the prefix and short-term cases")
+    args = parser.parse_args()
+    asyncio.run(main(args.users, args.runs, args.keep, not args.no_trigram))
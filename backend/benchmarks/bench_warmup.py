@@ -0,0 +1,112 @@
+"""
+Connection warm-up benchmark
+Compares the first requests a fresh worker serves with a cold pool against the
+same requests after db_warmup has opened and prepared the pool's connections
+
+Each request runs what the hot routes start with: the conversation ownership
+check plus a page of message history, or the login lookup by email. The pool
+is disposed before each scenario, so both start from new server connections.
+
+Run from the backend directory:
+    python benchmarks/bench_warmup.py --requests 100 --concurrency 10
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+
+from sqlalchemy import text
+
+from database import engine, AsyncSessionLocal, primary_autocommit_engine, DB_STATEMENT_CACHE_SIZE
+from db_warmup import PoolWarmer, NIL_UUID, WARMUP_EMAIL
+from percentiles import percentile
+from routes.auth import user_by_email
+from routes.conversations import owned_conversation, latest_messages
+
+
+def summarize(name, samples_ms):
+    print(
+        f"  {name:<14} n={len(samples_ms):<5} "
+        f"p50={percentile(samples_ms, 50, 0.0):8.1f}ms "
+        f"p95={percentile(samples_ms, 95, 0.0):8.1f}ms "
+        f"p99={percentile(samples_ms, 99, 0.0):8.1f}ms "
+        f"mean={statistics.mean(samples_ms) if samples_ms else 0:8.1f}ms"
+    )
+
+
+async def pick_conversation():
+    """A real conversation and its owner's email, so the queries return rows"""
+    async with engine.connect() as conn:
+        row = (await conn.execute(text("""
+            SELECT c.conversation_id, c.user_id, u.email FROM conversations c
+            JOIN users u ON u.user_id = c.user_id
+            ORDER BY c.message_count DESC LIMIT 1
+        """))).first()
+    return tuple(row) if row else (NIL_UUID, NIL_UUID, WARMUP_EMAIL)
+
+
+async def run_scenario(mode: str, requests: int, concurrency: int, pool_size: int, target):
+    conversation_id, user_id, email = target
+    await engine.dispose()
+
+    if mode == "warm":
+        started = time.perf_counter()
+        warmed = await PoolWarmer(pool_size).warm(engine)
+        print(f"\n[warm] warmed {warmed} connections in {(time.perf_counter() - started) * 1000:.0f}ms")
+    else:
+        print("\n[cold] pool disposed")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    samples = []
+
+    async def request(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            async with AsyncSessionLocal(bind=primary_autocommit_engine) as session:
+                if i % 4 == 3:
+                    await session.execute(user_by_email(email))
+                else:
+                    await session.execute(owned_conversation(conversation_id, user_id))
+                    await session.execute(latest_messages(conversation_id, 101))
+            samples.append((i, (time.perf_counter() - started) * 1000))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    in_order = [ms for _, ms in sorted(samples)]
+    print(f"[{mode}] {requests} requests, concurrency {concurrency}, {elapsed * 1000:.0f}ms total")
+    summarize("first 10", in_order[:10])
+    summarize(f"first {requests}", in_order)
+    return in_order
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    pool_size = engine.pool.size()
+    print(f"pool_size={pool_size} statement_cache_size={DB_STATEMENT_CACHE_SIZE}")
+
+    target = await pick_conversation()
+    cold = await run_scenario("cold", args.requests, args.concurrency, pool_size, target)
+    warm = await run_scenario("warm", args.requests, args.concurrency, pool_size, target)
+
+    print(
+        f"\nfirst-10 mean: cold {statistics.mean(cold[:10]):.1f}ms, warm {statistics.mean(warm[:10]):.1f}ms; "
+        f"first-{args.requests} mean: cold {statistics.mean(cold):.1f}ms, warm {statistics.mean(warm):.1f}ms"
+    )
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
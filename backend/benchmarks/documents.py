@@ -0,0 +1,151 @@
+"""
+Generated documents for the file processing benchmarks
+Plain text, PDF and DOCX versions of a Swedish lease agreement of any length,
+about 3,500 characters per page. The PDFs are written directly (one
+Helvetica text page per page, no extra dependency); the DOCX files need
+python-docx, as the app does. The same page count gives the same text in
+every format, so timings can be compared across them.
+
+fixture_path() writes them to a cache directory (BENCH_FIXTURES_DIR, by
+default under the system temp directory) to be reused across runs.
+"""
+
+import io
+import os
+import random
+import tempfile
+import textwrap
+from functools import lru_cache
+from typing import List
+
+
+LINES_PER_PAGE = 46
+LINE_WIDTH = 78
+
+SENTENCES = [
+    "Hyresgästen ska betala hyran i förskott senast den sista vardagen före varje kalendermånads början.",
+    "Vid försenad betalning utgår dröjsmålsränta enligt räntelagen (1975:635).",
+    "Hyresvärden får säga upp avtalet om hyran inte betalas i rätt tid.",
+    "Uppsägningstiden är tre kalendermånader räknat från månadsskiftet efter uppsägningen.",
+    "Lägenheten får inte användas för annat ändamål än bostad utan hyresvärdens skriftliga samtycke.",
+    "Andrahandsuthyrning kräver tillstånd enligt 12 kap. 39 § jordabalken.",
+    "Hyresgästen ansvarar för skador som uppkommer genom vårdslöshet eller försummelse.",
+    "Tvist med anledning av detta avtal ska prövas av hyresnämnden eller allmän domstol.",
+    "Parterna är överens om att avtalet har upprättats i två likalydande exemplar.",
+    "Hyran omförhandlas årligen i enlighet med vad som följer av hyreslagen!",
+    "Har hyresgästen rätt till förlängning av avtalet?",
+]
+
+
+@lru_cache(maxsize=None)
+def page_paragraphs(pages: int) -> List[List[str]]:
+    """Paragraphs for each page - §-numbered clauses of a few sentences each"""
+    rng = random.Random(pages)
+    result = []
+    clause = 1
+    for _ in range(pages):
+        paragraphs, lines = [], 0
+        while lines < LINES_PER_PAGE - 4:
+            body = " ".join(rng.choice(SENTENCES) for _ in range(rng.randint(2, 6)))
+            paragraph = f"§ {clause} {body}"
+            paragraphs.append(paragraph)
+            lines += len(textwrap.wrap(paragraph, LINE_WIDTH)) + 1
+            clause += 1
+        result.append(paragraphs)
+    return result
+
+
+def make_text(pages: int) -> str:
+    return "\n\n".join(paragraph for page in page_paragraphs(pages) for paragraph in page)
+
+
+def _pdf_string(line: str) -> bytes:
+    escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode("cp1252") + b")"
+
+
+def _pdf_page_stream(paragraphs: List[str]) -> bytes:
+    lines = []
+    for paragraph in paragraphs:
+        lines.extend(textwrap.wrap(paragraph, LINE_WIDTH))
+        lines.append("")
+    ops = [b"BT /F1 10 Tf 12 TL 56 790 Td"]
+    for line in lines[:LINES_PER_PAGE + 8]:
+        ops.append(_pdf_string(line) + b" Tj T*")
+    ops.append(b"ET")
+    return b"\n".join(ops)
+
+
+@lru_cache(maxsize=None)
+def make_pdf(pages: int) -> bytes:
+    """A text PDF with one page per page of make_text(pages)"""
+    page_count = len(page_paragraphs(pages))
+    # 1 catalog, 2 page tree, 3 font, then a page and its content stream per page
+    page_ids = [4 + 2 * i for i in range(page_count)]
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        2: b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % pid for pid in page_ids)
+           + b"] /Count %d >>" % page_count,
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    }
+    for page_id, paragraphs in zip(page_ids, page_paragraphs(pages)):
+        stream = _pdf_page_stream(paragraphs)
+        objects[page_id] = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % (page_id + 1)
+        )
+        objects[page_id + 1] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = {}
+    for number in sorted(objects):
+        offsets[number] = out.tell()
+        out.write(b"%d 0 obj\n" % number + objects[number] + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for number in sorted(objects):
+        out.write(b"%010d 00000 n \n" % offsets[number])
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+@lru_cache(maxsize=None)
+def make_docx(pages: int) -> bytes:
+    """A DOCX with the paragraphs of make_text(pages) and a page break per page"""
+    import docx
+
+    document = docx.Document()
+    for number, paragraphs in enumerate(page_paragraphs(pages)):
+        if number:
+            document.add_page_break()
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
+
+
+FIXTURES_DIR = os.getenv("BENCH_FIXTURES_DIR", os.path.join(tempfile.gettempdir(), "juridik-bench-fixtures"))
+GENERATORS = {
+    "txt": lambda pages: make_text(pages).encode(),
+    "pdf": make_pdf,
+    "docx": make_docx,
+}
+
+
+def fixture_path(kind: str, pages: int) -> str:
+    """Path of the generated `kind` (txt, pdf or docx) document, written on first use"""
+    path = os.path.join(FIXTURES_DIR, f"avtal-{pages}.{kind}")
+    if not os.path.exists(path):
+        os.makedirs(FIXTURES_DIR, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.tmp"
+        with open(partial, "wb") as f:
+            f.write(GENERATORS[kind](pages))
+        os.replace(partial, path)
+    return path
+
+
+def read_fixture(kind: str, pages: int) -> bytes:
+    with open(fixture_path(kind, pages), "rb") as f:
+        return f.read()
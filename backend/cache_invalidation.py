@@ -0,0 +1,177 @@
+"""
+Cache invalidation across workers for Juridik AI
+The user cache (security.user_cache) and the admin response cache are kept
+per worker. When a route changes what they hold - a user suspended or
+deleted, dashboard figures recomputed - it calls invalidate_user() or
+invalidate_responses(), which clear this worker's copy at once and tell every
+other worker, on every instance, through Postgres NOTIFY.
+
+Each worker LISTENs on its own connection, outside the pool (one more
+connection per worker than DB_MAX_CONNECTIONS hands out). If that connection
+drops, notifications sent meanwhile are lost, so after reconnecting the
+worker clears both caches. Should a notification still be missed, the caches'
+TTLs bound the window: USER_CACHE_TTL_SECONDS for users, the CACHE_POLICIES
+TTLs for responses.
+"""
+
+import os
+import json
+import asyncio
+from typing import Dict, Optional
+
+
+INVALIDATION_CHANNEL = "juridik_cache_invalidation"
+# How often the listening connection is checked, and reopened if it dropped
+INVALIDATION_CHECK_SECONDS = float(os.getenv("INVALIDATION_CHECK_SECONDS", 5))
+
+
+def _apply(message: Dict):
+    from security import user_cache
+    from response_cache import response_cache
+
+    if message.get("users"):
+        for user_id in message["users"]:
+            user_cache.invalidate(user_id)
+    if message.get("responses"):
+        response_cache.invalidate(*message["responses"])
+
+
+async def _publish(message: Dict):
+    from sqlalchemy import text
+    from database import primary_autocommit_engine
+
+    async with primary_autocommit_engine.connect() as conn:
+        await conn.execute(
+            text("SELECT pg_notify(:channel, :payload)"),
+            {"channel": INVALIDATION_CHANNEL, "payload": json.dumps(message)}
+        )
+
+
+class InvalidationListener:
+    """Applies invalidations published by other workers"""
+
+    def __init__(self):
+        self._engine = None
+        self._conn = None
+        self._driver = None  # the asyncpg connection
+        self._task: Optional[asyncio.Task] = None
+        self.connected = False
+        self.received = 0
+        self.published = 0
+        self.publish_errors = 0
+        self.reconnects = 0
+        self.errors = 0
+
+    def on_notify(self, connection, pid, channel, payload):
+        """asyncpg notification callback"""
+        try:
+            _apply(json.loads(payload))
+            self.received += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Bad cache invalidation message {payload!r}: {e}")
+
+    async def publish(self, message: Dict):
+        _apply(message)
+        try:
+            await _publish(message)
+            self.published += 1
+        except Exception as e:
+            # Other workers fall back to the caches' TTLs
+            self.publish_errors += 1
+            print(f"Cache invalidation not published: {e}")
+
+    async def _connect(self):
+        from sqlalchemy.pool import NullPool
+        from sqlalchemy.ext.asyncio import create_async_engine
+        from database import DATABASE_URL
+
+        if self._engine is None:
+            self._engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+        self._conn = await self._engine.connect()
+        raw = await self._conn.get_raw_connection()
+        self._driver = raw.driver_connection
+        await self._driver.add_listener(INVALIDATION_CHANNEL, self.on_notify)
+        self.connected = True
+
+    async def _close(self):
+        self.connected = False
+        self._driver = None
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+    def _is_open(self) -> bool:
+        return self._driver is not None and not self._driver.is_closed()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(INVALIDATION_CHECK_SECONDS)
+            if self._is_open():
+                continue
+            await self._close()
+            try:
+                await self._connect()
+            except Exception as e:
+                self.errors += 1
+                print(f"Cache invalidation listener not connected: {e}")
+                continue
+            # Whatever was published while disconnected is lost
+            self.reconnects += 1
+            _clear_caches()
+
+    async def start(self):
+        try:
+            await self._connect()
+            print("✓ Listening for cache invalidations")
+        except Exception as e:
+            self.errors += 1
+            print(f"✗ Cache invalidation listener not connected: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._close()
+        if self._engine is not None:
+            await self._engine.dispose()
+            self._engine = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "connected": self.connected,
+            "received": self.received,
+            "published": self.published,
+            "publishErrors": self.publish_errors,
+            "reconnects": self.reconnects,
+            "errors": self.errors,
+        }
+
+
+def _clear_caches():
+    from security import user_cache
+    from response_cache import response_cache
+
+    user_cache.clear()
+    response_cache.clear()
+
+
+invalidation_listener = InvalidationListener()
+
+
+async def invalidate_user(user_id, *responses: str):
+    """Drop a user from every worker's user cache, and these cached admin responses"""
+    await invalidation_listener.publish({"users": [str(user_id)], "responses": list(responses)})
+
+
+async def invalidate_responses(*responses: str):
+    """Drop these endpoints' cached admin responses in every worker"""
+    await invalidation_listener.publish({"responses": list(responses)})
@@ -102,7 +102,7 @@ async def create_admin_user():
                 return
             
             # Create new admin user
-            from datetime import datetime
+            from datetime import datetime, timezone
             
             new_user = User(
                 user_id=uuid.uuid4(),
@@ -113,8 +113,8 @@ async def create_admin_user():
                 role='admin',
                 account_status='active',
                 email_verified=True,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
+                created_at=datetime.now(timezone.utc),
+                updated_at=datetime.now(timezone.utc)
             )
             
             session.add(new_user)
@@ -1,11 +1,21 @@
 """
 Database connection module for Anna Legal AI
-Uses async SQLAlchemy with PostgreSQL
+Uses async SQLAlchemy with PostgreSQL, with optional routing of read-only
+traffic to a replica (DATABASE_READ_URL). Write sessions are only committed
+when they actually wrote something, and read sessions run in autocommit.
 """
 
 import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.orm import declarative_base
+from sqlalchemy.orm import declarative_base, Session
+from sqlalchemy.sql.elements import TextClause
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -16,20 +26,120 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
-# Convert postgres:// to postgresql+asyncpg:// if needed (Render uses postgres://)
-if DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
+# Optional read replica for read-only routes
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+
+# A user's reads go to the primary for this long after they write
+DB_READ_STICKY_SECONDS = float(os.getenv("DB_READ_STICKY_SECONDS", 10))
+DB_READ_STICKY_MAX_USERS = int(os.getenv("DB_READ_STICKY_MAX_USERS", 10000))
+# Replica lag above this sends all reads to the primary
+DB_READ_MAX_LAG_SECONDS = float(os.getenv("DB_READ_MAX_LAG_SECONDS", 5))
+DB_READ_LAG_CHECK_SECONDS = float(os.getenv("DB_READ_LAG_CHECK_SECONDS", 5))
+
+# Prepared statements kept per connection (asyncpg). Dynamic IN-lists and
+# admin filters make well over asyncpg's default of 100 distinct statements;
+# set to 0 behind PgBouncer in transaction mode.
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 500))
+
+# Workers on this instance (set by serve.py). When DB_MAX_CONNECTIONS or
+# DB_READ_MAX_CONNECTIONS is set, that many connections are shared between them.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+
+# Count database round-trips per request (X-DB-Round-Trips header and admin metrics)
+DB_DEBUG_METRICS = os.getenv("DB_DEBUG_METRICS", "false").lower() == "true"
+
+
+def normalize_url(url: str) -> str:
+    """Convert postgres:// to postgresql+asyncpg:// if needed (Render uses postgres://)"""
+    if url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    return url
+
+
+DATABASE_URL = normalize_url(DATABASE_URL)
+
+
+def pool_limits(budget: Optional[str], pool_size: str, max_overflow: str):
+    """
+    (pool_size, max_overflow) for this worker - a 1:2 split of its share of
+    the connection budget when one is set, else the per-worker settings
+    """
+    if budget:
+        share = max(1, int(budget) // WEB_CONCURRENCY)
+        size = max(1, share // 3)
+        return size, share - size
+    return int(pool_size), int(max_overflow)
+
+
+POOL_SIZE, MAX_OVERFLOW = pool_limits(
+    os.getenv("DB_MAX_CONNECTIONS"),
+    os.getenv("DB_POOL_SIZE", 10),
+    os.getenv("DB_MAX_OVERFLOW", 20),
+)
+READ_POOL_SIZE, READ_MAX_OVERFLOW = pool_limits(
+    os.getenv("DB_READ_MAX_CONNECTIONS", os.getenv("DB_MAX_CONNECTIONS")),
+    os.getenv("DB_READ_POOL_SIZE", os.getenv("DB_POOL_SIZE", 10)),
+    os.getenv("DB_READ_MAX_OVERFLOW", os.getenv("DB_MAX_OVERFLOW", 20)),
+)
+
+# SQLAlchemy's per-connection cache of prepared statements, and asyncpg's own
+# for statements run directly on the driver connection
+STATEMENT_CACHE_ARGS = {
+    "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+    "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+}
 
 # Create async engine
 engine = create_async_engine(
     DATABASE_URL,
     echo=os.getenv("DB_ECHO", "false").lower() == "true",
-    pool_size=int(os.getenv("DB_POOL_SIZE", 10)),
-    max_overflow=int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    pool_size=POOL_SIZE,
+    max_overflow=MAX_OVERFLOW,
     pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", 30)),
     pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 3600)),
+    connect_args=STATEMENT_CACHE_ARGS,
 )
 
+read_engine = create_async_engine(
+    normalize_url(DATABASE_READ_URL),
+    echo=os.getenv("DB_ECHO", "false").lower() == "true",
+    pool_size=READ_POOL_SIZE,
+    max_overflow=READ_MAX_OVERFLOW,
+    pool_timeout=int(os.getenv("DB_POOL_TIMEOUT", 30)),
+    pool_recycle=int(os.getenv("DB_POOL_RECYCLE", 3600)),
+    connect_args=STATEMENT_CACHE_ARGS,
+) if DATABASE_READ_URL else None
+
+
+# Engines are created at import, but connect lazily. A worker forked after
+# import (gunicorn --preload) must not reuse connections the parent opened.
+def _reset_pools_after_fork():
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not None:
+        read_engine.sync_engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_pools_after_fork)
+
+
+def get_pool_stats() -> Dict:
+    """This worker's share of the connection budget and how much of it is in use"""
+    pools = {"primary": (engine, POOL_SIZE, MAX_OVERFLOW)}
+    if read_engine is not None:
+        pools["replica"] = (read_engine, READ_POOL_SIZE, READ_MAX_OVERFLOW)
+    return {
+        "pid": os.getpid(),
+        "workers": WEB_CONCURRENCY,
+        **{
+            name: {
+                "poolSize": size,
+                "maxOverflow": overflow,
+                "checkedOut": pool_engine.sync_engine.pool.checkedout(),
+            }
+            for name, (pool_engine, size, overflow) in pools.items()
+        },
+    }
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -39,31 +149,346 @@ AsyncSessionLocal = async_sessionmaker(
     autoflush=False,
 )
 
+# Sessions for read-only work - the replica when one is configured
+AsyncReadSessionLocal = async_sessionmaker(
+    read_engine or engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+# Read-only requests run each statement in autocommit, which skips the BEGIN
+# and ROLLBACK round-trips. Exports keep AsyncReadSessionLocal, as their
+# server-side cursors need a transaction.
+primary_autocommit_engine = engine.execution_options(isolation_level="AUTOCOMMIT")
+read_autocommit_engine = (read_engine or engine).execution_options(isolation_level="AUTOCOMMIT")
+
 # Base class for models
 Base = declarative_base()
 
 
-# Dependency for FastAPI
-async def get_db() -> AsyncSession:
+# ============================================
+# UNIT OF WORK
+# ============================================
+
+# Set in session.info while the session's transaction has written something
+HAS_WRITES = "has_writes"
+
+# Raw SQL starting with anything else counts as a write
+READ_ONLY_SQL = ("SELECT", "SHOW", "EXPLAIN")
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_executed_writes(orm_execute_state):
+    statement = orm_execute_state.statement
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[HAS_WRITES] = True
+    elif isinstance(statement, TextClause) and not statement.text.lstrip().upper().startswith(READ_ONLY_SQL):
+        orm_execute_state.session.info[HAS_WRITES] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _track_flushed_writes(session, flush_context):
+    session.info[HAS_WRITES] = True
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _reset_writes(session, transaction):
+    if transaction.parent is None:
+        session.info.pop(HAS_WRITES, None)
+
+
+def has_pending_writes(session) -> bool:
     """
-    Dependency function for FastAPI routes
-    Yields a database session and closes it after use
+    Whether committing the session would change anything: statements that
+    wrote since the last commit or rollback, or objects not flushed yet
+    """
+    return bool(session.info.get(HAS_WRITES) or session.new or session.dirty or session.deleted)
+
+
+# ============================================
+# ROUND-TRIP METRICS
+# ============================================
+
+# The current request's round-trip count, a one-item list shared with the tasks it starts
+_request_round_trips: ContextVar[Optional[List[int]]] = ContextVar("request_round_trips", default=None)
+
+
+class RoundTripStats:
+    """
+    Counts database round-trips per request (DB_DEBUG_METRICS)
+    
+    Every statement is one round-trip, plus the BEGIN asyncpg sends before a
+    transaction's first statement and the COMMIT or ROLLBACK ending it.
+    Autocommit connections send neither. Totals are kept per route, per worker.
+    """
+    
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.routes: Dict[str, Dict] = {}
+    
+    def install(self, sync_engine):
+        """Listen to an engine's statements and transactions"""
+        event.listen(sync_engine, "begin", self._on_begin)
+        event.listen(sync_engine, "before_cursor_execute", self._on_execute)
+        event.listen(sync_engine, "commit", self._on_end)
+        event.listen(sync_engine, "rollback", self._on_end)
+    
+    def start_request(self):
+        """Start counting for the current request; returns the token for finish_request"""
+        return _request_round_trips.set([0])
+    
+    def finish_request(self, token, route: str) -> int:
+        """Stop counting, record the request under its route and return its count"""
+        count = _request_round_trips.get()[0]
+        _request_round_trips.reset(token)
+        
+        stats = self.routes.setdefault(route, {"requests": 0, "roundTrips": 0, "max": 0})
+        stats["requests"] += 1
+        stats["roundTrips"] += count
+        stats["max"] = max(stats["max"], count)
+        return count
+    
+    @staticmethod
+    def _count(n: int):
+        counter = _request_round_trips.get()
+        if counter is not None:
+            counter[0] += n
+    
+    def _on_begin(self, conn):
+        # asyncpg only sends BEGIN along with the first statement
+        if conn.get_execution_options().get("isolation_level") != "AUTOCOMMIT":
+            conn.info["begin_pending"] = True
+    
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if conn.info.pop("begin_pending", False):
+            conn.info["in_transaction"] = True
+            self._count(1)
+        self._count(1)
+    
+    def _on_end(self, conn):
+        conn.info.pop("begin_pending", None)
+        if conn.info.pop("in_transaction", False):
+            self._count(1)
+    
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": self.enabled,
+            "routes": {
+                route: {**stats, "avg": round(stats["roundTrips"] / stats["requests"], 2)}
+                for route, stats in sorted(self.routes.items())
+            },
+        }
+
+
+round_trip_stats = RoundTripStats(DB_DEBUG_METRICS)
+if DB_DEBUG_METRICS:
+    round_trip_stats.install(engine.sync_engine)
+    if read_engine is not None:
+        round_trip_stats.install(read_engine.sync_engine)
+
+
+# ============================================
+# READ / WRITE ROUTING
+# ============================================
+
+class ReadRouter:
+    """
+    Decides whether a read-only request may use the replica
+    
+    Reads go to the primary when no replica is configured, when the replica
+    lags by more than DB_READ_MAX_LAG_SECONDS or cannot be reached, and for
+    DB_READ_STICKY_SECONDS after the same user's last write, so users always
+    see their own changes. Recent writers are tracked per worker; for the
+    other workers and instances, write responses carry the write's time in
+    READ_AFTER_HEADER and clients send it back with their next requests.
+    """
+    
+    def __init__(self, has_replica: bool, sticky_seconds: float, max_users: int, max_lag_seconds: float):
+        self.has_replica = has_replica
+        self.sticky_seconds = sticky_seconds
+        self.max_users = max_users
+        self.max_lag_seconds = max_lag_seconds
+        self._writers: "OrderedDict[str, float]" = OrderedDict()
+        self._task: Optional[asyncio.Task] = None
+        self.replica_lag: Optional[float] = None
+        self.replica_healthy = has_replica
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.lag_fallbacks = 0
+        self.probe_errors = 0
+    
+    def mark_write(self, user_id: Optional[str]):
+        if not self.has_replica or not user_id:
+            return
+        self._writers[user_id] = time.monotonic() + self.sticky_seconds
+        self._writers.move_to_end(user_id)
+        while len(self._writers) > self.max_users:
+            self._writers.popitem(last=False)
+    
+    def wrote_recently(self, read_after: Optional[str]) -> bool:
+        """Whether a READ_AFTER_HEADER value (epoch seconds of a write) is inside the sticky window"""
+        try:
+            written_at = float(read_after)
+        except (TypeError, ValueError):
+            return False
+        now = time.time()
+        # A time in the future is forged or from a skewed clock - it could pin reads to the primary
+        return now - self.sticky_seconds < written_at <= now + 1
+    
+    def use_primary(self, user_id: Optional[str], read_after: Optional[str] = None) -> bool:
+        if not self.has_replica:
+            return True
+        
+        if not self.replica_healthy:
+            self.lag_fallbacks += 1
+            self.primary_reads += 1
+            return True
+        
+        sticky_until = self._writers.get(user_id) if user_id else None
+        if sticky_until is not None:
+            if time.monotonic() < sticky_until:
+                self.sticky_reads += 1
+                self.primary_reads += 1
+                return True
+            del self._writers[user_id]
+        
+        if self.wrote_recently(read_after):
+            self.sticky_reads += 1
+            self.primary_reads += 1
+            return True
+        
+        self.replica_reads += 1
+        return False
+    
+    async def check_replica(self):
+        """Measure replication lag; zero when the replica has replayed everything it received"""
+        from sqlalchemy import text
+        
+        try:
+            async with read_engine.connect() as conn:
+                result = await conn.execute(text("""
+                    SELECT CASE
+                        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+                        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+                    END
+                """))
+                self.replica_lag = float(result.scalar())
+            self.replica_healthy = self.replica_lag <= self.max_lag_seconds
+        except Exception as e:
+            self.probe_errors += 1
+            self.replica_healthy = False
+            print(f"Read replica check failed: {e}")
+    
+    async def _run(self):
+        while True:
+            await asyncio.sleep(DB_READ_LAG_CHECK_SECONDS)
+            await self.check_replica()
+    
+    async def start(self):
+        if not self.has_replica:
+            return
+        await self.check_replica()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    def get_stats(self) -> Dict:
+        return {
+            "replicaConfigured": self.has_replica,
+            "replicaHealthy": self.replica_healthy,
+            "replicaLagSeconds": round(self.replica_lag, 3) if self.replica_lag is not None else None,
+            "replicaReads": self.replica_reads,
+            "primaryReads": self.primary_reads,
+            "stickyReads": self.sticky_reads,
+            "lagFallbacks": self.lag_fallbacks,
+            "probeErrors": self.probe_errors,
+            "stickyUsers": len(self._writers),
+        }
+
+
+# Write responses carry the write's time here; clients echo it on later requests
+READ_AFTER_HEADER = "X-Read-After"
+
+read_router = ReadRouter(read_engine is not None, DB_READ_STICKY_SECONDS, DB_READ_STICKY_MAX_USERS, DB_READ_MAX_LAG_SECONDS)
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def request_user_id(request: Request) -> Optional[str]:
+    """The user a request is authenticated as, if its bearer token is valid"""
+    from jose import JWTError
+    from security import decode_token
+    
+    authorization = request.headers.get("authorization")
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        return decode_token(authorization.replace("Bearer ", "")).get("sub")
+    except JWTError:
+        return None
+
+
+# Dependencies for FastAPI
+async def get_write_db(request: Request) -> AsyncSession:
+    """
+    Dependency function for FastAPI routes that write
+    Yields a primary database session, commits it if anything is left to
+    commit (see has_pending_writes) and closes it after use
     
     Usage in FastAPI:
-        @app.get("/users")
-        async def get_users(db: AsyncSession = Depends(get_db)):
-            result = await db.execute(select(User))
-            return result.scalars().all()
+        @app.post("/users")
+        async def create_user(db: AsyncSession = Depends(get_write_db)):
+            db.add(User(...))
     """
     async with AsyncSessionLocal() as session:
         try:
             yield session
-            await session.commit()
+            if has_pending_writes(session):
+                await session.commit()
         except Exception:
             await session.rollback()
             raise
         finally:
             await session.close()
+    
+    # Keep this user's next reads on the primary until the replica has caught up -
+    # in this worker, and (through READ_AFTER_HEADER) in the others
+    if read_router.has_replica and request.method not in SAFE_METHODS:
+        read_router.mark_write(request_user_id(request))
+        request.state.read_after = time.time()
+
+
+async def get_read_db(request: Request) -> AsyncSession:
+    """
+    Dependency function for read-only FastAPI routes
+    Yields an autocommit session on the replica (or the primary, see ReadRouter)
+    
+    Usage in FastAPI:
+        @app.get("/users")
+        async def get_users(db: AsyncSession = Depends(get_read_db)):
+            result = await db.execute(select(User))
+            return result.scalars().all()
+    """
+    primary = read_router.use_primary(
+        request_user_id(request) if read_router.has_replica else None,
+        request.headers.get(READ_AFTER_HEADER)
+    )
+    async with AsyncSessionLocal(bind=primary_autocommit_engine if primary else read_autocommit_engine) as session:
+        yield session
+
+
+# Routes that read and write
+get_db = get_write_db
 
 
 # Test database connection
@@ -84,4 +509,6 @@ async def test_connection():
 async def close_db():
     """Close database connection pool"""
     await engine.dispose()
+    if read_engine is not None:
+        await read_engine.dispose()
     print("✓ Database connection closed")
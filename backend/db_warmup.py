@@ -0,0 +1,116 @@
+"""
+Connection pool warm-up for Juridik AI
+Opens the pool's connections at startup and prepares the hot statements on each
+one, so a worker's first requests skip connection setup and statement planning
+"""
+
+import os
+import time
+import uuid
+import asyncio
+from typing import Dict, List, Optional
+
+
+# Connections to open per pool - defaults to this worker's pool size, 0 disables warm-up
+DB_WARMUP_CONNECTIONS = os.getenv("DB_WARMUP_CONNECTIONS")
+
+# Placeholder ids and email - the statements run once and match nothing
+NIL_UUID = uuid.UUID(int=0)
+WARMUP_EMAIL = "warmup@invalid"
+
+
+def hot_statements() -> List:
+    """
+    The statements most requests start with, built by the same functions the
+    routes use, so the SQL text matches the prepared statement cache exactly
+    """
+    from routes.auth import user_by_email
+    from routes.conversations import owned_conversation, latest_messages
+
+    return [
+        user_by_email(WARMUP_EMAIL),
+        owned_conversation(NIL_UUID, NIL_UUID),
+        latest_messages(NIL_UUID, 1),
+    ]
+
+
+class PoolWarmer:
+    """Pre-opens pooled connections and prepares the hot statements on them"""
+
+    def __init__(self, connections: Optional[int] = None):
+        self.connections = connections  # None = each pool's size
+        self.connections_opened = 0
+        self.statements_prepared = 0
+        self.errors = 0
+        self.duration_ms: Optional[float] = None
+
+    async def _prepare(self, conn, statements: List):
+        for statement in statements:
+            await conn.execute(statement)
+        # Leave the connection idle, not in a transaction
+        await conn.rollback()
+
+    async def warm(self, engine) -> int:
+        """
+        Check out `connections` connections (default: the pool size) at once,
+        so the pool has to open them all, and prepare the hot statements on
+        each. Returns how many connections were warmed.
+        """
+        connections = self.connections
+        if connections is None:
+            connections = engine.sync_engine.pool.size()
+        if connections <= 0:
+            return 0
+
+        statements = hot_statements()
+        results = await asyncio.gather(
+            *(engine.connect() for _ in range(connections)),
+            return_exceptions=True
+        )
+        conns = [conn for conn in results if not isinstance(conn, BaseException)]
+        self.errors += len(results) - len(conns)
+
+        try:
+            prepared = await asyncio.gather(
+                *(self._prepare(conn, statements) for conn in conns),
+                return_exceptions=True
+            )
+        finally:
+            await asyncio.gather(*(conn.close() for conn in conns), return_exceptions=True)
+
+        warmed = sum(1 for result in prepared if not isinstance(result, BaseException))
+        self.errors += len(prepared) - warmed
+        self.connections_opened += len(conns)
+        self.statements_prepared += warmed * len(statements)
+        return warmed
+
+    async def start(self):
+        """Warm the primary pool and, when configured, the replica pool"""
+        from database import engine, read_engine
+
+        started = time.perf_counter()
+        try:
+            warmed = await self.warm(engine)
+            if read_engine is not None:
+                warmed += await self.warm(read_engine)
+        except Exception as e:
+            self.errors += 1
+            print(f"✗ Database warm-up failed: {e}")
+            return
+        finally:
+            self.duration_ms = (time.perf_counter() - started) * 1000
+
+        if warmed:
+            print(f"✓ Warmed {warmed} database connections in {self.duration_ms:.0f}ms")
+
+    def get_stats(self) -> Dict:
+        return {
+            "connections": self.connections,
+            "connectionsOpened": self.connections_opened,
+            "statementsPrepared": self.statements_prepared,
+            "errors": self.errors,
+            "durationMs": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+        }
+
+
+pool_warmer = PoolWarmer(int(DB_WARMUP_CONNECTIONS) if DB_WARMUP_CONNECTIONS else None)
@@ -0,0 +1,152 @@
+"""
+Shared FastAPI authentication dependencies for Juridik AI
+Used by the auth, conversations and admin routers
+"""
+
+from fastapi import Depends, HTTPException, status, Header, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text
+from jose import JWTError
+import os
+import uuid
+
+from database import get_db
+from security import decode_token, user_cache, CurrentUser
+from token_revocation import revocation_store
+from rate_limiting import user_rate_limiter, ip_rate_limiter, quota_tracker
+
+# Proxies in front of the app that append to X-Forwarded-For (1: Render's
+# load balancer); 0 ignores the header and uses the peer address
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", 1))
+
+
+async def get_bearer_token(authorization: str = Header(None)) -> str:
+    """Extract the raw bearer token from the Authorization header"""
+    if not authorization or not authorization.startswith("Bearer "):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Missing or invalid authorization header"
+        )
+    
+    return authorization.replace("Bearer ", "")
+
+
+async def get_token_payload(token: str = Depends(get_bearer_token)) -> dict:
+    """Verify the bearer token and return its payload"""
+    try:
+        payload = decode_token(token)
+    except JWTError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    
+    if payload.get("sub") is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    
+    if revocation_store.is_revoked(token, payload):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked"
+        )
+    
+    return payload
+
+
+async def get_current_user_id(payload: dict = Depends(get_token_payload)) -> str:
+    """Extract user ID from JWT token"""
+    return payload["sub"]
+
+
+async def get_current_user(
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> CurrentUser:
+    """Load the authenticated user's identity and role, served from cache when fresh"""
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    
+    try:
+        user_uuid = uuid.UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token"
+        )
+    
+    result = await db.execute(
+        text("SELECT user_id, email, role, account_status FROM users WHERE user_id = :user_id"),
+        {"user_id": user_uuid}
+    )
+    row = result.first()
+    
+    if not row:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    user = CurrentUser(user_id=row[0], email=row[1], role=row[2], account_status=row[3])
+    user_cache.put(user)
+    return user
+
+
+async def get_current_admin(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    """Verify user is authenticated and has admin role"""
+    if user.role != "admin":
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    
+    return user
+
+
+def get_client_ip(request: Request) -> str:
+    """
+    Client IP, honouring the proxy header set by Render's load balancer
+
+    Each proxy appends the address it received the request from, so only the
+    last TRUSTED_PROXY_HOPS entries are ours - anything left of them was sent
+    by the client and may be forged
+    """
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if forwarded_for and TRUSTED_PROXY_HOPS > 0:
+        entries = [entry.strip() for entry in forwarded_for.split(",")]
+        return entries[max(0, len(entries) - TRUSTED_PROXY_HOPS)]
+    return request.client.host if request.client else "unknown"
+
+
+async def admit_chat_message(
+    request: Request,
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_db)
+) -> str:
+    """
+    Admission control for AI requests - rate limits and subscription quota
+    Needs only the headers: send_message reads its form, uploads included,
+    after this has admitted the request
+    """
+    retry_after = ip_rate_limiter.acquire(get_client_ip(request))
+    if not retry_after:
+        retry_after = user_rate_limiter.acquire(user_id)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(max(1, int(retry_after + 0.999)))}
+        )
+    
+    allowed, quota = await quota_tracker.try_consume(db, user_id)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Query limit reached for your subscription",
+            headers={"X-Quota-Limit": str(quota.query_limit), "X-Quota-Remaining": "0"}
+        )
+    
+    return user_id
@@ -2,8 +2,6 @@
 Email service for sending emails via SendGrid
 """
 import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY", "")
 FROM_EMAIL = os.getenv("FROM_EMAIL", "noreply@juridikai.com")
@@ -28,6 +26,10 @@ def send_password_reset_email(to_email: str, reset_token: str) -> bool:
         return False
     
     try:
+        # Imported here - only password resets need the SendGrid client
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail, Email, To
+        
         reset_link = f"{FRONTEND_URL}/reset-password?token={reset_token}"
         
         message = Mail(
@@ -0,0 +1,212 @@
+"""
+Streaming admin data exports for Juridik AI
+Rows are read in keyset-ordered chunks, each through a server-side cursor in its
+own short transaction, and written out as CSV or NDJSON as they arrive - memory
+stays constant and no snapshot is held for the length of the export
+"""
+
+import os
+import io
+import csv
+import json
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Optional, Tuple
+
+
+EXPORT_CHUNK_ROWS = int(os.getenv("EXPORT_CHUNK_ROWS", 10000))
+EXPORT_FETCH_ROWS = int(os.getenv("EXPORT_FETCH_ROWS", 1000))
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+}
+
+
+@dataclass(frozen=True)
+class ExportDataset:
+    """A table export: output columns, the SELECT list producing them, and the keyset key"""
+    columns: Tuple[str, ...]
+    select: str
+    source: str
+    time_column: str
+    id_column: str
+
+
+EXPORT_DATASETS = {
+    "users": ExportDataset(
+        columns=("userId", "email", "firstName", "lastName", "phone", "role",
+                 "accountStatus", "emailVerified", "createdAt", "lastLoginAt"),
+        select="user_id, email, first_name, last_name, phone, role, account_status, email_verified, created_at, last_login_at",
+        source="users",
+        time_column="created_at",
+        id_column="user_id",
+    ),
+    "subscriptions": ExportDataset(
+        columns=("subscriptionId", "userId", "stripeCustomerId", "stripeSubscriptionId", "planType", "status",
+                 "currentPeriodStart", "currentPeriodEnd", "queryLimit", "queriesUsed", "createdAt"),
+        select="subscription_id, user_id, stripe_customer_id, stripe_subscription_id, plan_type, status, "
+               "current_period_start, current_period_end, query_limit, queries_used, created_at",
+        source="subscriptions",
+        time_column="created_at",
+        id_column="subscription_id",
+    ),
+    "payments": ExportDataset(
+        columns=("paymentId", "userId", "subscriptionId", "stripePaymentIntentId", "amount", "currency",
+                 "status", "paymentMethod", "createdAt"),
+        select="payment_id, user_id, subscription_id, stripe_payment_intent_id, amount, currency, "
+               "status, payment_method, created_at",
+        source="payment_history",
+        time_column="created_at",
+        id_column="payment_id",
+    ),
+    "conversations": ExportDataset(
+        columns=("conversationId", "userId", "title", "status", "messageCount", "createdAt", "lastMessageAt"),
+        select="conversation_id, user_id, title, status, message_count, created_at, last_message_at",
+        source="conversations",
+        time_column="created_at",
+        id_column="conversation_id",
+    ),
+    "messages": ExportDataset(
+        columns=("messageId", "conversationId", "role", "content", "sources", "tokensUsed", "createdAt",
+                 "model", "modelRoute", "promptTokens", "completionTokens", "costUsd", "responseTime"),
+        select="message_id, conversation_id, role, content, sources, tokens_used, created_at, "
+               "model, model_route, prompt_tokens, completion_tokens, cost_usd, response_time",
+        source="all_messages",
+        time_column="created_at",
+        id_column="message_id",
+    ),
+    "logs": ExportDataset(
+        columns=("logId", "adminId", "action", "targetType", "targetId", "details", "createdAt"),
+        select="log_id, admin_id, action, target_type, target_id, details, created_at",
+        source="admin_logs",
+        time_column="created_at",
+        id_column="log_id",
+    ),
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown dataset or format"""
+
+
+def resolve_export(dataset: str, fmt: str) -> Tuple[ExportDataset, str, str]:
+    """Returns (dataset, media type, file extension)"""
+    if dataset not in EXPORT_DATASETS:
+        raise ExportError(f"Unknown dataset. Must be one of: {', '.join(EXPORT_DATASETS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}")
+    media_type, extension = EXPORT_FORMATS[fmt]
+    return EXPORT_DATASETS[dataset], media_type, extension
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return _json_value(value)
+
+
+def format_rows(spec: ExportDataset, fmt: str, rows) -> str:
+    """Serialize a batch of rows"""
+    buffer = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow([_csv_value(value) for value in row])
+    else:
+        for row in rows:
+            record = {name: _json_value(value) for name, value in zip(spec.columns, row)}
+            buffer.write(json.dumps(record, ensure_ascii=False, default=str))
+            buffer.write("\n")
+    return buffer.getvalue()
+
+
+def format_header(spec: ExportDataset, fmt: str) -> str:
+    if fmt != "csv":
+        return ""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(spec.columns)
+    return buffer.getvalue()
+
+
+def chunk_query(spec: ExportDataset, after: bool, start: bool, end: bool) -> str:
+    """Keyset query for one chunk, oldest first"""
+    conditions = [f"{spec.time_column} IS NOT NULL"]
+    if after:
+        conditions.append(f"({spec.time_column}, {spec.id_column}) > (:after_time, :after_id)")
+    if start:
+        conditions.append(f"{spec.time_column} >= :start")
+    if end:
+        conditions.append(f"{spec.time_column} < :end")
+    return (
+        f"SELECT {spec.select} FROM {spec.source} "
+        f"WHERE {' AND '.join(conditions)} "
+        f"ORDER BY {spec.time_column}, {spec.id_column} "
+        f"LIMIT :chunk_rows"
+    )
+
+
+async def stream_export(
+    dataset: str,
+    fmt: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    chunk_rows: int = EXPORT_CHUNK_ROWS,
+    fetch_rows: int = EXPORT_FETCH_ROWS,
+) -> AsyncIterator[str]:
+    """
+    Yield the export as text blocks of at most fetch_rows rows
+    Opens its own sessions: the response body is sent after the request's
+    get_db session has already been closed
+    """
+    from sqlalchemy import text
+    from database import AsyncReadSessionLocal
+
+    spec, _, _ = resolve_export(dataset, fmt)
+    time_index = spec.columns.index("createdAt")
+    id_index = 0
+
+    header = format_header(spec, fmt)
+    if header:
+        yield header
+
+    after = None
+    while True:
+        params = {"chunk_rows": chunk_rows}
+        if after:
+            params["after_time"], params["after_id"] = after
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+
+        fetched = 0
+        last_row = None
+        async with AsyncReadSessionLocal() as session:
+            result = await session.stream(
+                text(chunk_query(spec, after is not None, start is not None, end is not None)),
+                params,
+                execution_options={"yield_per": fetch_rows},
+            )
+            async for rows in result.partitions():
+                fetched += len(rows)
+                last_row = rows[-1]
+                yield format_rows(spec, fmt, rows)
+
+        if fetched < chunk_rows:
+            break
+        after = (last_row[time_index], last_row[id_index])
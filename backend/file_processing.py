@@ -10,18 +10,53 @@ from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 import base64
 
-# Document processing imports
-try:
-    import PyPDF2
-    from pdfplumber import open as pdf_open
-except ImportError:
-    PyPDF2 = None
-    pdf_open = None
+# Document processing libraries (pdfplumber, PyPDF2, python-docx) are imported on first use
+from lazy_imports import optional_import
 
-try:
-    from docx import Document
-except ImportError:
-    Document = None
+
+class FileTooLargeError(ValueError):
+    """Raised when an upload exceeds the size limit before it is fully read"""
+
+
+class UploadSizeLimit:
+    """
+    ASGI middleware refusing message uploads over FileProcessor.max_request_size()
+    A declared Content-Length is checked before anything is read; chunked
+    bodies, which declare none, are counted as they arrive and cut off with a
+    413 as soon as they pass the limit
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].endswith("/messages"):
+            await self.app(scope, receive, send)
+            return
+        
+        from starlette.exceptions import HTTPException
+        from starlette.responses import JSONResponse
+        
+        limit = FileProcessor.max_request_size()
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > limit:
+            response = JSONResponse(status_code=413, content={"detail": "Upload too large"})
+            await response(scope, receive, send)
+            return
+        
+        received = 0
+        
+        async def counted_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised inside form parsing; FastAPI passes HTTPExceptions through
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+        
+        await self.app(scope, counted_receive, send)
 
 
 class FileProcessor:
@@ -35,9 +70,101 @@ class FileProcessor:
     }
     
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    MAX_FILES_PER_MESSAGE = 5
     MAX_TEXT_LENGTH = 50000  # ~50k characters max
     CHUNK_SIZE = 4000  # Characters per chunk for large documents
     
+    # Leading bytes that identify the binary formats we accept
+    MAGIC_SIGNATURES = {
+        'pdf': b'%PDF-',
+        'docx': b'PK\x03\x04',  # DOCX is a ZIP container
+    }
+    SNIFF_SIZE = 8 * 1024  # Bytes inspected for magic numbers
+    READ_CHUNK_SIZE = 64 * 1024  # Bytes read per upload chunk
+    
+    @staticmethod
+    def max_request_size() -> int:
+        """Largest multipart body a message upload may send"""
+        # Allow 1MB on top of the files for form fields and multipart framing
+        return FileProcessor.MAX_FILES_PER_MESSAGE * FileProcessor.MAX_FILE_SIZE + 1024 * 1024
+    
+    @staticmethod
+    def prevalidate_file(content_type: str, filename: str, declared_size: Optional[int] = None) -> Tuple[bool, str]:
+        """
+        Validate upload metadata before any of the body is read
+        Returns: (is_valid, error_message)
+        """
+        if declared_size is not None and declared_size > FileProcessor.MAX_FILE_SIZE:
+            return False, f"File too large. Maximum size is {FileProcessor.MAX_FILE_SIZE / (1024*1024)}MB"
+        
+        if content_type not in FileProcessor.SUPPORTED_TYPES:
+            return False, f"Unsupported file type. Supported: PDF, DOCX, TXT"
+        
+        if not filename or len(filename) > 255:
+            return False, "Invalid filename"
+        
+        return True, ""
+    
+    @staticmethod
+    def sniff_file_type(head: bytes, content_type: str) -> Tuple[bool, str]:
+        """
+        Check the first bytes of a file against its declared content type
+        Returns: (is_valid, error_message)
+        """
+        file_type = FileProcessor.SUPPORTED_TYPES.get(content_type)
+        
+        if file_type == 'pdf':
+            # The PDF spec allows junk before the header within the first 1KB
+            if FileProcessor.MAGIC_SIGNATURES['pdf'] not in head[:1024]:
+                return False, "File content does not match PDF format"
+        elif file_type == 'docx':
+            if not head.startswith(FileProcessor.MAGIC_SIGNATURES['docx']):
+                return False, "File content does not match DOCX format"
+        elif file_type == 'txt':
+            if b'\x00' in head:
+                return False, "File content does not look like plain text"
+        else:
+            return False, f"Unsupported file type. Supported: PDF, DOCX, TXT"
+        
+        return True, ""
+    
+    @staticmethod
+    async def read_upload(upload) -> bytes:
+        """
+        Read an UploadFile in chunks, rejecting it as early as possible
+        
+        Metadata and declared size are checked before reading, magic bytes
+        after the first chunk, and the stream is abandoned as soon as it
+        grows past MAX_FILE_SIZE.
+        Raises FileTooLargeError or ValueError on rejection.
+        """
+        declared_size = getattr(upload, "size", None)
+        is_valid, error = FileProcessor.prevalidate_file(upload.content_type, upload.filename, declared_size)
+        if not is_valid:
+            if declared_size is not None and declared_size > FileProcessor.MAX_FILE_SIZE:
+                raise FileTooLargeError(error)
+            raise ValueError(error)
+        
+        head = await upload.read(FileProcessor.SNIFF_SIZE)
+        is_valid, error = FileProcessor.sniff_file_type(head, upload.content_type)
+        if not is_valid:
+            raise ValueError(error)
+        
+        parts = [head]
+        total = len(head)
+        while True:
+            chunk = await upload.read(FileProcessor.READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            total += len(chunk)
+            if total > FileProcessor.MAX_FILE_SIZE:
+                raise FileTooLargeError(
+                    f"File too large. Maximum size is {FileProcessor.MAX_FILE_SIZE / (1024*1024)}MB"
+                )
+            parts.append(chunk)
+        
+        return b"".join(parts)
+    
     @staticmethod
     def validate_file(file_content: bytes, content_type: str, filename: str) -> Tuple[bool, str]:
         """
@@ -52,6 +179,11 @@ class FileProcessor:
         if content_type not in FileProcessor.SUPPORTED_TYPES:
             return False, f"Unsupported file type. Supported: PDF, DOCX, TXT"
         
+        # Check content actually matches the declared type
+        is_valid, error = FileProcessor.sniff_file_type(file_content[:FileProcessor.SNIFF_SIZE], content_type)
+        if not is_valid:
+            return False, error
+        
         # Check filename
         if not filename or len(filename) > 255:
             return False, "Invalid filename"
@@ -63,9 +195,10 @@ class FileProcessor:
         """Extract text from PDF file"""
         try:
             # Try with pdfplumber first (better text extraction)
-            if pdf_open:
+            pdfplumber = optional_import("pdfplumber")
+            if pdfplumber:
                 pdf_file = io.BytesIO(file_content)
-                with pdf_open(pdf_file) as pdf:
+                with pdfplumber.open(pdf_file) as pdf:
                     text_parts = []
                     for page in pdf.pages:
                         text = page.extract_text()
@@ -74,6 +207,7 @@ class FileProcessor:
                     return "\n\n".join(text_parts)
             
             # Fallback to PyPDF2
+            PyPDF2 = optional_import("PyPDF2")
             if PyPDF2:
                 pdf_file = io.BytesIO(file_content)
                 reader = PyPDF2.PdfReader(pdf_file)
@@ -93,11 +227,12 @@ class FileProcessor:
     def extract_text_from_docx(file_content: bytes) -> str:
         """Extract text from DOCX file"""
         try:
-            if not Document:
+            docx = optional_import("docx")
+            if not docx:
                 raise Exception("python-docx library not available")
             
             docx_file = io.BytesIO(file_content)
-            doc = Document(docx_file)
+            doc = docx.Document(docx_file)
             
             text_parts = []
             for paragraph in doc.paragraphs:
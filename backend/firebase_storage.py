@@ -9,13 +9,8 @@ from typing import Optional, Tuple
 import json
 from datetime import timedelta
 
-try:
-    import firebase_admin
-    from firebase_admin import credentials, storage
-    FIREBASE_AVAILABLE = True
-except ImportError:
-    FIREBASE_AVAILABLE = False
-    print("Warning: firebase-admin not installed. File storage disabled.")
+# firebase_admin is imported on first use
+from lazy_imports import optional_import
 
 
 class FirebaseStorageManager:
@@ -30,10 +25,18 @@ class FirebaseStorageManager:
         if cls._initialized:
             return True
         
-        if not FIREBASE_AVAILABLE:
-            print("Firebase Admin SDK not available")
+        # Without a bucket there is nothing to initialize - skip importing the SDK
+        if not os.getenv("FIREBASE_STORAGE_BUCKET"):
+            print("FIREBASE_STORAGE_BUCKET not set")
             return False
         
+        firebase_admin = optional_import("firebase_admin")
+        if firebase_admin is None:
+            print("Warning: firebase-admin not installed. File storage disabled.")
+            return False
+        credentials = optional_import("firebase_admin.credentials")
+        storage = optional_import("firebase_admin.storage")
+        
         try:
             # Check if already initialized
             try:
@@ -176,6 +179,15 @@ class FirebaseStorageManager:
         return cls.initialize()
 
 
+def _reset_after_fork():
+    # The bucket's HTTP session belongs to the parent; re-create it on first use
+    FirebaseStorageManager._initialized = False
+    FirebaseStorageManager._bucket = None
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
 # Convenience functions
 def upload_file(file_content: bytes, filename: str, content_type: str) -> Optional[Tuple[str, str]]:
     """Upload file to Firebase Storage"""
@@ -0,0 +1,101 @@
+"""
+Deferred imports of heavy dependencies for Juridik AI
+openai, firebase_admin, the PDF and DOCX libraries, sendgrid and passlib are
+imported on first use instead of when main.py is imported, so a worker that
+was spun down answers its first requests sooner. After startup, ImportWarmer
+imports them in a background thread, so the first chat or upload does not
+pay for them either.
+"""
+
+import os
+import time
+import asyncio
+import importlib
+import threading
+from types import ModuleType
+from typing import Dict, Optional
+
+
+LAZY_IMPORT_WARMUP = os.getenv("LAZY_IMPORT_WARMUP", "true").lower() == "true"
+# Give the first requests after startup the CPU before warming up
+LAZY_IMPORT_WARMUP_DELAY_SECONDS = float(os.getenv("LAZY_IMPORT_WARMUP_DELAY_SECONDS", 1))
+
+# Imported by the background warm-up, most used first
+HEAVY_MODULES = (
+    "passlib.context",
+    "openai",
+    "pdfplumber",
+    "PyPDF2",
+    "docx",
+    "firebase_admin.storage",
+    "sendgrid",
+)
+
+_lock = threading.Lock()
+_import_ms: Dict[str, float] = {}
+_missing: Dict[str, str] = {}
+
+
+def optional_import(name: str) -> Optional[ModuleType]:
+    """Import a module on first use. Returns None if it is not installed"""
+    if name in _missing:
+        return None
+
+    started = time.perf_counter()
+    try:
+        module = importlib.import_module(name)
+    except ImportError as e:
+        with _lock:
+            _missing[name] = str(e)
+        return None
+
+    with _lock:
+        if name not in _import_ms:
+            _import_ms[name] = (time.perf_counter() - started) * 1000
+    return module
+
+
+class ImportWarmer:
+    """Imports HEAVY_MODULES in a worker thread once the app has started"""
+
+    def __init__(self, enabled: bool, delay_seconds: float):
+        self.enabled = enabled
+        self.delay_seconds = delay_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.duration_ms: Optional[float] = None
+
+    @staticmethod
+    def import_all():
+        for name in HEAVY_MODULES:
+            optional_import(name)
+
+    async def _run(self):
+        await asyncio.sleep(self.delay_seconds)
+        started = time.perf_counter()
+        await asyncio.to_thread(self.import_all)
+        self.duration_ms = (time.perf_counter() - started) * 1000
+
+    def start(self):
+        if self.enabled:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        with _lock:
+            return {
+                "warmupEnabled": self.enabled,
+                "warmupMs": round(self.duration_ms, 2) if self.duration_ms is not None else None,
+                "importMs": {name: round(ms, 2) for name, ms in _import_ms.items()},
+                "missing": sorted(_missing),
+            }
+
+
+import_warmer = ImportWarmer(LAZY_IMPORT_WARMUP, LAZY_IMPORT_WARMUP_DELAY_SECONDS)
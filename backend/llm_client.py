@@ -0,0 +1,369 @@
+"""
+Resilient OpenAI client for Juridik AI
+Chat completions go through llm_client, which calls OpenAI asynchronously (a
+slow completion no longer holds up the worker's other requests) and adds:
+
+- bounded retries with full-jitter exponential backoff on timeouts,
+  connection errors, 429s (honouring Retry-After) and 5xx responses, within
+  an overall deadline per call
+- a circuit breaker: when too many of the recent attempts failed, calls fail
+  fast with LLMUnavailableError for LLM_BREAKER_OPEN_SECONDS, after which one
+  trial call decides whether to close it again
+- optional hedging: when an attempt has not answered after the recent p95
+  latency, a second identical request is sent and the first answer wins
+
+The breaker and latency history are per worker process.
+"""
+
+import os
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Deque, Dict, Optional
+
+from lazy_imports import optional_import
+from percentiles import percentile
+
+
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", 60))
+# Retries and backoff of one call never run past this
+LLM_TOTAL_TIMEOUT_SECONDS = float(os.getenv("LLM_TOTAL_TIMEOUT_SECONDS", 90))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 2))
+LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.getenv("LLM_RETRY_MAX_SECONDS", 8))
+
+# The breaker opens when LLM_BREAKER_ERROR_RATE of the last LLM_BREAKER_WINDOW
+# attempts failed, once at least LLM_BREAKER_MIN_CALLS have been made
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", 20))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", 10))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", 0.5))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", 30))
+
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", 95))
+# No hedging until this many latencies are known, and never sooner than LLM_HEDGE_MIN_MS
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", 20))
+LLM_HEDGE_MIN_MS = float(os.getenv("LLM_HEDGE_MIN_MS", 1000))
+
+LATENCY_SAMPLES = 200
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+class LLMUnavailableError(Exception):
+    """The model could not be reached - retries were exhausted or the breaker is open"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx responses are worth retrying"""
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    openai = optional_import("openai")
+    if openai is not None and isinstance(error, openai.APIConnectionError):  # includes APITimeoutError
+        return True
+    status_code = getattr(error, "status_code", None)
+    return isinstance(status_code, int) and (status_code in RETRYABLE_STATUS_CODES or status_code >= 500)
+
+
+def is_timeout(error: BaseException) -> bool:
+    openai = optional_import("openai")
+    return isinstance(error, asyncio.TimeoutError) or (
+        openai is not None and isinstance(error, openai.APITimeoutError)
+    )
+
+
+def retry_after_seconds(error: BaseException) -> Optional[float]:
+    """The Retry-After header of a failed response, if it has one in seconds"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """
+    Closed -> open when the recent failure rate is too high; open -> half-open
+    after open_seconds, letting one trial call through; half-open -> closed on
+    its success, or back to open on its failure
+    """
+
+    def __init__(
+        self,
+        window: int = LLM_BREAKER_WINDOW,
+        min_calls: int = LLM_BREAKER_MIN_CALLS,
+        error_rate: float = LLM_BREAKER_ERROR_RATE,
+        open_seconds: float = LLM_BREAKER_OPEN_SECONDS
+    ):
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.open_seconds = open_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=window)  # True for a failure
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.open_seconds:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.open_seconds - (time.monotonic() - self._opened_at))
+
+    def failure_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may go upstream now"""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        if self._opened_at is not None:
+            if not self._trial_in_flight:
+                return  # a call started before the breaker opened
+            self._opened_at = None
+            self._trial_in_flight = False
+            self._outcomes.clear()
+        self._outcomes.append(False)
+
+    def record_failure(self):
+        if self._opened_at is not None:
+            if self._trial_in_flight:
+                self._trial_in_flight = False
+                self._open()
+            return
+        self._outcomes.append(True)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate() >= self.error_rate:
+            self._open()
+
+    def release(self):
+        """Give up a trial call without an outcome"""
+        self._trial_in_flight = False
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self.opened += 1
+
+    def reset(self):
+        self._outcomes.clear()
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    def get_stats(self) -> Dict:
+        return {
+            "state": self.state,
+            "failureRate": round(self.failure_rate(), 3),
+            "retryAfterSeconds": round(self.retry_after(), 1),
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+
+class ResilientLLMClient:
+    """AsyncOpenAI chat completions with retries, a circuit breaker and hedging"""
+
+    def __init__(
+        self,
+        timeout: float = LLM_TIMEOUT_SECONDS,
+        total_timeout: float = LLM_TOTAL_TIMEOUT_SECONDS,
+        max_retries: int = LLM_MAX_RETRIES,
+        retry_base: float = LLM_RETRY_BASE_SECONDS,
+        retry_max: float = LLM_RETRY_MAX_SECONDS,
+        hedge_enabled: bool = LLM_HEDGE_ENABLED,
+        hedge_percentile: float = LLM_HEDGE_PERCENTILE,
+        hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+        hedge_min_ms: float = LLM_HEDGE_MIN_MS,
+        breaker: Optional[CircuitBreaker] = None
+    ):
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.max_retries = max_retries
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.hedge_enabled = hedge_enabled
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_ms = hedge_min_ms
+        self.breaker = breaker or CircuitBreaker()
+        self._client = None
+        # Recent latencies per kind of call (see chat_completion's latency_key)
+        self._latencies_ms: Dict[str, Deque[float]] = {}
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def _get_client(self):
+        if self._client is None:
+            from openai import AsyncOpenAI
+            # Retries are done here, where the breaker can see them
+            self._client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    async def _request(self, kwargs: Dict, timeout: float):
+        """One HTTP request to OpenAI"""
+        return await self._get_client().chat.completions.create(**kwargs, timeout=timeout)
+
+    def hedge_delay(self, latency_key: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None when hedging is off or there is no history yet"""
+        latencies = self._latencies_ms.get(latency_key, ())
+        if not self.hedge_enabled or len(latencies) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_ms, percentile(latencies, self.hedge_percentile)) / 1000
+
+    async def _attempt(self, kwargs: Dict, timeout: float, latency_key: str):
+        """One attempt - a request, plus a hedged second one if the first is slow"""
+        tasks = [asyncio.ensure_future(self._request(kwargs, timeout))]
+        try:
+            delay = self.hedge_delay(latency_key)
+            if delay is None or delay >= timeout:
+                return await tasks[0]
+
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                self.hedges += 1
+                tasks.append(asyncio.ensure_future(self._request(kwargs, timeout - delay)))
+
+            pending, error = set(tasks), None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not tasks[0]:
+                            self.hedge_wins += 1
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    def _backoff(self, retry: int, error: BaseException) -> float:
+        """Full jitter: uniform between 0 and the exponential cap, or the server's Retry-After"""
+        server_delay = retry_after_seconds(error)
+        if server_delay is not None:
+            return min(server_delay, self.retry_max)
+        return random.uniform(0, min(self.retry_max, self.retry_base * 2 ** retry))
+
+    async def chat_completion(self, timeout: Optional[float] = None, latency_key: Optional[str] = None, **kwargs):
+        """
+        chat.completions.create() with retries. Raises LLMUnavailableError when
+        the breaker is open or every attempt failed; errors that retrying cannot
+        fix (bad request, authentication) are raised as they are.
+
+        timeout overrides the per-attempt timeout. Hedging compares an attempt
+        with earlier calls of the same latency_key (default: the model), so
+        long document analyses do not set the threshold for short answers
+        """
+        self.calls += 1
+        attempt_timeout = timeout or self.timeout
+        latency_key = latency_key or kwargs.get("model", "")
+        deadline = time.monotonic() + max(self.total_timeout, attempt_timeout)
+        retry = 0
+        while True:
+            if not self.breaker.allow():
+                self.failures += 1
+                raise LLMUnavailableError("The AI service is temporarily unavailable", self.breaker.retry_after())
+
+            self.attempts += 1
+            timeout = min(attempt_timeout, deadline - time.monotonic())
+            started = time.monotonic()
+            try:
+                response = await asyncio.wait_for(self._attempt(kwargs, timeout, latency_key), timeout)
+            except asyncio.CancelledError:
+                # The caller went away - says nothing about the upstream
+                self.breaker.release()
+                raise
+            except Exception as e:
+                if not is_retryable(e):
+                    # The upstream answered; retrying would get the same answer
+                    self.breaker.record_success()
+                    self.failures += 1
+                    raise
+                if is_timeout(e):
+                    self.timeouts += 1
+                self.breaker.record_failure()
+
+                delay = self._backoff(retry, e)
+                if retry >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.failures += 1
+                    raise LLMUnavailableError(
+                        f"The AI service did not answer after {retry + 1} attempt(s): {e}",
+                        retry_after_seconds(e)
+                    ) from e
+                retry += 1
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            latencies = self._latencies_ms.setdefault(latency_key, deque(maxlen=LATENCY_SAMPLES))
+            latencies.append((time.monotonic() - started) * 1000)
+            self.breaker.record_success()
+            self.successes += 1
+            return response
+
+    async def stop(self):
+        """Close the HTTP connections"""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+    def reset_after_fork(self):
+        # The client's connection pool and the parent's history must not be shared
+        self._client = None
+        self._latencies_ms.clear()
+        self.breaker.reset()
+
+    def get_stats(self) -> Dict:
+        latencies = [ms for samples in self._latencies_ms.values() for ms in samples]
+        hedge_after = {key: self.hedge_delay(key) for key in self._latencies_ms}
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retries": self.retries,
+            "successes": self.successes,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedgeWins": self.hedge_wins,
+            "hedgeAfterMs": {
+                key: round(delay * 1000, 1) for key, delay in hedge_after.items() if delay is not None
+            },
+            "latencyMs": {
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99)
+            },
+            "breaker": self.breaker.get_stats()
+        }
+
+
+llm_client = ResilientLLMClient()
+
+os.register_at_fork(after_in_child=llm_client.reset_after_fork)
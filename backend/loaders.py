@@ -0,0 +1,48 @@
+"""
+Batched loaders for Juridik AI admin listings
+Each loader fetches related data for a whole page of rows in one query,
+so listing endpoints cost a constant number of queries regardless of page size
+"""
+
+from typing import Dict, Iterable
+import uuid
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def load_latest_subscriptions(db: AsyncSession, user_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, tuple]:
+    """Most recent subscription per user: (plan_type, status, queries_used, query_limit, current_period_end)"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    
+    result = await db.execute(
+        text("""
+            SELECT DISTINCT ON (user_id)
+                user_id, plan_type, status, queries_used, query_limit, current_period_end
+            FROM subscriptions
+            WHERE user_id = ANY(:user_ids)
+            ORDER BY user_id, created_at DESC
+        """),
+        {"user_ids": user_ids}
+    )
+    return {row[0]: tuple(row[1:]) for row in result.all()}
+
+
+async def load_message_counts_by_user(db: AsyncSession, user_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, int]:
+    """Total messages across all of each user's conversations, from the per-conversation counters"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    
+    result = await db.execute(
+        text("""
+            SELECT user_id, SUM(message_count)
+            FROM conversations
+            WHERE user_id = ANY(:user_ids)
+            GROUP BY user_id
+        """),
+        {"user_ids": user_ids}
+    )
+    return {row[0]: row[1] for row in result.all()}
@@ -0,0 +1,282 @@
+"""
+Local stand-ins for OpenAI and Firebase Storage
+One small FastAPI app that answers the calls the backend makes upstream, so
+load tests run offline and never spend API credits:
+
+- POST /v1/chat/completions - the OpenAI chat completions API, plain or
+  streamed (server-sent events), with a configurable time to first token and
+  token rate, and an optional error rate
+- the Cloud Storage JSON API used by firebase_admin.storage (multipart
+  upload, ACL update for make_public, get, delete) - objects are kept in
+  memory; point the storage client here with STORAGE_EMULATOR_HOST
+- POST /token - the OAuth token endpoint for the fake service account that
+  fake_service_account() returns
+- GET /_stats - what the fakes have served
+
+The backend is pointed at it with OPENAI_BASE_URL and STORAGE_EMULATOR_HOST
+(run_load.py does this). To run it on its own:
+    python loadtest/fake_services.py --port 8790 --latency-ms 400 --tokens-per-second 60
+"""
+
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeSettings:
+    latency_ms: float = 400          # time to first token
+    tokens_per_second: float = 60    # completion tokens streamed per second
+    completion_tokens: int = 250     # tokens per answer, capped by the request's max_tokens
+    jitter: float = 0.2              # +/- share applied to latency and answer length
+    error_rate: float = 0.0          # share of completions answered with a 500
+    storage_latency_ms: float = 50   # per storage API call
+
+
+FILLER_WORDS = (
+    "Enligt svensk rätt gäller att avtal ska hållas och parterna är bundna av "
+    "det som har avtalats om inte annat följer av lag eller avtalets villkor"
+).split()
+
+
+def fake_service_account(token_uri: str, project_id: str = "juridik-loadtest") -> Dict:
+    """
+    Service account JSON for firebase_admin, with a throwaway RSA key. Its
+    tokens are fetched from token_uri, so nothing leaves the machine.
+    """
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return {
+        "type": "service_account",
+        "project_id": project_id,
+        "private_key_id": uuid.uuid4().hex,
+        "private_key": pem,
+        "client_email": f"loadtest@{project_id}.iam.gserviceaccount.com",
+        "client_id": "1",
+        "token_uri": token_uri,
+    }
+
+
+def _jittered(value: float, jitter: float) -> float:
+    return max(0.0, value * random.uniform(1 - jitter, 1 + jitter))
+
+
+def _prompt_tokens(messages) -> int:
+    # ~4 characters per token, as tiktoken gives for English and Swedish prose
+    return sum(len(str(message.get("content") or "")) for message in messages) // 4 + 1
+
+
+def _answer_tokens(count: int):
+    return [FILLER_WORDS[i % len(FILLER_WORDS)] + " " for i in range(count)]
+
+
+def _split_multipart(body: bytes, content_type: str):
+    """Parts of a multipart/related upload: (metadata JSON, data)"""
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    parts = []
+    for chunk in body.split(b"--" + boundary)[1:-1]:
+        _, _, payload = chunk.partition(b"\r\n\r\n")
+        parts.append(payload[:-2] if payload.endswith(b"\r\n") else payload)
+    metadata = json.loads(parts[0]) if parts else {}
+    return metadata, parts[1] if len(parts) > 1 else b""
+
+
+def create_app(settings: Optional[FakeSettings] = None) -> FastAPI:
+    settings = settings or FakeSettings()
+    app = FastAPI(title="Juridik AI load-test fakes")
+    objects: Dict[str, Dict] = {}  # "bucket/name" -> resource
+    stats = {"completions": 0, "streamedCompletions": 0, "completionErrors": 0,
+             "uploads": 0, "uploadedBytes": 0, "storageCalls": 0, "tokens": 0}
+
+    async def storage_call():
+        stats["storageCalls"] += 1
+        await asyncio.sleep(_jittered(settings.storage_latency_ms, settings.jitter) / 1000)
+
+    # ----- OpenAI -----
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "gpt-4o-mini")
+        await asyncio.sleep(_jittered(settings.latency_ms, settings.jitter) / 1000)
+
+        if settings.error_rate and random.random() < settings.error_rate:
+            stats["completionErrors"] += 1
+            return JSONResponse(status_code=500, content={
+                "error": {"message": "The server had an error processing your request.",
+                          "type": "server_error", "param": None, "code": None}
+            })
+
+        count = int(_jittered(settings.completion_tokens, settings.jitter)) or 1
+        if body.get("max_tokens"):
+            count = min(count, int(body["max_tokens"]))
+        tokens = _answer_tokens(count)
+        prompt_tokens = _prompt_tokens(body.get("messages", []))
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": count,
+                 "total_tokens": prompt_tokens + count}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        stats["tokens"] += count
+
+        if not body.get("stream"):
+            stats["completions"] += 1
+            await asyncio.sleep(count / settings.tokens_per_second)
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "logprobs": None,
+                    "finish_reason": "length" if count == body.get("max_tokens") else "stop",
+                }],
+                "usage": usage,
+            }
+
+        stats["streamedCompletions"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        def chunk(delta, finish_reason=None, chunk_usage=None):
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [] if chunk_usage else [
+                    {"index": 0, "delta": delta, "logprobs": None, "finish_reason": finish_reason}
+                ],
+            }
+            if chunk_usage:
+                payload["usage"] = chunk_usage
+            return f"data: {json.dumps(payload)}\n\n"
+
+        async def events():
+            yield chunk({"role": "assistant", "content": ""})
+            for token in tokens:
+                await asyncio.sleep(1 / settings.tokens_per_second)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            if include_usage:
+                yield chunk(None, chunk_usage=usage)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # ----- Google OAuth token endpoint -----
+
+    @app.post("/token")
+    async def token():
+        return {"access_token": f"loadtest-{uuid.uuid4().hex}", "expires_in": 3600, "token_type": "Bearer"}
+
+    # ----- Cloud Storage JSON API -----
+
+    def resource(bucket: str, name: str, size: int = 0, content_type: str = "application/octet-stream"):
+        return {
+            "kind": "storage#object",
+            "id": f"{bucket}/{name}/1",
+            "name": name,
+            "bucket": bucket,
+            "generation": "1",
+            "metageneration": "1",
+            "contentType": content_type,
+            "size": str(size),
+            "timeCreated": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+            "acl": [],
+        }
+
+    @app.post("/upload/storage/v1/b/{bucket}/o")
+    async def upload_object(bucket: str, request: Request):
+        await storage_call()
+        body = await request.body()
+        content_type = request.headers.get("content-type", "")
+        if content_type.startswith("multipart/related"):
+            metadata, data = _split_multipart(body, content_type)
+        else:
+            metadata, data = {"name": request.query_params.get("name")}, body
+        name = metadata.get("name") or request.query_params.get("name") or uuid.uuid4().hex
+        objects[f"{bucket}/{name}"] = resource(bucket, name, len(data), metadata.get("contentType", content_type))
+        stats["uploads"] += 1
+        stats["uploadedBytes"] += len(data)
+        return objects[f"{bucket}/{name}"]
+
+    @app.get("/storage/v1/b/{bucket}/o/{name:path}/acl")
+    async def get_object_acl(bucket: str, name: str):
+        await storage_call()
+        if f"{bucket}/{name}" not in objects:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+        return {"kind": "storage#objectAccessControls", "items": objects[f"{bucket}/{name}"]["acl"]}
+
+    @app.get("/storage/v1/b/{bucket}/o/{name:path}")
+    async def get_object(bucket: str, name: str):
+        await storage_call()
+        if f"{bucket}/{name}" not in objects:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+        return objects[f"{bucket}/{name}"]
+
+    @app.patch("/storage/v1/b/{bucket}/o/{name:path}")
+    async def patch_object(bucket: str, name: str, request: Request):
+        await storage_call()
+        if f"{bucket}/{name}" not in objects:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+        objects[f"{bucket}/{name}"].update(await request.json())
+        return objects[f"{bucket}/{name}"]
+
+    @app.delete("/storage/v1/b/{bucket}/o/{name:path}")
+    async def delete_object(bucket: str, name: str):
+        await storage_call()
+        if objects.pop(f"{bucket}/{name}", None) is None:
+            return JSONResponse(status_code=404, content={"error": {"code": 404, "message": "Not Found"}})
+        return Response(status_code=204)
+
+    @app.get("/_stats")
+    async def get_stats():
+        return {**stats, "objects": len(objects)}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    defaults = FakeSettings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--storage-latency-ms", type=float, default=defaults.storage_latency_ms)
+    args = parser.parse_args()
+
+    settings = FakeSettings(
+        latency_ms=args.latency_ms,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        storage_latency_ms=args.storage_latency_ms,
+    )
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Load test runner
+Starts the fake OpenAI / Firebase services (fake_services.py), seeds the
+database at DATABASE_URL (seed.py), starts the API with serve.py pointed at
+the fakes, and runs virtual users through a scenario for --duration seconds.
+Reports throughput and p50/p95/p99 per route.
+
+Scenarios (see scenarios.py): chat, attachments, login-storm, admin-polling,
+or mixed (60% chat, 20% chat with attachments, 10% login storm, 10% admin
+dashboards). Everything runs on this machine; nothing calls OpenAI or Google.
+
+The API's per-user and per-IP rate limits are lifted unless --keep-rate-limits
+is given, so the numbers show capacity rather than the limiter. Use a
+scratch database - seeded accounts stay until `python loadtest/seed.py --reset`.
+
+Run from the backend directory:
+    python loadtest/run_load.py --scenario mixed --users 50 --duration 60 --workers 2
+    python loadtest/run_load.py --scenario chat --latency-ms 1500 --tokens-per-second 40
+    python loadtest/run_load.py --url http://localhost:8000 --scenario admin-polling --no-seed
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import argparse
+import statistics
+import subprocess
+import urllib.request
+import urllib.error
+
+import httpx
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(LOADTEST_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+from fake_services import FakeSettings, fake_service_account
+from scenarios import SCENARIOS, Context, Recorder, assign_scenarios, build_attachments
+from percentiles import percentile
+
+UNLIMITED_RATES = {
+    "USER_RATE_PER_MINUTE": "1000000",
+    "USER_RATE_BURST": "1000000",
+    "IP_RATE_PER_MINUTE": "1000000",
+    "IP_RATE_BURST": "1000000",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url: str, process: subprocess.Popen, timeout: float = 120.0):
+    started = time.monotonic()
+    while time.monotonic() - started < timeout:
+        if process.poll() is not None:
+            raise RuntimeError(f"{' '.join(process.args)} exited with {process.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def stop(process: subprocess.Popen):
+    """SIGTERM, as the platform would, so the API drains and flushes its write buffer"""
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=60)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def start_fakes(port: int, settings: FakeSettings) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, os.path.join(LOADTEST_DIR, "fake_services.py"),
+        "--port", str(port),
+        "--latency-ms", str(settings.latency_ms),
+        "--tokens-per-second", str(settings.tokens_per_second),
+        "--completion-tokens", str(settings.completion_tokens),
+        "--jitter", str(settings.jitter),
+        "--error-rate", str(settings.error_rate),
+        "--storage-latency-ms", str(settings.storage_latency_ms),
+    ], cwd=BACKEND_DIR)
+    wait_until_up(f"http://127.0.0.1:{port}/_stats", process)
+    return process
+
+
+def start_api(port: int, fakes_url: str, workers: int, keep_rate_limits: bool, log_path: str) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        HOST="127.0.0.1",
+        WEB_CONCURRENCY=str(workers),
+        OPENAI_API_KEY="sk-loadtest",
+        OPENAI_BASE_URL=f"{fakes_url}/v1",
+        STORAGE_EMULATOR_HOST=fakes_url,
+        FIREBASE_STORAGE_BUCKET="juridik-loadtest.appspot.com",
+        FIREBASE_SERVICE_ACCOUNT_JSON=json.dumps(fake_service_account(f"{fakes_url}/token")),
+    )
+    env.pop("FIREBASE_SERVICE_ACCOUNT_PATH", None)
+    env.pop("SENDGRID_API_KEY", None)
+    if not keep_rate_limits:
+        env.update(UNLIMITED_RATES)
+
+    log = open(log_path, "w")
+    process = subprocess.Popen([sys.executable, "serve.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=log, stderr=subprocess.STDOUT)
+    wait_until_up(f"http://127.0.0.1:{port}/", process)
+    return process
+
+
+async def run_scenario(base_url: str, scenario: str, users: int, duration: float, ramp_seconds: float,
+                       think_seconds: float, poll_seconds: float, seed_users: int, seed_admins: int):
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=users * 5 + 10, max_keepalive_connections=users * 5 + 10)
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        ctx = Context(
+            client=client, recorder=recorder,
+            deadline=time.monotonic() + ramp_seconds + duration,
+            seed_users=seed_users, seed_admins=seed_admins,
+            think_seconds=think_seconds, poll_seconds=poll_seconds,
+            attachments=build_attachments(),
+        )
+
+        async def virtual_user(index: int, name: str):
+            # Spread the start of the virtual users over the ramp-up
+            await asyncio.sleep(ramp_seconds * index / max(1, users))
+            await SCENARIOS[name](ctx, index)
+
+        started = time.monotonic()
+        await asyncio.gather(*(
+            virtual_user(index, name) for index, name in enumerate(assign_scenarios(scenario, users))
+        ))
+        elapsed = time.monotonic() - started
+    return recorder, elapsed
+
+
+def report(recorder: Recorder, elapsed: float):
+    print(f"\n{'route':<56} {'n':>6} {'ok':>6} {'req/s':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'mean':>8}")
+    total = ok_total = 0
+    results = {}
+    for route in sorted(recorder.samples):
+        samples = recorder.samples[route]
+        statuses = recorder.statuses[route]
+        ok = sum(count for status, count in statuses.items() if isinstance(status, int) and status < 400)
+        total += len(samples)
+        ok_total += ok
+        results[route] = {
+            "requests": len(samples),
+            "ok": ok,
+            "rps": len(samples) / elapsed,
+            "p50": percentile(samples, 50, 0.0),
+            "p95": percentile(samples, 95, 0.0),
+            "p99": percentile(samples, 99, 0.0),
+            "mean": statistics.mean(samples),
+            "statuses": {str(status): count for status, count in statuses.items()},
+        }
+        r = results[route]
+        print(f"{route:<56} {r['requests']:>6} {ok:>6} {r['rps']:>7.2f} "
+              f"{r['p50']:>6.0f}ms {r['p95']:>6.0f}ms {r['p99']:>6.0f}ms {r['mean']:>6.0f}ms")
+        failures = {status: count for status, count in statuses.items() if not (isinstance(status, int) and status < 400)}
+        if failures:
+            print(f"{'':<4}failed: {', '.join(f'{status} x{count}' for status, count in failures.items())}")
+
+    print(f"\n{total} requests in {elapsed:.1f}s - {total / elapsed:.1f} req/s, {ok_total} succeeded")
+    return results
+
+
+def main():
+    defaults = FakeSettings()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", choices=[*SCENARIOS, "mixed"], default="mixed")
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds, after the ramp-up")
+    parser.add_argument("--ramp-seconds", type=float, default=5)
+    parser.add_argument("--think-seconds", type=float, default=1, help="pause between a user's chat requests")
+    parser.add_argument("--poll-seconds", type=float, default=5, help="admin dashboard refresh interval")
+    parser.add_argument("--workers", type=int, default=1, help="API worker processes (WEB_CONCURRENCY)")
+    parser.add_argument("--keep-rate-limits", action="store_true")
+    parser.add_argument("--url", help="test an already running API instead of starting one (and the fakes)")
+    parser.add_argument("--seed-users", type=int, default=200)
+    parser.add_argument("--seed-admins", type=int, default=5)
+    parser.add_argument("--no-seed", action="store_true", help="use accounts seeded earlier")
+    parser.add_argument("--latency-ms", type=float, default=defaults.latency_ms, help="OpenAI time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--completion-tokens", type=int, default=defaults.completion_tokens)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate, help="share of OpenAI calls failing")
+    parser.add_argument("--storage-latency-ms", type=float, default=defaults.storage_latency_ms)
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--api-log", default=os.path.join(tempfile.gettempdir(), "juridik-loadtest-api.log"),
+                        help="where the API's output goes")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        subprocess.run([
+            sys.executable, os.path.join(LOADTEST_DIR, "seed.py"),
+            "--users", str(args.seed_users), "--admins", str(args.seed_admins),
+        ], cwd=BACKEND_DIR, check=True)
+
+    processes = []
+    fakes_url = None
+    try:
+        if args.url:
+            base_url = args.url.rstrip("/")
+        else:
+            settings = FakeSettings(
+                latency_ms=args.latency_ms, tokens_per_second=args.tokens_per_second,
+                completion_tokens=args.completion_tokens, jitter=args.jitter,
+                error_rate=args.error_rate, storage_latency_ms=args.storage_latency_ms,
+            )
+            fakes_port, api_port = free_port(), free_port()
+            fakes_url = f"http://127.0.0.1:{fakes_port}"
+            processes.append(start_fakes(fakes_port, settings))
+            processes.append(start_api(api_port, fakes_url, args.workers, args.keep_rate_limits, args.api_log))
+            base_url = f"http://127.0.0.1:{api_port}"
+
+        print(f"Running {args.users} virtual users ({args.scenario}) against {base_url} "
+              f"for {args.duration:.0f}s after a {args.ramp_seconds:.0f}s ramp-up")
+        recorder, elapsed = asyncio.run(run_scenario(
+            base_url, args.scenario, args.users, args.duration, args.ramp_seconds,
+            args.think_seconds, args.poll_seconds, args.seed_users, args.seed_admins,
+        ))
+        results = report(recorder, elapsed)
+
+        if fakes_url:
+            with urllib.request.urlopen(f"{fakes_url}/_stats") as response:
+                fake_stats = json.loads(response.read())
+            print(f"fakes: {fake_stats}")
+        else:
+            fake_stats = None
+
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"args": vars(args), "elapsedSeconds": elapsed, "routes": results, "fakes": fake_stats},
+                          f, indent=2)
+    finally:
+        for process in reversed(processes):
+            stop(process)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""
+Load-test scenarios
+Each scenario is one virtual user's loop, run until the deadline against the
+seeded accounts (see seed.py). Requests are timed per route, by route
+template, so results from different conversations add up.
+"""
+
+import io
+import time
+import random
+import asyncio
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from seed import LOADTEST_PASSWORD, user_email, admin_email
+
+
+PROMPTS = [
+    "Vad gäller vid uppsägning av ett hyresavtal för lägenhet?",
+    "Kan min arbetsgivare säga upp mig under provanställningen utan skäl?",
+    "Hur lång är preskriptionstiden för en fordran enligt svensk rätt?",
+    "What are my rights if a product I bought online turns out to be faulty?",
+    "Behöver ett testamente bevittnas för att vara giltigt?",
+]
+
+CONTRACT_PARAGRAPH = (
+    "§ {n} Hyresgästen ska betala hyran i förskott senast den sista vardagen före varje "
+    "kalendermånads början. Vid försenad betalning utgår dröjsmålsränta enligt räntelagen. "
+    "Hyresvärden får säga upp avtalet om hyran inte betalas i rätt tid.\n\n"
+)
+
+
+@dataclass
+class Recorder:
+    """Latencies and status codes per route"""
+    samples: Dict[str, List[float]] = field(default_factory=lambda: defaultdict(list))
+    statuses: Dict[str, Counter] = field(default_factory=lambda: defaultdict(Counter))
+
+    def add(self, route: str, status, ms: float):
+        self.samples[route].append(ms)
+        self.statuses[route][status] += 1
+
+
+@dataclass
+class Context:
+    client: httpx.AsyncClient
+    recorder: Recorder
+    deadline: float
+    seed_users: int
+    seed_admins: int
+    think_seconds: float
+    poll_seconds: float
+    attachments: List = field(default_factory=list)  # (filename, bytes, content_type)
+
+    def running(self) -> bool:
+        return time.monotonic() < self.deadline
+
+    async def think(self, seconds: Optional[float] = None):
+        seconds = self.think_seconds if seconds is None else seconds
+        if seconds > 0:
+            # Up to +/-50%, so virtual users drift apart instead of moving in lockstep
+            await asyncio.sleep(min(random.uniform(0.5, 1.5) * seconds, max(0.0, self.deadline - time.monotonic())))
+
+
+class VirtualUser:
+    def __init__(self, ctx: Context, index: int):
+        self.ctx = ctx
+        self.index = index
+        # Each virtual user is its own client as far as the per-IP limiter can tell
+        self.headers = {"X-Forwarded-For": f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"}
+
+    async def request(self, route: str, method: str, url: str, record: bool = True, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.ctx.client.request(method, url, headers=self.headers, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            response, status = None, type(e).__name__
+        if record:
+            self.ctx.recorder.add(route, status, (time.perf_counter() - started) * 1000)
+        return response
+
+    async def login(self, email: str, record: bool = False) -> bool:
+        response = await self.request("POST /api/auth/login", "POST", "/api/auth/login", record=record,
+                                      json={"email": email, "password": LOADTEST_PASSWORD})
+        if response is None or response.status_code != 200:
+            return False
+        self.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        return True
+
+    async def login_until_running(self, email: str) -> bool:
+        """Log in for the scenario (not timed), retrying while the server is busy"""
+        while self.ctx.running():
+            if await self.login(email):
+                return True
+            await asyncio.sleep(1)
+        return False
+
+
+async def chat(ctx: Context, index: int, with_attachments: bool = False):
+    """Open a conversation, exchange a few messages, then list conversations and reload the thread"""
+    user = VirtualUser(ctx, index)
+    if not await user.login_until_running(user_email(index % ctx.seed_users + 1)):
+        return
+
+    while ctx.running():
+        response = await user.request("POST /api/conversations", "POST", "/api/conversations")
+        if response is None or response.status_code != 200:
+            await ctx.think()
+            continue
+        conversation_id = response.json()["id"]
+
+        for turn in range(3):
+            if not ctx.running():
+                return
+            data = {"content": random.choice(PROMPTS)}
+            if with_attachments and turn == 0:
+                files = [("files", attachment) for attachment in ctx.attachments]
+                await user.request("POST /api/conversations/{id}/messages (attachments)", "POST",
+                                   f"/api/conversations/{conversation_id}/messages", data=data, files=files)
+            else:
+                await user.request("POST /api/conversations/{id}/messages", "POST",
+                                   f"/api/conversations/{conversation_id}/messages", data=data)
+            await ctx.think()
+
+        await user.request("GET /api/conversations", "GET", "/api/conversations")
+        await user.request("GET /api/conversations/{id}/messages", "GET",
+                           f"/api/conversations/{conversation_id}/messages")
+        await ctx.think()
+
+
+async def chat_with_attachments(ctx: Context, index: int):
+    await chat(ctx, index, with_attachments=True)
+
+
+async def login_storm(ctx: Context, index: int):
+    """Log in and load the profile back to back, as after a deploy logs everyone out"""
+    user = VirtualUser(ctx, index)
+    while ctx.running():
+        user.headers.pop("Authorization", None)
+        if await user.login(user_email(index % ctx.seed_users + 1), record=True):
+            await user.request("GET /api/auth/me", "GET", "/api/auth/me")
+
+
+ADMIN_POLLS = [
+    ("GET /api/admin/dashboard", "/api/admin/dashboard"),
+    ("GET /api/admin/users", "/api/admin/users?limit=50"),
+    ("GET /api/admin/conversations", "/api/admin/conversations?limit=50"),
+    ("GET /api/admin/analytics/usage", "/api/admin/analytics/usage?days=30"),
+    ("GET /api/admin/metrics", "/api/admin/metrics"),
+]
+
+
+async def admin_polling(ctx: Context, index: int):
+    """An open admin panel refreshing its dashboard every poll interval"""
+    user = VirtualUser(ctx, index)
+    if not await user.login_until_running(admin_email(index % ctx.seed_admins + 1)):
+        return
+
+    while ctx.running():
+        await asyncio.gather(*(user.request(route, "GET", url) for route, url in ADMIN_POLLS))
+        await ctx.think(ctx.poll_seconds)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "chat": chat,
+    "attachments": chat_with_attachments,
+    "login-storm": login_storm,
+    "admin-polling": admin_polling,
+}
+
+# Share of virtual users per scenario in --scenario mixed
+MIXED_WEIGHTS = {"chat": 6, "attachments": 2, "login-storm": 1, "admin-polling": 1}
+
+
+def assign_scenarios(scenario: str, users: int) -> List[str]:
+    """The scenario each virtual user runs"""
+    if scenario != "mixed":
+        return [scenario] * users
+    cycle = [name for name, weight in MIXED_WEIGHTS.items() for _ in range(weight)]
+    return [cycle[i % len(cycle)] for i in range(users)]
+
+
+def build_attachments(paragraphs: int = 60) -> List:
+    """A short lease agreement as a .txt and, if python-docx is installed, a .docx"""
+    body = "".join(CONTRACT_PARAGRAPH.format(n=n) for n in range(1, paragraphs + 1))
+    attachments = [("hyresavtal.txt", body.encode(), "text/plain")]
+    try:
+        import docx
+    except ImportError:
+        return attachments
+
+    document = docx.Document()
+    document.add_heading("Hyresavtal", 0)
+    for paragraph in body.split("\n\n"):
+        if paragraph:
+            document.add_paragraph(paragraph)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    attachments.append((
+        "hyresavtal.docx", buffer.getvalue(),
+        "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    ))
+    return attachments
@@ -0,0 +1,137 @@
+"""
+Seeded data for load tests
+Creates load-test users (with an active subscription), admins, and
+conversations with message history in the database at DATABASE_URL. Everyone
+shares one password, hashed once with the app's BCRYPT_ROUNDS, so logins cost
+what they do in production.
+
+Seeded accounts are loadtest-user-N@loadtest.example.com and
+loadtest-admin-N@loadtest.example.com; --reset deletes them and everything that
+cascades from them. Seeding again tops up whatever is missing.
+
+Run from the backend directory:
+    python loadtest/seed.py --users 200 --admins 5
+    python loadtest/seed.py --reset
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+from database import engine
+from security import get_pwd_context
+
+
+LOADTEST_PASSWORD = "loadtest-password"
+LOADTEST_DOMAIN = "loadtest.example.com"
+
+
+def user_email(i: int) -> str:
+    return f"loadtest-user-{i}@{LOADTEST_DOMAIN}"
+
+
+def admin_email(i: int) -> str:
+    return f"loadtest-admin-{i}@{LOADTEST_DOMAIN}"
+
+
+SEEDED = f"email LIKE 'loadtest-%@{LOADTEST_DOMAIN}'"
+
+INSERT_USERS = """
+    INSERT INTO users (email, password_hash, first_name, last_name, role, email_verified)
+    SELECT 'loadtest-' || :role || '-' || g || '@' || :domain, :password_hash,
+           'Load', 'Test ' || g, :role, TRUE
+    FROM generate_series(1, :count) AS g
+    ON CONFLICT (email) DO UPDATE SET password_hash = EXCLUDED.password_hash, account_status = 'active'
+"""
+
+# A quota far above what a run uses, so the quota check runs but never refuses
+INSERT_SUBSCRIPTIONS = f"""
+    INSERT INTO subscriptions (user_id, plan_type, status, query_limit, queries_used,
+                               current_period_start, current_period_end)
+    SELECT u.user_id, 'monthly', 'active', 1000000000, 0, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP + INTERVAL '30 days'
+    FROM users u
+    WHERE u.{SEEDED} AND u.role = 'user'
+      AND NOT EXISTS (SELECT 1 FROM subscriptions s WHERE s.user_id = u.user_id AND s.status = 'active')
+"""
+
+INSERT_CONVERSATIONS = f"""
+    INSERT INTO conversations (user_id, title)
+    SELECT u.user_id, 'Seeded conversation ' || c
+    FROM users u, generate_series(1, :conversations) AS c
+    WHERE u.{SEEDED} AND u.role = 'user'
+      AND NOT EXISTS (SELECT 1 FROM conversations x WHERE x.user_id = u.user_id)
+"""
+
+# Message counters and last_message_at are kept up to date by the messages triggers
+INSERT_MESSAGES = f"""
+    INSERT INTO messages (conversation_id, role, content, tokens_used, created_at)
+    SELECT c.conversation_id,
+           CASE WHEN m % 2 = 1 THEN 'user' ELSE 'assistant' END,
+           CASE WHEN m % 2 = 1 THEN 'Vad gäller vid uppsägning av hyresavtal? (' || m || ')'
+                ELSE 'Enligt 12 kap. jordabalken gäller en uppsägningstid om tre månader. (' || m || ')' END,
+           CASE WHEN m % 2 = 1 THEN 0 ELSE 250 END,
+           CURRENT_TIMESTAMP - make_interval(mins => :messages - m)
+    FROM conversations c
+    JOIN users u ON u.user_id = c.user_id
+    CROSS JOIN generate_series(1, :messages) AS m
+    WHERE u.{SEEDED} AND c.message_count = 0
+"""
+
+
+async def seed(users: int, admins: int, conversations: int, messages: int):
+    started = time.perf_counter()
+    # One hash for every account - hashing per user would take minutes at 12 rounds
+    password_hash = get_pwd_context().hash(LOADTEST_PASSWORD)
+
+    async with engine.begin() as conn:
+        await conn.execute(text("SELECT ensure_messages_partitions(CURRENT_TIMESTAMP - INTERVAL '1 day', 3)"))
+        for role, count in (("user", users), ("admin", admins)):
+            await conn.execute(text(INSERT_USERS), {
+                "role": role, "count": count, "domain": LOADTEST_DOMAIN, "password_hash": password_hash
+            })
+        await conn.execute(text(INSERT_SUBSCRIPTIONS))
+        await conn.execute(text(INSERT_CONVERSATIONS), {"conversations": conversations})
+        await conn.execute(text(INSERT_MESSAGES), {"messages": messages})
+        counts = (await conn.execute(text(f"""
+            SELECT (SELECT COUNT(*) FROM users WHERE {SEEDED}),
+                   (SELECT COUNT(*) FROM conversations c JOIN users u USING (user_id) WHERE u.{SEEDED}),
+                   (SELECT COALESCE(SUM(c.message_count), 0) FROM conversations c JOIN users u USING (user_id)
+                    WHERE u.{SEEDED})
+        """))).first()
+
+    print(f"Seeded {counts[0]} accounts, {counts[1]} conversations, {counts[2]} messages "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+async def reset():
+    async with engine.begin() as conn:
+        result = await conn.execute(text(f"DELETE FROM users WHERE {SEEDED}"))
+    print(f"Deleted {result.rowcount} load-test accounts")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--admins", type=int, default=5)
+    parser.add_argument("--conversations", type=int, default=3, help="per user")
+    parser.add_argument("--messages", type=int, default=10, help="per conversation")
+    parser.add_argument("--reset", action="store_true", help="delete the seeded accounts instead")
+    args = parser.parse_args()
+
+    try:
+        if args.reset:
+            await reset()
+        else:
+            await seed(args.users, args.admins, args.conversations, args.messages)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
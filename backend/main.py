@@ -2,7 +2,7 @@
 FastAPI Backend for Juridik AI
 """
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,7 +10,18 @@ from sqlalchemy import text
 from dotenv import load_dotenv
 import os
 from pathlib import Path
-from database import get_db, test_connection, close_db
+from database import get_db, test_connection, close_db, read_router, round_trip_stats, READ_AFTER_HEADER
+from db_warmup import pool_warmer
+from file_processing import UploadSizeLimit
+from security import password_hasher
+from token_revocation import revocation_store
+from write_buffer import write_buffer
+from lazy_imports import import_warmer
+from llm_client import llm_client
+from rollups import daily_stats_aggregator
+from message_archive import message_archiver
+from response_cache import response_cache
+from cache_invalidation import invalidation_listener
 from routes.auth import router as auth_router
 from routes.conversations import router as conversations_router
 from routes.admin import router as admin_router
@@ -40,8 +51,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-DB-Round-Trips", READ_AFTER_HEADER],
 )
 
+# Refuse oversized message uploads before they are buffered, chunked or not
+app.add_middleware(UploadSizeLimit)
+
+
+if read_router.has_replica:
+    @app.middleware("http")
+    async def send_read_after(request: Request, call_next):
+        """Tell the client when it last wrote, so every worker keeps its reads on the primary"""
+        response = await call_next(request)
+        read_after = getattr(request.state, "read_after", None)
+        if read_after is not None:
+            response.headers[READ_AFTER_HEADER] = f"{read_after:.3f}"
+        return response
+
+
+if round_trip_stats.enabled:
+    @app.middleware("http")
+    async def count_db_round_trips(request: Request, call_next):
+        """Report the database round-trips each request made (DB_DEBUG_METRICS)"""
+        token = round_trip_stats.start_request()
+        try:
+            response = await call_next(request)
+        finally:
+            # Streamed bodies are still running here - only what ran before the headers is counted
+            route = request.scope.get("route")
+            count = round_trip_stats.finish_request(
+                token, f"{request.method} {route.path if route else request.url.path}"
+            )
+        response.headers["X-DB-Round-Trips"] = str(count)
+        return response
+
+
 # Include routers
 app.include_router(auth_router, prefix="/api")
 app.include_router(conversations_router, prefix="/api")
@@ -53,13 +97,31 @@ async def startup():
     """Run on application startup"""
     print("🚀 Starting Juridik AI API...")
     await test_connection()
+    await pool_warmer.start()
+    await read_router.start()
+    await revocation_store.start()
+    await invalidation_listener.start()
+    write_buffer.start()
+    await daily_stats_aggregator.start()
+    await message_archiver.start()
+    import_warmer.start()
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Run on application shutdown"""
     print("👋 Shutting down Juridik AI API...")
+    await import_warmer.stop()
+    await llm_client.stop()
+    await response_cache.stop()
+    await message_archiver.stop()
+    await daily_stats_aggregator.stop()
+    await write_buffer.stop()
+    await invalidation_listener.stop()
+    await revocation_store.stop()
+    await read_router.stop()
     await close_db()
+    password_hasher.shutdown()
 
 
 @app.get("/")
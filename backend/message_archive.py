@@ -0,0 +1,174 @@
+"""
+Message partition and archive maintenance for Juridik AI
+Keeps monthly messages partitions created ahead of time and moves the messages
+of deleted (archived) conversations out of the hot partitions into
+messages_archive, a batch of conversations per transaction. Messages found in
+messages_default - outside every monthly partition - are reported as an alert
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+
+MESSAGE_ARCHIVE_INTERVAL_SECONDS = float(os.getenv("MESSAGE_ARCHIVE_INTERVAL_SECONDS", 3600))
+MESSAGE_ARCHIVE_AFTER_DAYS = int(os.getenv("MESSAGE_ARCHIVE_AFTER_DAYS", 30))
+MESSAGE_ARCHIVE_BATCH_SIZE = int(os.getenv("MESSAGE_ARCHIVE_BATCH_SIZE", 100))
+MESSAGE_ARCHIVE_MAX_BATCHES = int(os.getenv("MESSAGE_ARCHIVE_MAX_BATCHES", 50))
+MESSAGE_PARTITION_MONTHS_AHEAD = int(os.getenv("MESSAGE_PARTITION_MONTHS_AHEAD", 3))
+
+# Only one worker needs to run maintenance at a time
+MESSAGE_ARCHIVE_LOCK_ID = 720_032
+
+
+class MessageArchiver:
+    """Periodically creates upcoming messages partitions and archives deleted conversations"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_run_ms = 0.0
+        self.runs = 0
+        self.skipped = 0
+        self.errors = 0
+        self.partitions_created = 0
+        self.conversations_archived = 0
+        self.messages_archived = 0
+        self.default_partition_rows = 0
+
+    async def ensure_partitions(self) -> Optional[int]:
+        """
+        Create any missing partitions up to MESSAGE_PARTITION_MONTHS_AHEAD months out
+        Returns the number created, or None if another worker holds the lock
+        """
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                {"lock_id": MESSAGE_ARCHIVE_LOCK_ID}
+            )
+            if not locked.scalar():
+                return None
+
+            # Attaching a partition locks messages - give up rather than queue behind long queries
+            await session.execute(text("SET LOCAL lock_timeout = '5s'"))
+            result = await session.execute(
+                text("SELECT ensure_messages_partitions(CURRENT_TIMESTAMP, :months_ahead)"),
+                {"months_ahead": MESSAGE_PARTITION_MONTHS_AHEAD}
+            )
+            created = result.scalar()
+            await session.commit()
+
+        self.partitions_created += created
+        return created
+
+    async def check_default_partition(self) -> int:
+        """Count the messages in messages_default, and warn if there are any"""
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text("SELECT COUNT(*) FROM messages_default"))
+            self.default_partition_rows = result.scalar()
+
+        if self.default_partition_rows:
+            # Their month has no partition - ensure_messages_partitions() moves them once it does
+            print(f"⚠ {self.default_partition_rows} message(s) in messages_default, outside every monthly partition")
+        return self.default_partition_rows
+
+    async def archive_batch(self) -> Optional[int]:
+        """
+        Move one batch of conversations deleted over MESSAGE_ARCHIVE_AFTER_DAYS ago
+        Returns the number of conversations moved, or None if another worker holds the lock
+        """
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        archived_before = datetime.now(timezone.utc) - timedelta(days=MESSAGE_ARCHIVE_AFTER_DAYS)
+
+        async with AsyncSessionLocal() as session:
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                {"lock_id": MESSAGE_ARCHIVE_LOCK_ID}
+            )
+            if not locked.scalar():
+                return None
+
+            result = await session.execute(
+                text("SELECT * FROM archive_conversation_messages(:archived_before, :batch_size)"),
+                {"archived_before": archived_before, "batch_size": MESSAGE_ARCHIVE_BATCH_SIZE}
+            )
+            conversations, messages = result.one()
+            await session.commit()
+
+        self.conversations_archived += conversations
+        self.messages_archived += messages
+        return conversations
+
+    async def run(self) -> bool:
+        """One maintenance pass. Returns False if another worker was already running it"""
+        started = time.perf_counter()
+
+        if await self.ensure_partitions() is None:
+            self.skipped += 1
+            return False
+        await self.check_default_partition()
+
+        # Short transactions, so chat traffic on messages never waits long
+        for _ in range(MESSAGE_ARCHIVE_MAX_BATCHES):
+            moved = await self.archive_batch()
+            if moved is None or moved < MESSAGE_ARCHIVE_BATCH_SIZE:
+                break
+
+        self.last_run_at = datetime.now(timezone.utc)
+        self.last_run_ms = (time.perf_counter() - started) * 1000
+        self.runs += 1
+        return True
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(MESSAGE_ARCHIVE_INTERVAL_SECONDS)
+            try:
+                await self.run()
+            except Exception as e:
+                self.errors += 1
+                print(f"Message archive run failed: {e}")
+
+    async def start(self):
+        """Make sure this month's partitions exist and start the periodic run"""
+        try:
+            await self.ensure_partitions()
+            await self.check_default_partition()
+        except Exception as e:
+            self.errors += 1
+            print(f"✗ messages partition check failed: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "lastRunAt": self.last_run_at.isoformat() if self.last_run_at else None,
+            "lastRunMs": round(self.last_run_ms, 2),
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "partitionsCreated": self.partitions_created,
+            "conversationsArchived": self.conversations_archived,
+            "messagesArchived": self.messages_archived,
+            "defaultPartitionRows": self.default_partition_rows,
+        }
+
+
+message_archiver = MessageArchiver()
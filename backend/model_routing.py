@@ -0,0 +1,261 @@
+"""
+Model routing for Juridik AI chat turns
+Each turn is classified before it is sent to OpenAI - by its prompt size in
+tokens, whether documents are attached and what kind of question it is -
+into a route, and the route's policy decides the model, max_tokens,
+temperature and timeout:
+
+- quick: greetings, thanks and other small talk - a short answer, fast
+- standard: ordinary legal questions (the previous fixed settings)
+- analysis: long prompts, or requests to analyse, review, compare or draft
+- document: turns with attached documents - room for a full analysis
+
+The defaults keep gpt-4o-mini on every route; MODEL_ROUTING_POLICY
+overrides any part of the table, e.g.
+    MODEL_ROUTING_POLICY='{"document": {"model": "gpt-4o", "max_tokens": 6000}}'
+
+route_stats keeps per-route latency, token and cost totals for the admin
+metrics; each assistant message stores its model, route, token counts, cost
+and latency next to tokens_used.
+"""
+
+import os
+import re
+import json
+from collections import deque
+from dataclasses import dataclass, replace
+from decimal import Decimal
+from typing import Deque, Dict, List, Optional
+
+from lazy_imports import optional_import
+from percentiles import percentile
+
+
+MODEL_ROUTING_ENABLED = os.getenv("MODEL_ROUTING_ENABLED", "true").lower() == "true"
+# Turns whose message is at most this many tokens can be small talk
+ROUTE_QUICK_MAX_TOKENS = int(os.getenv("ROUTE_QUICK_MAX_TOKENS", 12))
+# Prompts (system prompt, history and message) above this go to the analysis route
+ROUTE_LONG_PROMPT_TOKENS = int(os.getenv("ROUTE_LONG_PROMPT_TOKENS", 3000))
+
+# Which tokenizer to count with, if its encoding can be loaded; otherwise
+# tokens are estimated from the length
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+CHARS_PER_TOKEN = 4
+
+QUICK, STANDARD, ANALYSIS, DOCUMENT = "quick", "standard", "analysis", "document"
+
+
+@dataclass(frozen=True)
+class RoutePolicy:
+    model: str
+    max_tokens: int
+    temperature: float
+    timeout_seconds: float
+
+
+DEFAULT_POLICY = {
+    QUICK: RoutePolicy(model="gpt-4o-mini", max_tokens=400, temperature=0.7, timeout_seconds=20),
+    STANDARD: RoutePolicy(model="gpt-4o-mini", max_tokens=1500, temperature=0.7, timeout_seconds=60),
+    ANALYSIS: RoutePolicy(model="gpt-4o-mini", max_tokens=3000, temperature=0.4, timeout_seconds=90),
+    DOCUMENT: RoutePolicy(model="gpt-4o-mini", max_tokens=4000, temperature=0.3, timeout_seconds=120),
+}
+
+# USD per million (input, output) tokens, for the cost accounting.
+# MODEL_PRICES='{"gpt-4o": [2.5, 10]}' adds or overrides models
+DEFAULT_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+}
+
+
+def load_policy(overrides: Optional[str] = None) -> Dict[str, RoutePolicy]:
+    """DEFAULT_POLICY with the overrides (a JSON object of route -> fields) applied"""
+    policy = dict(DEFAULT_POLICY)
+    for route, fields in json.loads(overrides or "{}").items():
+        if route not in policy:
+            raise ValueError(f"Unknown route in MODEL_ROUTING_POLICY: {route}")
+        policy[route] = replace(policy[route], **fields)
+    return policy
+
+
+def load_prices(overrides: Optional[str] = None) -> Dict[str, tuple]:
+    prices = dict(DEFAULT_PRICES)
+    prices.update({model: tuple(price) for model, price in json.loads(overrides or "{}").items()})
+    return prices
+
+
+ROUTING_POLICY = load_policy(os.getenv("MODEL_ROUTING_POLICY"))
+MODEL_PRICES = load_prices(os.getenv("MODEL_PRICES"))
+
+
+# ----- token counting -----
+
+_encoding = None
+_encoding_failed = False
+
+
+def _get_encoding():
+    """The tiktoken encoding, or None when tiktoken or the encoding file is unavailable"""
+    global _encoding, _encoding_failed
+    if _encoding is None and not _encoding_failed:
+        tiktoken = optional_import("tiktoken")
+        try:
+            if tiktoken is None:
+                raise ImportError("tiktoken is not installed")
+            # Downloaded on first use unless TIKTOKEN_CACHE_DIR has it
+            _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+        except Exception as e:
+            print(f"Token counting falls back to estimates: {e}")
+            _encoding_failed = True
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_prompt_tokens(messages: List[Dict]) -> int:
+    # About 4 tokens of framing per message, as the chat format adds
+    return sum(count_tokens(message["content"]) + 4 for message in messages) + 2
+
+
+# ----- classification -----
+
+SMALL_TALK = re.compile(
+    r"(hej|hejsan|hallå|tja|tjena|god (morgon|dag|kväll)|hi|hello|hey|good (morning|evening)"
+    r"|tack|tack så mycket|tusen tack|thanks|thank you|ok|okej|okay|bra|toppen|perfekt|great|perfect"
+    r"|hej då|adjö|bye|goodbye)"
+    r"([\s,]+(anna|igen|again|så mycket|för hjälpen|for the help))*[\s!.,:)]*",
+    re.IGNORECASE
+)
+
+ANALYSIS_REQUEST = re.compile(
+    r"\b(analysera|analys|granska|jämför|bedöm|utkast|formulera|skriv (ett|en)"
+    r"|analy[sz]e|analysis|review|compare|assess|draft|write (a|an|me))\b"
+    r"|steg för steg|step by step",
+    re.IGNORECASE
+)
+
+
+def question_type(content: str) -> str:
+    """small_talk, analysis or question"""
+    text = content.strip()
+    if SMALL_TALK.fullmatch(text):
+        return "small_talk"
+    if ANALYSIS_REQUEST.search(text):
+        return "analysis"
+    return "question"
+
+
+@dataclass(frozen=True)
+class RouteDecision:
+    route: str
+    policy: RoutePolicy
+    question_type: str
+    prompt_tokens: int
+
+
+def classify(content: str, prompt_tokens: int, has_attachments: bool) -> tuple:
+    """(route, question type) for a turn"""
+    kind = question_type(content)
+    if has_attachments:
+        return DOCUMENT, kind
+    if prompt_tokens > ROUTE_LONG_PROMPT_TOKENS or kind == "analysis":
+        return ANALYSIS, kind
+    if kind == "small_talk" and count_tokens(content) <= ROUTE_QUICK_MAX_TOKENS:
+        return QUICK, kind
+    return STANDARD, kind
+
+
+def route_turn(messages: List[Dict], content: str, has_attachments: bool) -> RouteDecision:
+    """
+    Choose the route for a turn. messages is the full prompt; content the
+    user's own message. Tokenizes the whole prompt - run it off the event loop
+    """
+    prompt_tokens = count_prompt_tokens(messages)
+    if not MODEL_ROUTING_ENABLED:
+        return RouteDecision(STANDARD, ROUTING_POLICY[STANDARD], "question", prompt_tokens)
+    route, kind = classify(content, prompt_tokens, has_attachments)
+    return RouteDecision(route, ROUTING_POLICY[route], kind, prompt_tokens)
+
+
+# ----- accounting -----
+
+def completion_cost(model: str, prompt_tokens: int, completion_tokens: int) -> Optional[Decimal]:
+    """USD cost of a completion, or None for a model without a price"""
+    # Dated snapshots (gpt-4o-mini-2024-07-18) cost what their model does
+    name = model if model in MODEL_PRICES else max(
+        (name for name in MODEL_PRICES if model.startswith(name + "-")), key=len, default=None
+    )
+    if name is None:
+        return None
+    price = MODEL_PRICES[name]
+    cost = (Decimal(str(price[0])) * prompt_tokens + Decimal(str(price[1])) * completion_tokens) / 1_000_000
+    return cost.quantize(Decimal("0.000001"))
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 1)
+
+
+class RouteStats:
+    """Per-route call counts, latency percentiles, tokens and cost, per worker"""
+
+    LATENCY_SAMPLES = 500
+
+    def __init__(self):
+        self._routes: Dict[str, Dict] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def _route(self, route: str) -> Dict:
+        if route not in self._routes:
+            self._routes[route] = {
+                "calls": 0, "failures": 0, "truncated": 0,
+                "promptTokens": 0, "completionTokens": 0, "costUsd": Decimal(0)
+            }
+            self._latencies[route] = deque(maxlen=self.LATENCY_SAMPLES)
+        return self._routes[route]
+
+    def record(self, route: str, latency_ms: float, prompt_tokens: int, completion_tokens: int,
+               cost: Optional[Decimal], truncated: bool = False):
+        stats = self._route(route)
+        stats["calls"] += 1
+        stats["truncated"] += int(truncated)
+        stats["promptTokens"] += prompt_tokens
+        stats["completionTokens"] += completion_tokens
+        stats["costUsd"] += cost or 0
+        self._latencies[route].append(latency_ms)
+
+    def record_failure(self, route: str):
+        self._route(route)["failures"] += 1
+
+    def get_stats(self) -> Dict:
+        return {
+            "enabled": MODEL_ROUTING_ENABLED,
+            "policy": {
+                route: {
+                    "model": policy.model, "maxTokens": policy.max_tokens,
+                    "temperature": policy.temperature, "timeoutSeconds": policy.timeout_seconds
+                }
+                for route, policy in ROUTING_POLICY.items()
+            },
+            "routes": {
+                route: {
+                    **stats,
+                    "costUsd": float(stats["costUsd"]),
+                    "latencyMs": {
+                        "p50": _rounded(percentile(self._latencies[route], 50)),
+                        "p95": _rounded(percentile(self._latencies[route], 95))
+                    }
+                }
+                for route, stats in self._routes.items()
+            }
+        }
+
+
+route_stats = RouteStats()
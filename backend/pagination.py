@@ -0,0 +1,83 @@
+"""
+Keyset (cursor) pagination helpers for Juridik AI
+Cursors are opaque tokens over (created_at, id), so every page costs the same
+as the first; totals come from planner estimates unless an exact count is asked for
+"""
+
+import base64
+import json
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded"""
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    """Opaque cursor pointing just past the given row"""
+    payload = json.dumps({"t": created_at.isoformat(), "id": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    """Return the (created_at, id) key encoded in a cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), uuid.UUID(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def split_page(rows: Sequence, limit: int, key: Callable) -> Tuple[List, Optional[str]]:
+    """
+    Trim a limit+1 fetch to one page
+    Returns the page rows and the cursor for the next page (None on the last page)
+    """
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(*key(rows[-1]))
+
+
+async def estimate_row_count(db: AsyncSession, table_name: str) -> Optional[int]:
+    """Planner's row estimate from pg_class, or None if the table was never analyzed"""
+    result = await db.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {"table_name": table_name}
+    )
+    estimate = result.scalar()
+    if estimate is None or estimate < 0:
+        return None
+    return estimate
+
+
+async def resolve_total(db: AsyncSession, table_name: str, count_query, params: Optional[dict], exact: bool) -> Tuple[int, bool]:
+    """
+    Total row count for a listing
+    Returns (total, is_estimate); falls back to an exact count when no estimate exists
+    """
+    if not exact:
+        estimate = await estimate_row_count(db, table_name)
+        if estimate is not None:
+            return estimate, True
+
+    result = await db.execute(count_query, params or {})
+    return result.scalar() or 0, False
+
+
+def build_pagination(page: int, limit: int, total: int, estimated: bool, next_cursor: Optional[str]) -> dict:
+    return {
+        "page": page,
+        "limit": limit,
+        "total": total,
+        "totalPages": (total + limit - 1) // limit if total else 0,
+        "totalIsEstimate": estimated,
+        "nextCursor": next_cursor
+    }
@@ -0,0 +1,16 @@
+"""
+Latency percentiles for Juridik AI
+One nearest-rank percentile for the LLM client's hedging and metrics, the
+model routing stats, the benchmarks and the load-test runner, so their
+p50/p95/p99 figures are computed the same way
+"""
+
+from typing import Optional
+
+
+def percentile(samples, pct: float, default: Optional[float] = None) -> Optional[float]:
+    """The pct-th percentile of samples, or default when there are none"""
+    if not samples:
+        return default
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,202 @@
+"""
+Rate limiting and query quotas for Juridik AI
+Token buckets per user and per IP, plus subscription quota enforcement with
+an atomic reservation per query in the database
+"""
+
+import os
+import math
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+USER_RATE_PER_MINUTE = float(os.getenv("USER_RATE_PER_MINUTE", 20))
+USER_RATE_BURST = int(os.getenv("USER_RATE_BURST", 5))
+IP_RATE_PER_MINUTE = float(os.getenv("IP_RATE_PER_MINUTE", 60))
+IP_RATE_BURST = int(os.getenv("IP_RATE_BURST", 20))
+QUOTA_CACHE_TTL_SECONDS = float(os.getenv("QUOTA_CACHE_TTL_SECONDS", 30))
+
+# Worker processes on this instance (set by serve.py). Each keeps its own
+# token buckets, so each gets its share of the configured rates.
+WEB_CONCURRENCY = max(1, int(os.getenv("WEB_CONCURRENCY", 1)))
+
+
+class TokenBucketLimiter:
+    """In-process token bucket per key, with LRU-bounded key count"""
+
+    def __init__(self, rate_per_minute: float, burst: int, max_keys: int = 100000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.limited = 0
+
+    def acquire(self, key: str) -> float:
+        """Take one token. Returns 0 if allowed, else seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(self.burst), now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                self.allowed += 1
+                return 0.0
+
+            self.limited += 1
+            return (1 - bucket[0]) / self.rate if self.rate > 0 else 60.0
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"keys": len(self._buckets), "allowed": self.allowed, "limited": self.limited}
+
+
+@dataclass
+class QuotaEntry:
+    subscription_id: Optional[object]  # None when the user has no active subscription
+    query_limit: Optional[int]
+    queries_used: int
+    loaded_at: float
+
+
+# Reserves one query on the user's active subscription if it has any left.
+# The UPDATE re-checks queries_used under the row lock, so concurrent
+# reservations - from any worker or instance - never exceed query_limit.
+# Returns no row without an active subscription, and a NULL queries_used
+# when nothing was reserved.
+RESERVE_QUERY = """
+    WITH current AS (
+        SELECT subscription_id, query_limit
+        FROM subscriptions
+        WHERE user_id = :user_id AND status = 'active'
+        ORDER BY created_at DESC
+        LIMIT 1
+    ), reserved AS (
+        UPDATE subscriptions AS s
+        SET queries_used = COALESCE(s.queries_used, 0) + 1
+        FROM current
+        WHERE s.subscription_id = current.subscription_id
+          AND current.query_limit IS NOT NULL
+          AND COALESCE(s.queries_used, 0) < current.query_limit
+        RETURNING s.queries_used
+    )
+    SELECT current.subscription_id, current.query_limit, (SELECT queries_used FROM reserved)
+    FROM current
+"""
+
+RELEASE_QUERY = """
+    UPDATE subscriptions
+    SET queries_used = GREATEST(COALESCE(queries_used, 0) - 1, 0)
+    WHERE subscription_id = :subscription_id
+"""
+
+
+class QuotaTracker:
+    """
+    Enforces subscriptions.query_limit across every worker
+
+    Each query is reserved with one atomic UPDATE, committed right away, so
+    the count in the database is the only one and workers cannot each spend
+    the remaining quota. Users without an active subscription or without a
+    limit are not quota-limited; that is remembered for
+    QUOTA_CACHE_TTL_SECONDS, so their requests skip the database.
+
+    That costs a round trip and a commit on the primary for every limited
+    chat message, and it is deliberate. Batching the increments - counting
+    in memory and flushing every few seconds - was tried: each worker then
+    checks the limit against its own view, so between flushes N workers can
+    together admit up to N times the remaining quota. Keep the check and
+    the increment in one statement.
+    """
+
+    def __init__(self, cache_ttl: float = QUOTA_CACHE_TTL_SECONDS):
+        self.cache_ttl = cache_ttl
+        self._entries: Dict[str, QuotaEntry] = {}
+        self.reserved = 0
+        self.released = 0
+        self.rejected = 0
+        self.release_errors = 0
+
+    async def try_consume(self, db, user_id: str) -> Tuple[bool, Optional[QuotaEntry]]:
+        """Reserve one query for the user. Returns (allowed, quota entry)"""
+        from sqlalchemy import text
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.query_limit is None and time.monotonic() - entry.loaded_at <= self.cache_ttl:
+            return True, entry
+
+        result = await db.execute(text(RESERVE_QUERY), {"user_id": uuid.UUID(user_id)})
+        row = result.first()
+        # Not held under the row lock for the rest of the request
+        await db.commit()
+
+        if row is None:
+            entry = QuotaEntry(None, None, 0, time.monotonic())
+        else:
+            subscription_id, query_limit, queries_used = row
+            entry = QuotaEntry(subscription_id, query_limit,
+                               queries_used if queries_used is not None else query_limit or 0, time.monotonic())
+            if query_limit is not None and queries_used is None:
+                self._entries[user_id] = entry
+                self.rejected += 1
+                return False, entry
+
+        self._entries[user_id] = entry
+        if entry.query_limit is not None:
+            self.reserved += 1
+        return True, entry
+
+    async def release(self, user_id: str):
+        """Give back a query reserved by try_consume() for a request that was refused or failed"""
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        entry = self._entries.get(user_id)
+        if entry is None or entry.subscription_id is None or entry.query_limit is None:
+            return
+        try:
+            async with AsyncSessionLocal() as session:
+                await session.execute(text(RELEASE_QUERY), {"subscription_id": entry.subscription_id})
+                await session.commit()
+            self.released += 1
+        except Exception as e:
+            # The user is charged for this one - not worth failing the response over
+            self.release_errors += 1
+            print(f"Quota release failed: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "cachedUsers": len(self._entries),
+            "reserved": self.reserved,
+            "released": self.released,
+            "rejected": self.rejected,
+            "releaseErrors": self.release_errors,
+        }
+
+
+def worker_share(rate_per_minute: float, burst: int, workers: int = WEB_CONCURRENCY) -> Tuple[float, int]:
+    """
+    This worker's part of an instance-wide rate limit. Requests are spread
+    over the workers by connection, so a client's total stays close to the
+    configured rate; one that keeps a single connection gets this share
+    """
+    return rate_per_minute / workers, max(1, math.ceil(burst / workers))
+
+
+user_rate_limiter = TokenBucketLimiter(*worker_share(USER_RATE_PER_MINUTE, USER_RATE_BURST))
+ip_rate_limiter = TokenBucketLimiter(*worker_share(IP_RATE_PER_MINUTE, IP_RATE_BURST))
+quota_tracker = QuotaTracker()
@@ -0,0 +1,201 @@
+"""
+Response cache for read-heavy admin endpoints
+Per-endpoint TTLs, keys built from the request parameters, stale-while-revalidate
+refresh in the background, and explicit invalidation from mutating routes.
+Each worker has its own cache; cache_invalidation.py passes invalidations on
+to the other workers, and the TTLs bound how long one that missed it can serve
+data that changed elsewhere
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float  # seconds an entry is served as fresh
+    stale_ttl: float  # further seconds it may be served while a refresh runs
+
+
+CACHE_POLICIES = {
+    "dashboard": CachePolicy(ttl=30, stale_ttl=300),
+    "usage_analytics": CachePolicy(ttl=60, stale_ttl=600),
+    "file_stats": CachePolicy(ttl=60, stale_ttl=600),
+    "subscriptions": CachePolicy(ttl=15, stale_ttl=60),
+}
+
+
+@dataclass
+class _Entry:
+    value: Any
+    fresh_until: float
+    stale_until: float
+
+
+@dataclass
+class _EndpointStats:
+    hits: int = 0
+    stale_hits: int = 0
+    misses: int = 0
+    refreshes: int = 0
+    refresh_errors: int = 0
+    invalidations: int = 0
+
+
+Loader = Callable[[Any], Awaitable[Any]]
+
+
+class ResponseCache:
+    """
+    Caches loader(db) results per (endpoint, params)
+
+    Concurrent misses for one key share a single load. Entries past their TTL
+    but within stale_ttl are returned immediately while one background task
+    reloads them with its own (read replica) database session.
+    """
+
+    def __init__(self, policies: Dict[str, CachePolicy], max_entries: int, enabled: bool = True):
+        self.policies = policies
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self._entries: "OrderedDict[Tuple, _Entry]" = OrderedDict()
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._refreshing: Set[Tuple] = set()
+        self._generations: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._stats = {name: _EndpointStats() for name in policies}
+
+    @staticmethod
+    def make_key(endpoint: str, params: Optional[dict]) -> Tuple:
+        return (endpoint,) + tuple(sorted((name, repr(value)) for name, value in (params or {}).items()))
+
+    async def get(self, endpoint: str, params: Optional[dict], loader: Loader, db) -> Any:
+        """Cached loader(db) for this endpoint and parameter set"""
+        if not self.enabled:
+            return await loader(db)
+
+        stats = self._stats[endpoint]
+        key = self.make_key(endpoint, params)
+        now = time.monotonic()
+        entry = self._entries.get(key)
+
+        if entry is not None and now < entry.fresh_until:
+            stats.hits += 1
+            self._entries.move_to_end(key)
+            return entry.value
+
+        if entry is not None and now < entry.stale_until:
+            stats.stale_hits += 1
+            self._entries.move_to_end(key)
+            self._schedule_refresh(endpoint, key, loader)
+            return entry.value
+
+        stats.misses += 1
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+        return await self._load(endpoint, key, loader, db)
+
+    async def _load(self, endpoint: str, key: Tuple, loader: Loader, db) -> Any:
+        generation = self._generations.get(endpoint, 0)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+
+        try:
+            value = await loader(db)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved - there may be no waiters
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        # An invalidation during the load may have made this result outdated
+        if self._generations.get(endpoint, 0) == generation:
+            policy = self.policies[endpoint]
+            now = time.monotonic()
+            self._entries[key] = _Entry(value, now + policy.ttl, now + policy.ttl + policy.stale_ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        future.set_result(value)
+        return value
+
+    def _schedule_refresh(self, endpoint: str, key: Tuple, loader: Loader):
+        if key in self._refreshing or key in self._inflight:
+            return
+        self._refreshing.add(key)
+        task = asyncio.create_task(self._refresh(endpoint, key, loader))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _refresh(self, endpoint: str, key: Tuple, loader: Loader):
+        from database import AsyncReadSessionLocal
+
+        stats = self._stats[endpoint]
+        try:
+            async with AsyncReadSessionLocal() as session:
+                await self._load(endpoint, key, loader, session)
+            stats.refreshes += 1
+        except Exception as e:
+            stats.refresh_errors += 1
+            print(f"Response cache refresh failed for {endpoint}: {e}")
+        finally:
+            self._refreshing.discard(key)
+
+    def invalidate(self, *endpoints: str):
+        """Drop every cached response for these endpoints"""
+        for endpoint in endpoints:
+            self._generations[endpoint] = self._generations.get(endpoint, 0) + 1
+            self._stats[endpoint].invalidations += 1
+            for key in [key for key in self._entries if key[0] == endpoint]:
+                del self._entries[key]
+
+    def clear(self):
+        """Drop every cached response"""
+        self.invalidate(*self._stats)
+
+    async def stop(self):
+        """Cancel background refreshes (call on app shutdown)"""
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def get_stats(self) -> Dict:
+        endpoints = {}
+        for name, stats in self._stats.items():
+            lookups = stats.hits + stats.stale_hits + stats.misses
+            endpoints[name] = {
+                "ttlSeconds": self.policies[name].ttl,
+                "staleSeconds": self.policies[name].stale_ttl,
+                "entries": sum(1 for key in self._entries if key[0] == name),
+                "hits": stats.hits,
+                "staleHits": stats.stale_hits,
+                "misses": stats.misses,
+                "hitRate": round((stats.hits + stats.stale_hits) / lookups, 3) if lookups else 0.0,
+                "refreshes": stats.refreshes,
+                "refreshErrors": stats.refresh_errors,
+                "invalidations": stats.invalidations,
+            }
+        return {
+            "enabled": self.enabled,
+            "entries": len(self._entries),
+            "maxEntries": self.max_entries,
+            "endpoints": endpoints,
+        }
+
+
+response_cache = ResponseCache(CACHE_POLICIES, RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_ENABLED)
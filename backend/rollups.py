@@ -0,0 +1,109 @@
+"""
+Rollup maintenance for Juridik AI
+Keeps the daily_stats table current so admin dashboards read precomputed rows
+instead of scanning users, messages and payments
+"""
+
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from cache_invalidation import invalidate_responses
+
+
+DAILY_STATS_REFRESH_SECONDS = float(os.getenv("DAILY_STATS_REFRESH_SECONDS", 300))
+DAILY_STATS_FULL_REFRESH_SECONDS = float(os.getenv("DAILY_STATS_FULL_REFRESH_SECONDS", 24 * 3600))
+DAILY_STATS_REFRESH_DAYS = int(os.getenv("DAILY_STATS_REFRESH_DAYS", 2))
+
+# Only one worker needs to refresh at a time
+DAILY_STATS_LOCK_ID = 720_031
+
+
+class DailyStatsAggregator:
+    """Periodically recomputes recent daily_stats rows, and the full history daily"""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_refresh_at: Optional[datetime] = None
+        self.last_refresh_ms = 0.0
+        self.refreshes = 0
+        self.skipped = 0
+        self.errors = 0
+
+    async def refresh(self, full: bool = False) -> bool:
+        """
+        Recompute the trailing DAILY_STATS_REFRESH_DAYS days (or everything)
+        Returns False if another worker holds the refresh lock
+        """
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        from_date = None if full else (datetime.now(timezone.utc) - timedelta(days=DAILY_STATS_REFRESH_DAYS - 1)).date()
+        started = time.perf_counter()
+
+        async with AsyncSessionLocal() as session:
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:lock_id)"),
+                {"lock_id": DAILY_STATS_LOCK_ID}
+            )
+            if not locked.scalar():
+                self.skipped += 1
+                return False
+
+            await session.execute(
+                text("SELECT refresh_daily_stats(:from_date)"),
+                {"from_date": from_date}
+            )
+            await session.commit()
+
+        self.last_refresh_at = datetime.now(timezone.utc)
+        self.last_refresh_ms = (time.perf_counter() - started) * 1000
+        self.refreshes += 1
+
+        # Cached responses in every worker were built from the old rows
+        await invalidate_responses("dashboard", "usage_analytics")
+        return True
+
+    async def _run(self):
+        last_full = time.monotonic()
+        while True:
+            await asyncio.sleep(DAILY_STATS_REFRESH_SECONDS)
+            try:
+                full = time.monotonic() - last_full >= DAILY_STATS_FULL_REFRESH_SECONDS
+                if await self.refresh(full=full) and full:
+                    last_full = time.monotonic()
+            except Exception as e:
+                self.errors += 1
+                print(f"daily_stats refresh failed: {e}")
+
+    async def start(self):
+        """Bring today's rows up to date and start the periodic refresh"""
+        try:
+            await self.refresh()
+        except Exception as e:
+            self.errors += 1
+            print(f"✗ daily_stats refresh failed: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "lastRefreshAt": self.last_refresh_at.isoformat() if self.last_refresh_at else None,
+            "lastRefreshMs": round(self.last_refresh_ms, 2),
+            "refreshes": self.refreshes,
+            "skipped": self.skipped,
+            "errors": self.errors,
+        }
+
+
+daily_stats_aggregator = DailyStatsAggregator()
@@ -3,70 +3,71 @@ Admin routes for Juridik AI - Admin Panel
 Requires admin role to access
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc, and_, or_, text
+from sqlalchemy import select, func, desc, and_, or_, text, tuple_
 from sqlalchemy.dialects.postgresql import UUID
-from datetime import datetime, timedelta
-from jose import JWTError, jwt
+from datetime import datetime, timedelta, timezone
 import uuid
+import json
 from typing import Optional
 
-from database import get_db
+from database import get_db, get_read_db, read_router, round_trip_stats, get_pool_stats
+from db_warmup import pool_warmer
+from security import password_hasher, token_cache, user_cache, CurrentUser
+from dependencies import get_current_admin
+from token_revocation import revocation_store
+from rate_limiting import user_rate_limiter, ip_rate_limiter, quota_tracker
+from write_buffer import write_buffer
+from rollups import daily_stats_aggregator
+from message_archive import message_archiver
+from analytics import resolve_range, usage_series, AnalyticsRangeError
+from loaders import load_latest_subscriptions, load_message_counts_by_user
+from pagination import InvalidCursorError, decode_cursor, split_page, resolve_total, build_pagination
+from user_search import user_search, UserSearchError
+from exports import resolve_export, stream_export, ExportError
+from response_cache import response_cache
+from cache_invalidation import invalidation_listener, invalidate_user
+from lazy_imports import import_warmer
+from llm_client import llm_client
+from model_routing import route_stats
 from routes.auth import User
-from routes.conversations import Conversation, Message
+from routes.conversations import Conversation, AnyMessage
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-# JWT settings (should match auth.py)
-SECRET_KEY = "juridik-ai-secret-key-2026-change-this-in-production"
-ALGORITHM = "HS256"
 
-
-async def get_current_admin(authorization: str = Header(None), db: AsyncSession = Depends(get_db)) -> User:
-    """Verify user is authenticated and has admin role"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing or invalid authorization header"
-        )
-    
-    token = authorization.replace("Bearer ", "")
-    
+def parse_cursor(cursor: Optional[str]):
+    """Decode a listing cursor, or None when paging by page number"""
+    if not cursor:
+        return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-    except JWTError:
+        return decode_cursor(cursor)
+    except InvalidCursorError as e:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    
-    # Get user and verify admin role
-    result = await db.execute(
-        select(User).where(User.user_id == uuid.UUID(user_id))
-    )
-    user = result.scalar_one_or_none()
-    
-    if not user:
+
+
+def parse_user_search(search: Optional[str], mode: str, paging_by_cursor: bool):
+    """(condition, rank) for an admin user search, or (None, None) without one"""
+    if not search or not search.strip():
+        return None, None
+    try:
+        condition, rank = user_search(User, search, mode)
+    except UserSearchError as e:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-    
-    if user.role != "admin":
+    if rank is not None and paging_by_cursor:
         raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Admin access required"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Ranked search results are paged by page number, not cursor"
         )
-    
-    return user
-
+    return condition, rank
 
 # ============================================
 # DASHBOARD - Overview Statistics
@@ -74,74 +75,66 @@ async def get_current_admin(authorization: str = Header(None), db: AsyncSession
 
 @router.get("/dashboard")
 async def get_dashboard_stats(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get dashboard overview statistics"""
     
-    # Total users
-    total_users_result = await db.execute(select(func.count(User.user_id)))
-    total_users = total_users_result.scalar()
-    
-    # New users (last 30 days)
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    new_users_result = await db.execute(
-        select(func.count(User.user_id))
-        .where(User.created_at >= thirty_days_ago)
-    )
-    new_users = new_users_result.scalar()
-    
-    # Total conversations
-    total_conversations_result = await db.execute(select(func.count(Conversation.conversation_id)))
-    total_conversations = total_conversations_result.scalar()
-    
-    # Total messages
-    total_messages_result = await db.execute(select(func.count(Message.message_id)))
-    total_messages = total_messages_result.scalar()
-    
-    # Active subscriptions
-    active_subscriptions_result = await db.execute(
-        text("SELECT COUNT(*) FROM subscriptions WHERE status = 'active'")
+    return await response_cache.get("dashboard", None, load_dashboard_stats, db)
+
+
+async def load_dashboard_stats(db: AsyncSession):
+    # One round-trip against the daily_stats rollup (kept fresh by rollups.py)
+    result = await db.execute(
+        text("""
+            WITH bounds AS (
+                SELECT (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date AS today
+            ),
+            totals AS (
+                SELECT
+                    COALESCE(SUM(ds.new_users), 0) AS total_users,
+                    COALESCE(SUM(ds.new_users) FILTER (WHERE ds.stat_date > b.today - 30), 0) AS new_users,
+                    COALESCE(SUM(ds.new_conversations), 0) AS total_conversations,
+                    COALESCE(SUM(ds.messages), 0) AS total_messages,
+                    COALESCE(SUM(ds.revenue), 0) AS total_revenue
+                FROM daily_stats ds, bounds b
+            ),
+            growth AS (
+                SELECT json_agg(
+                    json_build_object('date', to_char(d.day, 'YYYY-MM-DD'), 'count', COALESCE(ds.new_users, 0))
+                    ORDER BY d.day
+                ) AS user_growth
+                FROM bounds b
+                CROSS JOIN LATERAL generate_series(b.today - 6, b.today, INTERVAL '1 day') AS d(day)
+                LEFT JOIN daily_stats ds ON ds.stat_date = d.day::date
+            )
+            SELECT
+                t.total_users, t.new_users, t.total_conversations, t.total_messages, t.total_revenue,
+                (SELECT COUNT(*) FROM subscriptions WHERE status = 'active') AS active_subscriptions,
+                g.user_growth
+            FROM totals t, growth g
+        """)
     )
-    active_subscriptions = active_subscriptions_result.scalar()
+    row = result.first()
     
-    # Total revenue (from payment_history)
-    revenue_result = await db.execute(
-        text("SELECT COALESCE(SUM(amount), 0) FROM payment_history WHERE status = 'succeeded'")
-    )
-    total_revenue = float(revenue_result.scalar() or 0)
+    total_users = int(row[0])
+    total_messages = int(row[3])
+    user_growth = row[6]
+    if isinstance(user_growth, str):
+        user_growth = json.loads(user_growth)
     
     # Average messages per user
     avg_messages = total_messages / total_users if total_users > 0 else 0
     
-    # User growth (last 7 days)
-    user_growth = []
-    for i in range(6, -1, -1):
-        date = datetime.utcnow() - timedelta(days=i)
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        count_result = await db.execute(
-            select(func.count(User.user_id))
-            .where(User.created_at >= start_of_day)
-            .where(User.created_at < end_of_day)
-        )
-        count = count_result.scalar()
-        
-        user_growth.append({
-            "date": start_of_day.strftime("%Y-%m-%d"),
-            "count": count
-        })
-    
     return {
         "totalUsers": total_users,
-        "newUsers": new_users,
-        "totalConversations": total_conversations,
+        "newUsers": int(row[1]),
+        "totalConversations": int(row[2]),
         "totalMessages": total_messages,
-        "activeSubscriptions": active_subscriptions,
-        "totalRevenue": total_revenue,
+        "activeSubscriptions": row[5],
+        "totalRevenue": float(row[4] or 0),
         "averageMessagesPerUser": round(avg_messages, 2),
-        "userGrowth": user_growth
+        "userGrowth": user_growth or []
     }
 
 
@@ -151,68 +144,66 @@ async def get_dashboard_stats(
 
 @router.get("/users")
 async def get_all_users(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     search: Optional[str] = None,
+    search_mode: str = Query("contains"),
     status: Optional[str] = None
 ):
-    """Get all users with pagination and filters"""
+    """
+    Get all users with pagination and filters
+    Pass the returned nextCursor as `cursor` for constant-cost deep pages.
+    search_mode: contains (substring, ranked by similarity), prefix (email
+    starts with, newest first) or fuzzy (typo-tolerant, ranked by similarity)
+    """
+    
+    after = parse_cursor(cursor)
+    search_condition, rank = parse_user_search(search, search_mode, after is not None)
     
     # Build query
     query = select(User)
     
     # Apply filters
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.where(
-            or_(
-                User.email.ilike(search_pattern),
-                User.first_name.ilike(search_pattern),
-                User.last_name.ilike(search_pattern)
-            )
-        )
+    if search_condition is not None:
+        query = query.where(search_condition)
     
     if status:
         query = query.where(User.account_status == status)
     
-    # Get total count
+    # Get total count (planner estimate unless filtered or asked for)
     count_query = select(func.count()).select_from(query.subquery())
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total, estimated = await resolve_total(
+        db, "users", count_query, None, include_total or search_condition is not None or bool(status)
+    )
     
-    # Apply pagination and ordering
-    query = query.order_by(desc(User.created_at))
-    query = query.offset((page - 1) * limit).limit(limit)
+    # Apply pagination and ordering - best matches first when ranked
+    if rank is not None:
+        query = query.order_by(desc(rank))
+    query = query.order_by(desc(User.created_at), desc(User.user_id))
+    if after:
+        query = query.where(tuple_(User.created_at, User.user_id) < tuple_(*after))
+    else:
+        query = query.offset((page - 1) * limit)
     
     # Execute query
-    result = await db.execute(query)
-    users = result.scalars().all()
+    result = await db.execute(query.limit(limit + 1))
+    users, next_cursor = split_page(result.scalars().all(), limit, lambda u: (u.created_at, u.user_id))
+    if rank is not None:
+        next_cursor = None
+    
+    # Related data for the whole page in one query each
+    user_ids = [user.user_id for user in users]
+    subscriptions = await load_latest_subscriptions(db, user_ids)
+    message_counts = await load_message_counts_by_user(db, user_ids)
     
-    # Get subscription info for each user
     users_data = []
     for user in users:
-        # Get subscription
-        sub_result = await db.execute(
-            text("""
-                SELECT plan_type, status, queries_used, query_limit, current_period_end
-                FROM subscriptions 
-                WHERE user_id = :user_id
-                ORDER BY created_at DESC
-                LIMIT 1
-            """),
-            {"user_id": user.user_id}
-        )
-        subscription = sub_result.first()
-        
-        # Get message count
-        msg_count_result = await db.execute(
-            select(func.count(Message.message_id))
-            .join(Conversation, Message.conversation_id == Conversation.conversation_id)
-            .where(Conversation.user_id == user.user_id)
-        )
-        message_count = msg_count_result.scalar()
+        subscription = subscriptions.get(user.user_id)
+        message_count = message_counts.get(user.user_id, 0)
         
         users_data.append({
             "userId": str(user.user_id),
@@ -237,20 +228,15 @@ async def get_all_users(
     
     return {
         "users": users_data,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "totalPages": (total + limit - 1) // limit
-        }
+        "pagination": build_pagination(page, limit, total, estimated, next_cursor)
     }
 
 
 @router.get("/users/{user_id}")
 async def get_user_details(
     user_id: str,
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get detailed information about a specific user"""
     
@@ -266,20 +252,12 @@ async def get_user_details(
             detail="User not found"
         )
     
-    # Get conversations count
-    conv_count_result = await db.execute(
-        select(func.count(Conversation.conversation_id))
-        .where(Conversation.user_id == uuid.UUID(user_id))
-    )
-    conversation_count = conv_count_result.scalar()
-    
-    # Get messages count
-    msg_count_result = await db.execute(
-        select(func.count(Message.message_id))
-        .join(Conversation, Message.conversation_id == Conversation.conversation_id)
+    # Get conversation and message counts
+    count_result = await db.execute(
+        select(func.count(Conversation.conversation_id), func.coalesce(func.sum(Conversation.message_count), 0))
         .where(Conversation.user_id == uuid.UUID(user_id))
     )
-    message_count = msg_count_result.scalar()
+    conversation_count, message_count = count_result.one()
     
     # Get subscription
     sub_result = await db.execute(
@@ -355,7 +333,7 @@ async def get_user_details(
 async def update_user_status(
     user_id: str,
     status: str,
-    admin: User = Depends(get_current_admin),
+    admin: CurrentUser = Depends(get_current_admin),
     db: AsyncSession = Depends(get_db)
 ):
     """Update user account status (active, suspended, deleted)"""
@@ -378,26 +356,15 @@ async def update_user_status(
         )
     
     user.account_status = status
-    user.updated_at = datetime.utcnow()
+    user.updated_at = datetime.now(timezone.utc)
     await db.commit()
+    await invalidate_user(user.user_id, "dashboard", "subscriptions")
     
-    # Log admin action
-    await db.execute(
-        text("""
-            INSERT INTO admin_logs (log_id, admin_id, action, target_type, target_id, details, created_at)
-            VALUES (:log_id, :admin_id, :action, :target_type, :target_id, :details, :created_at)
-        """),
-        {
-            "log_id": uuid.uuid4(),
-            "admin_id": admin.user_id,
-            "action": "update_user_status",
-            "target_type": "user",
-            "target_id": user.user_id,
-            "details": f'{{"new_status": "{status}"}}',
-            "created_at": datetime.utcnow()
-        }
+    # Log admin action (written with the next write buffer flush)
+    write_buffer.log_admin_action(
+        admin.user_id, "update_user_status", target_type="user", target_id=user.user_id,
+        details={"new_status": status}
     )
-    await db.commit()
     
     return {"message": f"User status updated to {status}"}
 
@@ -408,13 +375,17 @@ async def update_user_status(
 
 @router.get("/conversations")
 async def get_all_conversations(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     user_id: Optional[str] = None
 ):
-    """Get all conversations with pagination"""
+    """Get all conversations with pagination, newest first"""
+    
+    after = parse_cursor(cursor)
     
     query = select(Conversation, User).join(User, Conversation.user_id == User.user_id)
     
@@ -425,30 +396,27 @@ async def get_all_conversations(
     count_query = select(func.count(Conversation.conversation_id))
     if user_id:
         count_query = count_query.where(Conversation.user_id == uuid.UUID(user_id))
-    total_result = await db.execute(count_query)
-    total = total_result.scalar()
+    total, estimated = await resolve_total(db, "conversations", count_query, None, include_total or bool(user_id))
     
     # Apply pagination
-    query = query.order_by(desc(Conversation.last_message_at))
-    query = query.offset((page - 1) * limit).limit(limit)
-    
-    result = await db.execute(query)
-    conversations = result.all()
+    query = query.order_by(desc(Conversation.created_at), desc(Conversation.conversation_id))
+    if after:
+        query = query.where(tuple_(Conversation.created_at, Conversation.conversation_id) < tuple_(*after))
+    else:
+        query = query.offset((page - 1) * limit)
+    
+    result = await db.execute(query.limit(limit + 1))
+    conversations, next_cursor = split_page(
+        result.all(), limit, lambda row: (row[0].created_at, row[0].conversation_id)
+    )
     
     conversations_data = []
     for conv, user in conversations:
-        # Get message count
-        msg_count_result = await db.execute(
-            select(func.count(Message.message_id))
-            .where(Message.conversation_id == conv.conversation_id)
-        )
-        message_count = msg_count_result.scalar()
-        
         conversations_data.append({
             "conversationId": str(conv.conversation_id),
             "title": conv.title,
             "status": conv.status,
-            "messageCount": message_count,
+            "messageCount": conv.message_count or 0,
             "createdAt": conv.created_at.isoformat() if conv.created_at else None,
             "lastMessageAt": conv.last_message_at.isoformat() if conv.last_message_at else None,
             "user": {
@@ -461,20 +429,15 @@ async def get_all_conversations(
     
     return {
         "conversations": conversations_data,
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "totalPages": (total + limit - 1) // limit
-        }
+        "pagination": build_pagination(page, limit, total, estimated, next_cursor)
     }
 
 
 @router.get("/conversations/{conversation_id}/messages")
 async def get_conversation_messages(
     conversation_id: str,
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all messages in a conversation"""
     
@@ -490,11 +453,11 @@ async def get_conversation_messages(
             detail="Conversation not found"
         )
     
-    # Get messages
+    # Get messages, including archived ones of deleted conversations
     result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == uuid.UUID(conversation_id))
-        .order_by(Message.created_at)
+        select(AnyMessage)
+        .where(AnyMessage.conversation_id == uuid.UUID(conversation_id))
+        .order_by(AnyMessage.created_at, AnyMessage.message_id)
     )
     messages = result.scalars().all()
     
@@ -508,6 +471,11 @@ async def get_conversation_messages(
                 "sources": msg.sources,
                 "tokensUsed": msg.tokens_used,
                 "responseTime": msg.response_time,
+                "model": msg.model,
+                "modelRoute": msg.model_route,
+                "promptTokens": msg.prompt_tokens,
+                "completionTokens": msg.completion_tokens,
+                "costUsd": float(msg.cost_usd) if msg.cost_usd is not None else None,
                 "feedback": msg.feedback,
                 "createdAt": msg.created_at.isoformat() if msg.created_at else None
             }
@@ -522,15 +490,38 @@ async def get_conversation_messages(
 
 @router.get("/subscriptions")
 async def get_all_subscriptions(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     status_filter: Optional[str] = None
 ):
     """Get all subscriptions with user details"""
     
-    query = text("""
+    after = parse_cursor(cursor)
+    
+    params = {
+        "page": page, "limit": limit, "cursor": cursor,
+        "include_total": include_total, "status_filter": status_filter
+    }
+    return await response_cache.get(
+        "subscriptions", params,
+        lambda session: load_subscriptions(session, page, limit, after, include_total, status_filter),
+        db
+    )
+
+
+async def load_subscriptions(
+    db: AsyncSession,
+    page: int,
+    limit: int,
+    after,
+    include_total: bool,
+    status_filter: Optional[str]
+):
+    query = """
         SELECT 
             s.subscription_id, s.user_id, s.stripe_customer_id, s.stripe_subscription_id,
             s.plan_type, s.status, s.current_period_start, s.current_period_end,
@@ -538,34 +529,32 @@ async def get_all_subscriptions(
             u.email, u.first_name, u.last_name
         FROM subscriptions s
         JOIN users u ON s.user_id = u.user_id
-        WHERE (:status_filter IS NULL OR s.status = :status_filter)
-        ORDER BY s.created_at DESC
-        LIMIT :limit OFFSET :offset
-    """)
+        WHERE (CAST(:status_filter AS text) IS NULL OR s.status = :status_filter)
+    """
+    params = {"status_filter": status_filter, "limit": limit + 1}
+    
+    if after:
+        query += " AND (s.created_at, s.subscription_id) < (:cursor_time, :cursor_id)"
+        params["cursor_time"], params["cursor_id"] = after
+        query += " ORDER BY s.created_at DESC, s.subscription_id DESC LIMIT :limit"
+    else:
+        query += " ORDER BY s.created_at DESC, s.subscription_id DESC LIMIT :limit OFFSET :offset"
+        params["offset"] = (page - 1) * limit
     
     count_query = text("""
         SELECT COUNT(*)
         FROM subscriptions s
-        WHERE (:status_filter IS NULL OR s.status = :status_filter)
+        WHERE (CAST(:status_filter AS text) IS NULL OR s.status = :status_filter)
     """)
     
     # Get total count
-    count_result = await db.execute(
-        count_query,
-        {"status_filter": status_filter}
+    total, estimated = await resolve_total(
+        db, "subscriptions", count_query, {"status_filter": status_filter}, include_total or bool(status_filter)
     )
-    total = count_result.scalar()
     
     # Get subscriptions
-    result = await db.execute(
-        query,
-        {
-            "status_filter": status_filter,
-            "limit": limit,
-            "offset": (page - 1) * limit
-        }
-    )
-    subscriptions = result.all()
+    result = await db.execute(text(query), params)
+    subscriptions, next_cursor = split_page(result.all(), limit, lambda sub: (sub[10], sub[0]))
     
     return {
         "subscriptions": [
@@ -589,12 +578,7 @@ async def get_all_subscriptions(
             }
             for sub in subscriptions
         ],
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "totalPages": (total + limit - 1) // limit
-        }
+        "pagination": build_pagination(page, limit, total, estimated, next_cursor)
     }
 
 
@@ -604,39 +588,43 @@ async def get_all_subscriptions(
 
 @router.get("/payments")
 async def get_all_payments(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ):
     """Get all payment transactions"""
     
-    query = text("""
+    after = parse_cursor(cursor)
+    
+    query = """
         SELECT 
             p.payment_id, p.user_id, p.stripe_payment_intent_id,
             p.amount, p.currency, p.status, p.payment_method, p.created_at,
             u.email, u.first_name, u.last_name
         FROM payment_history p
         JOIN users u ON p.user_id = u.user_id
-        ORDER BY p.created_at DESC
-        LIMIT :limit OFFSET :offset
-    """)
+    """
+    params = {"limit": limit + 1}
+    
+    if after:
+        query += " WHERE (p.created_at, p.payment_id) < (:cursor_time, :cursor_id)"
+        params["cursor_time"], params["cursor_id"] = after
+        query += " ORDER BY p.created_at DESC, p.payment_id DESC LIMIT :limit"
+    else:
+        query += " ORDER BY p.created_at DESC, p.payment_id DESC LIMIT :limit OFFSET :offset"
+        params["offset"] = (page - 1) * limit
     
     count_query = text("SELECT COUNT(*) FROM payment_history")
     
     # Get total count
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    total, estimated = await resolve_total(db, "payment_history", count_query, None, include_total)
     
     # Get payments
-    result = await db.execute(
-        query,
-        {
-            "limit": limit,
-            "offset": (page - 1) * limit
-        }
-    )
-    payments = result.all()
+    result = await db.execute(text(query), params)
+    payments, next_cursor = split_page(result.all(), limit, lambda payment: (payment[7], payment[0]))
     
     return {
         "payments": [
@@ -657,12 +645,7 @@ async def get_all_payments(
             }
             for payment in payments
         ],
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "totalPages": (total + limit - 1) // limit
-        }
+        "pagination": build_pagination(page, limit, total, estimated, next_cursor)
     }
 
 
@@ -672,58 +655,44 @@ async def get_all_payments(
 
 @router.get("/analytics/usage")
 async def get_usage_analytics(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
-    days: int = Query(30, ge=1, le=365)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
+    days: int = Query(30, ge=1, le=365),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = Query("day"),
+    tz: str = Query("UTC")
 ):
-    """Get usage analytics for the specified period"""
-    
-    start_date = datetime.utcnow() - timedelta(days=days)
+    """
+    Get usage analytics for the specified period
+    Either the last `days` days or an explicit start/end range,
+    bucketed by hour, day, week or month in the given timezone
+    """
     
-    # Daily message counts
-    daily_messages = []
-    for i in range(days - 1, -1, -1):
-        date = datetime.utcnow() - timedelta(days=i)
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
-        
-        count_result = await db.execute(
-            select(func.count(Message.message_id))
-            .where(Message.created_at >= start_of_day)
-            .where(Message.created_at < end_of_day)
+    try:
+        resolve_range(days, start, end, granularity, tz)
+    except AnalyticsRangeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        count = count_result.scalar()
-        
-        daily_messages.append({
-            "date": start_of_day.strftime("%Y-%m-%d"),
-            "count": count
-        })
     
-    # Daily active users
-    daily_active_users = []
-    for i in range(days - 1, -1, -1):
-        date = datetime.utcnow() - timedelta(days=i)
-        start_of_day = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = start_of_day + timedelta(days=1)
+    async def load(session: AsyncSession):
+        # Resolved on every load so background refreshes move the window up to now
+        range_start, range_end, zone = resolve_range(days, start, end, granularity, tz)
+        series = await usage_series(session, range_start, range_end, granularity, zone)
         
-        count_result = await db.execute(
-            select(func.count(func.distinct(User.user_id)))
-            .join(Conversation, User.user_id == Conversation.user_id)
-            .join(Message, Conversation.conversation_id == Message.conversation_id)
-            .where(Message.created_at >= start_of_day)
-            .where(Message.created_at < end_of_day)
-        )
-        count = count_result.scalar()
-        
-        daily_active_users.append({
-            "date": start_of_day.strftime("%Y-%m-%d"),
-            "count": count
-        })
+        return {
+            "granularity": granularity,
+            "timezone": tz,
+            "start": range_start.isoformat(),
+            "end": range_end.isoformat(),
+            "dailyMessages": series["messages"],
+            "dailyActiveUsers": series["activeUsers"]
+        }
     
-    return {
-        "dailyMessages": daily_messages,
-        "dailyActiveUsers": daily_active_users
-    }
+    params = {"days": days, "start": start, "end": end, "granularity": granularity, "tz": tz}
+    return await response_cache.get("usage_analytics", params, load, db)
 
 
 # ============================================
@@ -732,39 +701,43 @@ async def get_usage_analytics(
 
 @router.get("/logs")
 async def get_admin_logs(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db),
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db),
     page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100)
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False
 ):
     """Get admin action logs"""
     
-    query = text("""
+    after = parse_cursor(cursor)
+    
+    query = """
         SELECT 
             l.log_id, l.admin_id, l.action, l.target_type, l.target_id, 
             l.details, l.created_at,
             u.email, u.first_name, u.last_name
         FROM admin_logs l
         JOIN users u ON l.admin_id = u.user_id
-        ORDER BY l.created_at DESC
-        LIMIT :limit OFFSET :offset
-    """)
+    """
+    params = {"limit": limit + 1}
+    
+    if after:
+        query += " WHERE (l.created_at, l.log_id) < (:cursor_time, :cursor_id)"
+        params["cursor_time"], params["cursor_id"] = after
+        query += " ORDER BY l.created_at DESC, l.log_id DESC LIMIT :limit"
+    else:
+        query += " ORDER BY l.created_at DESC, l.log_id DESC LIMIT :limit OFFSET :offset"
+        params["offset"] = (page - 1) * limit
     
     count_query = text("SELECT COUNT(*) FROM admin_logs")
     
     # Get total count
-    count_result = await db.execute(count_query)
-    total = count_result.scalar()
+    total, estimated = await resolve_total(db, "admin_logs", count_query, None, include_total)
     
     # Get logs
-    result = await db.execute(
-        query,
-        {
-            "limit": limit,
-            "offset": (page - 1) * limit
-        }
-    )
-    logs = result.all()
+    result = await db.execute(text(query), params)
+    logs, next_cursor = split_page(result.all(), limit, lambda log: (log[6], log[0]))
     
     return {
         "logs": [
@@ -784,12 +757,98 @@ async def get_admin_logs(
             }
             for log in logs
         ],
-        "pagination": {
-            "page": page,
-            "limit": limit,
-            "total": total,
-            "totalPages": (total + limit - 1) // limit
+        "pagination": build_pagination(page, limit, total, estimated, next_cursor)
+    }
+
+
+# ============================================
+# DATA EXPORTS
+# ============================================
+
+@router.get("/export/{dataset}")
+async def export_data(
+    dataset: str,
+    format: str = Query("csv"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Stream a full table export as CSV or NDJSON, oldest rows first
+    Datasets: users, subscriptions, payments, conversations, messages, logs.
+    Optional start/end bound created_at.
+    """
+    
+    try:
+        _, media_type, extension = resolve_export(dataset, format)
+    except ExportError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    # Log admin action before any data leaves
+    await db.execute(
+        text("""
+            INSERT INTO admin_logs (log_id, admin_id, action, target_type, target_id, details, created_at)
+            VALUES (:log_id, :admin_id, :action, :target_type, NULL, :details, :created_at)
+        """),
+        {
+            "log_id": uuid.uuid4(),
+            "admin_id": admin.user_id,
+            "action": "export_data",
+            "target_type": dataset,
+            "details": json.dumps({
+                "format": format,
+                "start": start.isoformat() if start else None,
+                "end": end.isoformat() if end else None
+            }),
+            "created_at": datetime.now(timezone.utc)
         }
+    )
+    await db.commit()
+    
+    filename = f"{dataset}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{extension}"
+    return StreamingResponse(
+        stream_export(dataset, format, start, end),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+# ============================================
+# RUNTIME METRICS
+# ============================================
+
+@router.get("/metrics")
+async def get_runtime_metrics(
+    admin: CurrentUser = Depends(get_current_admin)
+):
+    """Get in-process runtime metrics for this worker"""
+    
+    return {
+        "passwordHashing": password_hasher.get_stats(),
+        "tokenCache": token_cache.get_stats(),
+        "userCache": user_cache.get_stats(),
+        "tokenRevocation": revocation_store.get_stats(),
+        "rateLimits": {
+            "user": user_rate_limiter.get_stats(),
+            "ip": ip_rate_limiter.get_stats()
+        },
+        "quota": quota_tracker.get_stats(),
+        "writeBuffer": write_buffer.get_stats(),
+        "dailyStats": daily_stats_aggregator.get_stats(),
+        "messageArchive": message_archiver.get_stats(),
+        "dbRouting": read_router.get_stats(),
+        "dbRoundTrips": round_trip_stats.get_stats(),
+        "dbPools": get_pool_stats(),
+        "dbWarmup": pool_warmer.get_stats(),
+        "responseCache": response_cache.get_stats(),
+        "cacheInvalidation": invalidation_listener.get_stats(),
+        "lazyImports": import_warmer.get_stats(),
+        "llm": llm_client.get_stats(),
+        "modelRouting": route_stats.get_stats()
     }
 
 
@@ -798,13 +857,17 @@ async def get_admin_logs(
 async def get_uploaded_files(
     page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    include_total: bool = False,
     user_id: Optional[str] = None,
     conversation_id: Optional[str] = None,
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get all uploaded files with user and conversation info"""
     
+    after = parse_cursor(cursor)
+    
     # Build query
     query = """
         SELECT 
@@ -839,12 +902,17 @@ async def get_uploaded_files(
         query += " AND uf.conversation_id = :conversation_id"
         params['conversation_id'] = uuid.UUID(conversation_id)
     
-    query += " ORDER BY uf.created_at DESC LIMIT :limit OFFSET :offset"
-    params['limit'] = limit
-    params['offset'] = (page - 1) * limit
+    if after:
+        query += " AND (uf.created_at, uf.file_id) < (:cursor_time, :cursor_id)"
+        params['cursor_time'], params['cursor_id'] = after
+        query += " ORDER BY uf.created_at DESC, uf.file_id DESC LIMIT :limit"
+    else:
+        query += " ORDER BY uf.created_at DESC, uf.file_id DESC LIMIT :limit OFFSET :offset"
+        params['offset'] = (page - 1) * limit
+    params['limit'] = limit + 1
     
     result = await db.execute(text(query), params)
-    rows = result.all()
+    rows, next_cursor = split_page(result.all(), limit, lambda row: (row[8], row[0]))
     
     files = []
     for row in rows:
@@ -879,27 +947,27 @@ async def get_uploaded_files(
         count_query += " AND uf.conversation_id = :conversation_id"
         count_params['conversation_id'] = uuid.UUID(conversation_id)
     
-    count_result = await db.execute(text(count_query), count_params)
-    total = count_result.scalar() or 0
+    total, estimated = await resolve_total(
+        db, "user_files", text(count_query), count_params, include_total or bool(count_params)
+    )
     
     return {
         'files': files,
-        'pagination': {
-            'page': page,
-            'limit': limit,
-            'total': total,
-            'totalPages': (total + limit - 1) // limit if total else 0
-        }
+        'pagination': build_pagination(page, limit, total, estimated, next_cursor)
     }
 
 
 @router.get('/files/stats')
 async def get_file_stats(
-    admin: User = Depends(get_current_admin),
-    db: AsyncSession = Depends(get_db)
+    admin: CurrentUser = Depends(get_current_admin),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get file upload statistics"""
     
+    return await response_cache.get("file_stats", None, load_file_stats, db)
+
+
+async def load_file_stats(db: AsyncSession):
     query = """
         SELECT 
             COUNT(*) as total_files,
@@ -928,7 +996,7 @@ async def get_file_stats(
 # @router.get('/files/{file_id}/download-url')
 # async def get_file_download_url(
 #     file_id: str,
-#     admin: User = Depends(get_current_admin),
+#     admin: CurrentUser = Depends(get_current_admin),
 #     db: AsyncSession = Depends(get_db)
 # ):
 #     """Generate a pre-signed download URL for a file"""
@@ -937,7 +1005,7 @@ async def get_file_stats(
 # @router.delete('/files/{file_id}')
 # async def delete_file(
 #     file_id: str,
-#     admin: User = Depends(get_current_admin),
+#     admin: CurrentUser = Depends(get_current_admin),
 #     db: AsyncSession = Depends(get_db)
 # ):
 #     """Delete a file from storage"""
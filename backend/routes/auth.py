@@ -7,14 +7,22 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, Column, String, Boolean, DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import declarative_base
-from passlib.context import CryptContext
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from jose import JWTError, jwt
 from pydantic import BaseModel, EmailStr
+from typing import Optional
 import uuid
 
-from database import get_db
+from database import get_db, get_read_db
 from email_service import send_password_reset_email
+from security import (
+    hash_password, verify_password, password_needs_rehash, PasswordHasherBusy,
+    SECRET_KEY, ALGORITHM
+)
+from dependencies import get_current_user_id, get_bearer_token, get_token_payload
+from token_revocation import revocation_store
+from cache_invalidation import invalidate_user
+from write_buffer import write_buffer
 
 # User model (must be defined before use)
 Base = declarative_base()
@@ -31,18 +39,19 @@ class User(Base):
     role = Column(String(20))
     account_status = Column(String(20))
     email_verified = Column(Boolean)
-    created_at = Column(DateTime)
-    updated_at = Column(DateTime)
-    last_login_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    last_login_at = Column(DateTime(timezone=True))
 
-router = APIRouter(prefix="/auth", tags=["auth"])
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+def user_by_email(email: str):
+    """User lookup for login, signup and password reset (prepared at startup, see db_warmup)"""
+    return select(User).where(User.email == email)
+
+
+router = APIRouter(prefix="/auth", tags=["auth"])
 
 # JWT settings
-SECRET_KEY = "juridik-ai-secret-key-2026-change-this-in-production"
-ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 30
 
@@ -80,33 +89,39 @@ class RefreshTokenRequest(BaseModel):
     refresh_token: str
 
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+def raise_hasher_busy():
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Server is busy, please try again",
+        headers={"Retry-After": "1"}
+    )
 
 
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire, "type": "access"})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire, "iat": now, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def create_refresh_token(data: dict) -> str:
     to_encode = data.copy()
-    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire, "type": "refresh"})
+    now = datetime.now(timezone.utc)
+    expire = now + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode.update({"exp": expire, "iat": now, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
 def create_reset_token(email: str) -> str:
     """Create a password reset token that expires in 1 hour"""
-    expire = datetime.utcnow() + timedelta(hours=1)
+    expire = datetime.now(timezone.utc) + timedelta(hours=1)
     to_encode = {"sub": email, "exp": expire, "type": "reset"}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -128,7 +143,7 @@ async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
     
     # Check if user already exists
     result = await db.execute(
-        select(User).where(User.email == request.email)
+        user_by_email(request.email)
     )
     existing_user = result.scalar_one_or_none()
     
@@ -138,24 +153,28 @@ async def signup(request: SignupRequest, db: AsyncSession = Depends(get_db)):
             detail="Email already registered"
         )
     
+    try:
+        password_hash = await hash_password(request.password)
+    except PasswordHasherBusy:
+        raise_hasher_busy()
+    
     # Create new user
     user = User(
         user_id=uuid.uuid4(),
         email=request.email,
-        password_hash=hash_password(request.password),
+        password_hash=password_hash,
         first_name=request.first_name,
         last_name=request.last_name,
         phone=request.phone,
         role="user",
         account_status="active",
         email_verified=False,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        created_at=datetime.now(timezone.utc),
+        updated_at=datetime.now(timezone.utc)
     )
     
     db.add(user)
     await db.commit()
-    await db.refresh(user)
     
     # Create access and refresh tokens
     token_data = {"sub": str(user.user_id), "email": user.email}
@@ -182,19 +201,28 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     
     # Find user
     result = await db.execute(
-        select(User).where(User.email == request.email)
+        user_by_email(request.email)
     )
     user = result.scalar_one_or_none()
     
-    if not user or not verify_password(request.password, user.password_hash):
+    try:
+        password_ok = user is not None and await verify_password(request.password, user.password_hash)
+        
+        # Upgrade hashes made with an old cost factor while we have the plain password
+        if password_ok and password_needs_rehash(user.password_hash):
+            user.password_hash = await hash_password(request.password)
+    except PasswordHasherBusy:
+        raise_hasher_busy()
+    
+    if not password_ok:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password"
         )
     
-    # Update last login
-    user.last_login_at = datetime.utcnow()
-    await db.commit()
+    # Update last login (written with the next write buffer flush). A rehashed
+    # password is committed by get_db.
+    write_buffer.record_login(user.user_id)
     
     # Create access and refresh tokens
     token_data = {"sub": str(user.user_id), "email": user.email}
@@ -215,28 +243,13 @@ async def login(request: LoginRequest, db: AsyncSession = Depends(get_db)):
     }
 
 
-from fastapi import Header
-
 @router.get("/me")
 async def get_current_user(
-    authorization: str = Header(None),
-    db: AsyncSession = Depends(get_db)
+    user_id: str = Depends(get_current_user_id),
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get current user info"""
     
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid authorization header")
-    
-    token = authorization.replace("Bearer ", "")
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
     result = await db.execute(
         select(User).where(User.user_id == uuid.UUID(user_id))
     )
@@ -278,6 +291,12 @@ async def refresh_token(request: RefreshTokenRequest, db: AsyncSession = Depends
                 detail="Invalid token"
             )
         
+        if revocation_store.is_revoked(request.refresh_token, payload):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Token has been revoked"
+            )
+        
         # Verify user still exists
         result = await db.execute(
             select(User).where(User.user_id == uuid.UUID(user_id))
@@ -311,7 +330,7 @@ async def forgot_password(request: ForgotPasswordRequest, db: AsyncSession = Dep
     
     # Find user
     result = await db.execute(
-        select(User).where(User.email == request.email)
+        user_by_email(request.email)
     )
     user = result.scalar_one_or_none()
     
@@ -342,7 +361,7 @@ async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depen
     
     # Find user
     result = await db.execute(
-        select(User).where(User.email == email)
+        user_by_email(email)
     )
     user = result.scalar_one_or_none()
     
@@ -353,78 +372,50 @@ async def reset_password(request: ResetPasswordRequest, db: AsyncSession = Depen
         )
     
     # Update password
-    user.password_hash = hash_password(request.new_password)
-    user.updated_at = datetime.utcnow()
+    try:
+        user.password_hash = await hash_password(request.new_password)
+    except PasswordHasherBusy:
+        raise_hasher_busy()
+    user.updated_at = datetime.now(timezone.utc)
     await db.commit()
     
     return {"message": "Password successfully reset"}
 
 
 @router.post("/logout")
-async def logout(authorization: str = Header(None)):
+async def logout(
+    request: Optional[LogoutRequest] = None,
+    token: str = Depends(get_bearer_token),
+    payload: dict = Depends(get_token_payload),
+    db: AsyncSession = Depends(get_db)
+):
     """
     Logout user - invalidate token
-    Since we're using JWT, the actual token invalidation happens on client side
-    This endpoint exists for consistency and can be extended for token blacklisting
+    Revokes the access token and, if supplied, the matching refresh token
     """
     
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing or invalid authorization header"
-        )
-    
-    token = authorization.replace("Bearer ", "")
+    await revocation_store.revoke_token(db, token, payload)
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
-    
-    # TODO: Add token to blacklist if implementing token blacklisting
-    # For now, client-side token removal is sufficient
+    if request and request.refresh_token:
+        try:
+            refresh_payload = jwt.decode(request.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
+        except JWTError:
+            refresh_payload = None
+        
+        # Only revoke refresh tokens that belong to the caller
+        if refresh_payload and refresh_payload.get("sub") == payload["sub"]:
+            await revocation_store.revoke_token(db, request.refresh_token, refresh_payload)
     
     return {"message": "Successfully logged out"}
 
 
 @router.delete("/account")
 async def delete_account(
-    authorization: str = Header(None),
+    user_id: str = Depends(get_current_user_id),
     db: AsyncSession = Depends(get_db)
 ):
     """Delete user account permanently"""
     
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing or invalid authorization header"
-        )
-    
-    token = authorization.replace("Bearer ", "")
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
-    
     # Find and delete user
     result = await db.execute(
         select(User).where(User.user_id == uuid.UUID(user_id))
@@ -440,6 +431,10 @@ async def delete_account(
     # Delete user (cascading deletes will handle related data)
     await db.delete(user)
     await db.commit()
+    await invalidate_user(user_id, "dashboard", "subscriptions")
+    
+    # Outstanding access and refresh tokens must stop working too
+    await revocation_store.revoke_user(db, user_id, REFRESH_TOKEN_EXPIRE_DAYS * 24 * 3600)
     
     return {"message": "Account successfully deleted"}
 
@@ -2,26 +2,32 @@
 Conversation and Message routes for Juridik AI
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Header, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, Column, String, Integer, DateTime, Text, func, desc
+from sqlalchemy import select, update, Column, String, Integer, Numeric, DateTime, Text, func, desc, tuple_
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import declarative_base
 from pydantic import BaseModel
-from datetime import datetime
-from jose import JWTError, jwt
+from datetime import datetime, timezone
 import uuid
 import os
+import math
 import json
+import time
+import asyncio
 from typing import List, Optional
-from openai import OpenAI
 
-from database import get_db
-from file_processing import FileProcessor
+from database import get_db, get_read_db
+from dependencies import get_current_user_id, admit_chat_message
+from file_processing import FileProcessor, FileTooLargeError
+from pagination import InvalidCursorError, decode_cursor, split_page
 from firebase_storage import upload_file as firebase_upload, is_storage_enabled
-
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from write_buffer import write_buffer
+from rate_limiting import quota_tracker
+from llm_client import llm_client, LLMUnavailableError
+from model_routing import route_turn, route_stats, completion_cost
 
 # Models
 Base = declarative_base()
@@ -34,14 +40,12 @@ class Conversation(Base):
     title = Column(String(255))
     status = Column(String(20))
     message_count = Column(Integer)
-    created_at = Column(DateTime)
-    updated_at = Column(DateTime)
-    last_message_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    last_message_at = Column(DateTime(timezone=True))
 
 
-class Message(Base):
-    __tablename__ = "messages"
-    
+class MessageColumns:
     message_id = Column(UUID(as_uuid=True), primary_key=True)
     conversation_id = Column(UUID(as_uuid=True), nullable=False)
     role = Column(String(20), nullable=False)
@@ -51,7 +55,41 @@ class Message(Base):
     tokens_used = Column(Integer)
     response_time = Column(Integer)
     feedback = Column(String(20))
-    created_at = Column(DateTime)
+    created_at = Column(DateTime(timezone=True))
+    model = Column(String(50))
+    model_route = Column(String(20))
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    cost_usd = Column(Numeric(12, 6))
+
+
+class Message(MessageColumns, Base):
+    __tablename__ = "messages"
+
+
+# Read-only: live and archived messages together (all_messages view)
+class AnyMessage(MessageColumns, Base):
+    __tablename__ = "all_messages"
+
+
+# Hot queries (prepared on every pooled connection at startup, see db_warmup)
+def owned_conversation(conversation_id: uuid.UUID, user_id: uuid.UUID):
+    """The conversation, if it belongs to the user"""
+    return (
+        select(Conversation)
+        .where(Conversation.conversation_id == conversation_id)
+        .where(Conversation.user_id == user_id)
+    )
+
+
+def latest_messages(conversation_id: uuid.UUID, limit: int):
+    """A conversation's newest messages first - chat history pages and model context"""
+    return (
+        select(Message)
+        .where(Message.conversation_id == conversation_id)
+        .order_by(desc(Message.created_at), desc(Message.message_id))
+        .limit(limit)
+    )
 
 
 # Pydantic schemas
@@ -79,49 +117,23 @@ class ConversationResponse(BaseModel):
 # Router
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
-# JWT settings (should match auth.py)
-SECRET_KEY = "juridik-ai-secret-key-2026-change-this-in-production"
-ALGORITHM = "HS256"
-
-
-async def get_current_user_id(authorization: str = Header(None)) -> str:
-    """Extract user ID from JWT token"""
-    if not authorization or not authorization.startswith("Bearer "):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Missing or invalid authorization header"
-        )
-    
-    token = authorization.replace("Bearer ", "")
-    
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
-            )
-        return user_id
-    except JWTError:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid token"
-        )
-
-
 @router.get("")
 async def get_conversations(
+    limit: int = Query(100, ge=1, le=500),
     user_id: str = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all conversations for the current user"""
+    """
+    Get the current user's conversations, most recently active first
+    Bounded by limit, so the newest are read off the index in order however many there are
+    """
     
     result = await db.execute(
         select(Conversation)
         .where(Conversation.user_id == uuid.UUID(user_id))
         .where(Conversation.status == "active")
         .order_by(desc(Conversation.last_message_at))
+        .limit(limit)
     )
     conversations = result.scalars().all()
     
@@ -150,13 +162,12 @@ async def create_conversation(
         title="New Conversation",
         status="active",
         message_count=0,
-        created_at=datetime.utcnow(),
-        updated_at=datetime.utcnow()
+        created_at=datetime.now(timezone.utc),
+        updated_at=datetime.now(timezone.utc)
     )
     
     db.add(conversation)
     await db.commit()
-    await db.refresh(conversation)
     
     return {
         "id": str(conversation.conversation_id),
@@ -171,14 +182,12 @@ async def create_conversation(
 async def get_conversation(
     conversation_id: str,
     user_id: str = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
     """Get a specific conversation"""
     
     result = await db.execute(
-        select(Conversation)
-        .where(Conversation.conversation_id == uuid.UUID(conversation_id))
-        .where(Conversation.user_id == uuid.UUID(user_id))
+        owned_conversation(uuid.UUID(conversation_id), uuid.UUID(user_id))
     )
     conversation = result.scalar_one_or_none()
     
@@ -206,9 +215,7 @@ async def delete_conversation(
     """Delete a conversation"""
     
     result = await db.execute(
-        select(Conversation)
-        .where(Conversation.conversation_id == uuid.UUID(conversation_id))
-        .where(Conversation.user_id == uuid.UUID(user_id))
+        owned_conversation(uuid.UUID(conversation_id), uuid.UUID(user_id))
     )
     conversation = result.scalar_one_or_none()
     
@@ -228,16 +235,28 @@ async def delete_conversation(
 @router.get("/{conversation_id}/messages")
 async def get_messages(
     conversation_id: str,
+    response: Response,
+    limit: int = Query(100, ge=1, le=500),
+    before: Optional[str] = None,
     user_id: str = Depends(get_current_user_id),
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_read_db)
 ):
-    """Get all messages for a conversation"""
+    """
+    Get the latest messages for a conversation, oldest first
+    When older messages exist, the X-Next-Cursor header holds a cursor to pass as `before`
+    """
+    
+    try:
+        after = decode_cursor(before) if before else None
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     
     # Verify conversation belongs to user
     conv_result = await db.execute(
-        select(Conversation)
-        .where(Conversation.conversation_id == uuid.UUID(conversation_id))
-        .where(Conversation.user_id == uuid.UUID(user_id))
+        owned_conversation(uuid.UUID(conversation_id), uuid.UUID(user_id))
     )
     conversation = conv_result.scalar_one_or_none()
     
@@ -247,13 +266,17 @@ async def get_messages(
             detail="Conversation not found"
         )
     
-    # Get messages
-    result = await db.execute(
-        select(Message)
-        .where(Message.conversation_id == uuid.UUID(conversation_id))
-        .order_by(Message.created_at)
-    )
-    messages = result.scalars().all()
+    # Get one page of messages, newest first, then flip for display
+    query = latest_messages(uuid.UUID(conversation_id), limit + 1)
+    if after:
+        query = query.where(tuple_(Message.created_at, Message.message_id) < tuple_(*after))
+    
+    result = await db.execute(query)
+    messages, next_cursor = split_page(result.scalars().all(), limit, lambda m: (m.created_at, m.message_id))
+    messages.reverse()
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     
     return [
         {
@@ -268,39 +291,88 @@ async def get_messages(
     ]
 
 
+async def reject_turn(user_id: str, status_code: int, detail: str) -> HTTPException:
+    """The error for a message turned away, with the query admit_chat_message reserved given back"""
+    await quota_tracker.release(user_id)
+    return HTTPException(status_code=status_code, detail=detail)
+
+
 @router.post("/{conversation_id}/messages")
 async def send_message(
     conversation_id: str,
-    content: str = Form(...),
-    files: List[UploadFile] = File(None),
-    user_id: str = Depends(get_current_user_id),
+    request: Request,
+    user_id: str = Depends(admit_chat_message),
     db: AsyncSession = Depends(get_db)
 ):
-    """Send a message and get AI response (with optional file attachments)"""
+    """
+    Send a message and get AI response (with optional file attachments)
+    Takes a multipart form with `content` and any number of `files`. The form
+    is read here, after admit_chat_message - declared as Form/File parameters
+    it would be parsed, uploads and all, before a throttled client is refused
+    """
+    try:
+        form = await request.form()
+    except StarletteHTTPException:
+        # A malformed body, or one UploadSizeLimit cut off
+        await quota_tracker.release(user_id)
+        raise
+    
+    try:
+        content = form.get("content")
+        if not isinstance(content, str):
+            raise await reject_turn(user_id, status.HTTP_422_UNPROCESSABLE_ENTITY, "Message content is required")
+        files = [file for file in form.getlist("files") if isinstance(file, UploadFile)]
+        return await answer_message(conversation_id, content, files, user_id, db)
+    finally:
+        await form.close()
+
+
+async def answer_message(
+    conversation_id: str,
+    content: str,
+    files: List[UploadFile],
+    user_id: str,
+    db: AsyncSession
+):
+    """Store the user's message and the AI's answer to it"""
     
     # Verify conversation belongs to user
     conv_result = await db.execute(
-        select(Conversation)
-        .where(Conversation.conversation_id == uuid.UUID(conversation_id))
-        .where(Conversation.user_id == uuid.UUID(user_id))
+        owned_conversation(uuid.UUID(conversation_id), uuid.UUID(user_id))
     )
     conversation = conv_result.scalar_one_or_none()
     
-    if not conversation:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Conversation not found"
-        )
+    # A deleted conversation is archived - its messages are on their way to
+    # messages_archive, and new ones would be left behind
+    if not conversation or conversation.status == "archived":
+        raise await reject_turn(user_id, status.HTTP_404_NOT_FOUND, "Conversation not found")
+    
+    # Get conversation history for context
+    history_result = await db.execute(
+        latest_messages(uuid.UUID(conversation_id), 10)  # Last 10 messages for context
+    )
+    history_messages = list(reversed(history_result.scalars().all()))
+    
+    # End the read transaction - files and the AI call take seconds, and an
+    # idle transaction would hold its connection and snapshot all that time.
+    # Both messages are inserted together once the answer is in
+    await db.commit()
     
     # Process uploaded files if any
     processed_files = []
     extracted_texts = []
     
     if files:
+        if len(files) > FileProcessor.MAX_FILES_PER_MESSAGE:
+            raise await reject_turn(
+                user_id, status.HTTP_400_BAD_REQUEST,
+                f"Too many files. Maximum is {FileProcessor.MAX_FILES_PER_MESSAGE} per message"
+            )
+        
         for file in files:
             try:
-                # Read file content
-                file_content = await file.read()
+                # Read file content, rejecting bad uploads before buffering them fully
+                file_content = await FileProcessor.read_upload(file)
                 
                 # Process the file
                 file_data = FileProcessor.process_file(
@@ -341,10 +413,15 @@ async def send_message(
                     except Exception as e:
                         print(f"Firebase upload failed, continuing without storage: {e}")
                 
+            except FileTooLargeError as e:
+                raise await reject_turn(
+                    user_id, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    f"Failed to process file '{file.filename}': {str(e)}"
+                )
             except Exception as e:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Failed to process file '{file.filename}': {str(e)}"
+                raise await reject_turn(
+                    user_id, status.HTTP_400_BAD_REQUEST,
+                    f"Failed to process file '{file.filename}': {str(e)}"
                 )
     
     # Save user message
@@ -354,81 +431,102 @@ async def send_message(
         role="user",
         content=content,
         attached_documents=processed_files if processed_files else [],
-        created_at=datetime.utcnow()
+        created_at=datetime.now(timezone.utc)
     )
-    db.add(user_message)
     
     # Generate AI response using OpenAI
-    try:
-        # Get conversation history for context
-        history_result = await db.execute(
-            select(Message)
-            .where(Message.conversation_id == uuid.UUID(conversation_id))
-            .order_by(Message.created_at)
-            .limit(10)  # Last 10 messages for context
-        )
-        history_messages = history_result.scalars().all()
-        
-        # Build conversation context
-        system_prompt = (
-            "You are Anna, a knowledgeable Swedish legal AI assistant. "
-            "You help users understand Swedish law and legal matters. "
-            "Provide clear, accurate, and helpful legal information. "
-            "Always remind users to consult a qualified lawyer for specific legal advice. "
-            "Respond in the same language the user uses (Swedish or English)."
+    started = time.perf_counter()
+    
+    # Build conversation context
+    system_prompt = (
+        "You are Anna, a knowledgeable Swedish legal AI assistant. "
+        "You help users understand Swedish law and legal matters. "
+        "Provide clear, accurate, and helpful legal information. "
+        "Always remind users to consult a qualified lawyer for specific legal advice. "
+        "Respond in the same language the user uses (Swedish or English)."
+    )
+    
+    # If user uploaded documents, add instructions for document analysis
+    if extracted_texts:
+        system_prompt += (
+            "\n\nThe user has uploaded document(s). Analyze the documents carefully and answer questions based on their content. "
+            "Reference specific parts of the documents in your response when relevant."
         )
-        
-        # If user uploaded documents, add instructions for document analysis
-        if extracted_texts:
-            system_prompt += (
-                "\n\nThe user has uploaded document(s). Analyze the documents carefully and answer questions based on their content. "
-                "Reference specific parts of the documents in your response when relevant."
-            )
-        
-        messages_for_ai = [{"role": "system", "content": system_prompt}]
-        
-        # Add conversation history
-        for msg in history_messages:
-            messages_for_ai.append({
-                "role": msg.role,
-                "content": msg.content
-            })
-        
-        # Build current user message with document context
-        current_message = content
-        
-        # Add document content to the message
-        if extracted_texts:
-            current_message += "\n\n--- ATTACHED DOCUMENTS ---\n"
-            for doc in extracted_texts:
-                current_message += f"\n[File: {doc['filename']}]\n"
-                # Use chunking for better context
-                context = FileProcessor.create_context_for_ai(doc['chunks'], content)
-                current_message += context + "\n"
-        
+    
+    messages_for_ai = [{"role": "system", "content": system_prompt}]
+    
+    # Add conversation history
+    for msg in history_messages:
         messages_for_ai.append({
-            "role": "user",
-            "content": current_message
+            "role": msg.role,
+            "content": msg.content
         })
-        
-        # Call OpenAI API
-        response = openai_client.chat.completions.create(
-            model="gpt-4o-mini",  # Using mini for cost efficiency
+    
+    # Build current user message with document context
+    current_message = content
+    
+    # Add document content to the message
+    if extracted_texts:
+        current_message += "\n\n--- ATTACHED DOCUMENTS ---\n"
+        for doc in extracted_texts:
+            current_message += f"\n[File: {doc['filename']}]\n"
+            # Use chunking for better context
+            context = FileProcessor.create_context_for_ai(doc['chunks'], content)
+            current_message += context + "\n"
+    
+    messages_for_ai.append({
+        "role": "user",
+        "content": current_message
+    })
+    
+    # Pick model, max_tokens and timeout for this turn (see model_routing.py) -
+    # counting the tokens of long documents takes a while, so not on the event loop
+    decision = await asyncio.to_thread(route_turn, messages_for_ai, content, bool(extracted_texts))
+    policy = decision.policy
+    
+    # Call OpenAI API - retried on transient errors, see llm_client.py
+    llm_started = time.perf_counter()
+    try:
+        response = await llm_client.chat_completion(
+            model=policy.model,
             messages=messages_for_ai,
-            temperature=0.7,
-            max_tokens=1500  # Increased for document analysis
+            temperature=policy.temperature,
+            max_tokens=policy.max_tokens,
+            timeout=policy.timeout_seconds,
+            latency_key=decision.route
         )
-        
-        assistant_content = response.choices[0].message.content
-        tokens_used = response.usage.total_tokens if response.usage else 0
-        
     except Exception as e:
         print(f"OpenAI API Error: {e}")
-        assistant_content = (
-            "I apologize, but I'm having trouble processing your request right now. "
-            "Please try again in a moment."
+        route_stats.record_failure(decision.route)
+        # Nothing is saved and the query is not charged; the client can resend
+        await quota_tracker.release(user_id)
+        write_buffer.record_query(
+            user_id, conversation_id, None, content,
+            response_generated=False,
+            error_message=str(e),
+            processing_time=int((time.perf_counter() - started) * 1000)
+        )
+        if not isinstance(e, LLMUnavailableError):
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="The AI service could not answer this request."
+            )
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The AI service is temporarily unavailable. Please try again in a moment.",
+            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))} if e.retry_after else None
         )
-        tokens_used = 0
+    
+    latency_ms = int((time.perf_counter() - llm_started) * 1000)
+    assistant_content = response.choices[0].message.content
+    tokens_used = response.usage.total_tokens if response.usage else 0
+    prompt_tokens = response.usage.prompt_tokens if response.usage else decision.prompt_tokens
+    completion_tokens = response.usage.completion_tokens if response.usage else 0
+    cost = completion_cost(response.model or policy.model, prompt_tokens, completion_tokens)
+    route_stats.record(
+        decision.route, latency_ms, prompt_tokens, completion_tokens, cost,
+        truncated=response.choices[0].finish_reason == "length"
+    )
     
     # Save assistant message
     assistant_message = Message(
@@ -438,25 +536,38 @@ async def send_message(
         content=assistant_content,
         sources=[],
         tokens_used=tokens_used,
-        created_at=datetime.utcnow()
+        response_time=latency_ms,
+        model=response.model or policy.model,
+        model_route=decision.route,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+        cost_usd=cost,
+        created_at=datetime.now(timezone.utc)
     )
-    db.add(assistant_message)
-    
-    # Update conversation
-    conversation.message_count = (conversation.message_count or 0) + 2
-    conversation.last_message_at = datetime.utcnow()
-    conversation.updated_at = datetime.utcnow()
+    db.add_all([user_message, assistant_message])
+    await db.flush()
     
-    # Generate title from first message
-    if conversation.message_count == 2:
-        title = content[:50] + ("..." if len(content) > 50 else "")
-        if processed_files:
-            title = f"📎 {title}"  # Add file indicator
-        conversation.title = title
+    # message_count and last_message_at are kept up to date by the messages
+    # triggers. Generate title from first message - the count is read in the
+    # same UPDATE, so concurrent sends cannot both see a fresh conversation
+    title = content[:50] + ("..." if len(content) > 50 else "")
+    if processed_files:
+        title = f"📎 {title}"  # Add file indicator
+    await db.execute(
+        update(Conversation)
+        .where(Conversation.conversation_id == conversation.conversation_id)
+        .where(Conversation.message_count == 2)
+        .values(title=title)
+        .execution_options(synchronize_session=False)
+    )
     
     await db.commit()
-    await db.refresh(user_message)
-    await db.refresh(assistant_message)
+    
+    write_buffer.record_query(
+        user_id, conversation_id, assistant_message.message_id, content,
+        response_generated=True,
+        processing_time=int((time.perf_counter() - started) * 1000)
+    )
     
     return {
         "userMessage": {
@@ -0,0 +1,296 @@
+"""
+Security helpers for Juridik AI
+Password hashing runs in a bounded thread pool so bcrypt never blocks the event loop,
+and verified JWTs and user roles are cached per worker
+"""
+
+import os
+import time
+import uuid
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from jose import jwt
+
+
+# ============================================
+# PASSWORD HASHING
+# ============================================
+
+# bcrypt cost factor - hashes made with a different cost are upgraded on login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+
+def get_pwd_context():
+    """The bcrypt CryptContext, created on first use - passlib is only needed by login and signup"""
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+                _pwd_context = CryptContext(
+                    schemes=["bcrypt"],
+                    deprecated="auto",
+                    bcrypt__default_rounds=BCRYPT_ROUNDS,
+                    bcrypt__min_rounds=BCRYPT_ROUNDS,
+                    bcrypt__max_rounds=BCRYPT_ROUNDS,
+                )
+    return _pwd_context
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hashing jobs are already queued"""
+
+
+class PasswordHasher:
+    """Runs bcrypt work in a dedicated, size-limited thread pool"""
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Metrics
+        self.pending = 0  # queued + running
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.peak_pending = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created lazily so the pool is never shared across a fork
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return self._executor
+
+    async def run(self, func, *args):
+        """Run func(*args) in the pool, failing fast when the queue is full"""
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Password hashing queue is full")
+            self.pending += 1
+            self.peak_pending = max(self.peak_pending, self.pending)
+
+        submitted_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.running += 1
+                self.total_wait_ms += (started_at - submitted_at) * 1000
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.total_run_ms += (time.perf_counter() - started_at) * 1000
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), job)
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def get_stats(self) -> Dict:
+        """Queue depth and timing metrics"""
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.max_workers,
+                "maxPending": self.max_pending,
+                "pending": self.pending,
+                "queued": self.pending - self.running,
+                "running": self.running,
+                "peakPending": self.peak_pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avgWaitMs": round(self.total_wait_ms / completed, 2),
+                "avgRunMs": round(self.total_run_ms / completed, 2),
+            }
+
+    def shutdown(self):
+        """Stop the worker threads (call on app shutdown)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING)
+
+
+async def hash_password(password: str) -> str:
+    return await password_hasher.run(get_pwd_context().hash, password)
+
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run(get_pwd_context().verify, plain_password, hashed_password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True if the hash was made with a different scheme or cost factor"""
+    return get_pwd_context().needs_update(hashed_password)
+
+
+# ============================================
+# JWT TOKENS
+# ============================================
+
+SECRET_KEY = "juridik-ai-secret-key-2026-change-this-in-production"
+ALGORITHM = "HS256"
+
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", 4096))
+
+
+class TokenCache:
+    """LRU cache of verified JWT payloads, keyed by token hash and bounded by exp"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def get(self, token: str) -> Optional[dict]:
+        key = self._key(token)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is None:
+                self.misses += 1
+                return None
+            exp = payload.get("exp")
+            if exp is not None and exp <= time.time():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return payload
+
+    def put(self, token: str, payload: dict):
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._entries), "maxSize": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a JWT and return its payload, using the cache for repeat tokens
+    Raises JWTError if the token is invalid or expired
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.put(token, payload)
+    return payload
+
+
+# ============================================
+# USER / ROLE CACHE
+# ============================================
+
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 4096))
+
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """Snapshot of the authenticated user's identity and role"""
+    user_id: uuid.UUID
+    email: str
+    role: str
+    account_status: str
+
+
+class UserCache:
+    """Short-TTL cache of user snapshots with explicit invalidation"""
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str) -> Optional[CurrentUser]:
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                self._entries.pop(user_id, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user: CurrentUser):
+        with self._lock:
+            key = str(user.user_id)
+            self._entries[key] = (user, time.monotonic() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        """Drop a user so the next request reloads them from the database"""
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "ttlSeconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_SIZE)
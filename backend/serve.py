@@ -0,0 +1,72 @@
+"""
+Production launcher for Juridik AI
+Runs the API in WEB_CONCURRENCY uvicorn worker processes - one per available
+core by default - sharing one listening socket.
+
+Each worker is a fresh interpreter that imports main.py itself, so the
+database engines, the OpenAI client and Firebase are created per worker, and
+DB_MAX_CONNECTIONS / DB_READ_MAX_CONNECTIONS are divided between the workers
+(see database.pool_limits). On SIGTERM, workers stop accepting connections and
+let in-flight requests - chat completions included - finish for up to
+SHUTDOWN_DRAIN_SECONDS before the shutdown hooks flush the write buffer and
+close the pools.
+
+Per-worker state is kept consistent between workers: the query quota is
+reserved in the database (rate_limiting.QuotaTracker), the rate limiters each
+take 1/WEB_CONCURRENCY of the configured rates, and cache invalidations reach
+every worker through cache_invalidation.py.
+
+Run from the backend directory:
+    python serve.py
+"""
+
+import os
+
+import uvicorn
+
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", 8000))
+# Under the platform's own grace period (30s on Render) before it sends SIGKILL
+SHUTDOWN_DRAIN_SECONDS = int(os.getenv("SHUTDOWN_DRAIN_SECONDS", 25))
+
+
+def available_cpus() -> int:
+    """Cores this process may use - the container's CPU quota if it has one"""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            return max(1, int(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def worker_count() -> int:
+    return max(1, int(os.getenv("WEB_CONCURRENCY") or available_cpus()))
+
+
+def main():
+    workers = worker_count()
+    # Workers read this to take their share of the connection budget
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    print(f"Starting {workers} worker(s) on {HOST}:{PORT}")
+
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=workers,
+        # X-Forwarded-For is trusted only from the addresses in the
+        # FORWARDED_ALLOW_IPS environment variable (uvicorn's default: 127.0.0.1)
+        proxy_headers=True,
+        timeout_graceful_shutdown=SHUTDOWN_DRAIN_SECONDS,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Query-count regression tests for admin listing endpoints
+A page must cost a constant number of queries, whatever its size
+"""
+
+import sys
+import os
+import asyncio
+import uuid
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "jose", "passlib", "openai", "dotenv", "email_validator"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from routes import admin
+
+
+class FakeResult:
+    def __init__(self, rows, objects):
+        self._rows = rows
+        self._objects = objects
+    
+    def scalar(self):
+        return len(self._objects) or len(self._rows)
+    
+    def scalars(self):
+        return SimpleNamespace(all=lambda: list(self._objects))
+    
+    def all(self):
+        return list(self._rows)
+    
+    def first(self):
+        return self._rows[0] if self._rows else None
+
+
+class CountingSession:
+    """Stands in for AsyncSession and counts round-trips"""
+    
+    def __init__(self, rows=(), objects=()):
+        self.rows = list(rows)
+        self.objects = list(objects)
+        self.queries = 0
+    
+    async def execute(self, statement, params=None):
+        self.queries += 1
+        return FakeResult(self.rows, self.objects)
+
+
+def make_user():
+    return SimpleNamespace(
+        user_id=uuid.uuid4(), email="user@example.se", first_name="Anna", last_name="Svensson",
+        phone=None, role="user", account_status="active", email_verified=True,
+        created_at=datetime.utcnow(), last_login_at=None
+    )
+
+
+def make_conversation(user):
+    return SimpleNamespace(
+        conversation_id=uuid.uuid4(), user_id=user.user_id, title="Hyresavtal", status="active",
+        message_count=4, created_at=datetime.utcnow(), last_message_at=datetime.utcnow()
+    )
+
+
+def count_user_page_queries(page_size):
+    db = CountingSession(objects=[make_user() for _ in range(page_size)])
+    asyncio.run(admin.get_all_users(admin=None, db=db, page=1, limit=100, search=None, status=None))
+    return db.queries
+
+
+def count_conversation_page_queries(page_size):
+    pairs = []
+    for _ in range(page_size):
+        user = make_user()
+        pairs.append((make_conversation(user), user))
+    db = CountingSession(rows=pairs)
+    asyncio.run(admin.get_all_conversations(admin=None, db=db, page=1, limit=100, user_id=None))
+    return db.queries
+
+
+def test_user_listing_query_count_is_constant():
+    assert count_user_page_queries(1) == count_user_page_queries(100) == 4
+
+
+def test_conversation_listing_query_count_is_constant():
+    assert count_conversation_page_queries(1) == count_conversation_page_queries(100) == 2
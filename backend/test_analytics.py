@@ -0,0 +1,51 @@
+"""
+Tests for analytics time range resolution
+"""
+
+import sys
+import os
+from datetime import datetime, timezone
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analytics import resolve_range, format_bucket, AnalyticsRangeError
+
+
+NOW = datetime(2026, 3, 15, 10, 30, tzinfo=timezone.utc)
+
+
+def test_default_range_starts_at_local_midnight():
+    start, end, tz = resolve_range(7, None, None, "day", "Europe/Stockholm", now=NOW)
+    
+    assert end == NOW
+    local_start = start.astimezone(tz)
+    assert (local_start.year, local_start.month, local_start.day, local_start.hour) == (2026, 3, 9, 0)
+    assert start == datetime(2026, 3, 8, 23, 0, tzinfo=timezone.utc)
+
+
+def test_naive_bounds_are_interpreted_in_the_requested_timezone():
+    start, end, _ = resolve_range(30, datetime(2026, 1, 1), datetime(2026, 2, 1), "week", "Europe/Stockholm", now=NOW)
+    assert start.utcoffset().total_seconds() == 3600
+    assert end > start
+
+
+def test_invalid_input_is_rejected():
+    for args in [
+        (30, None, None, "minute", "UTC"),
+        (30, None, None, "day", "Mars/Olympus"),
+        (30, datetime(2026, 2, 1), datetime(2026, 1, 1), "day", "UTC"),
+        (365, datetime(2020, 1, 1), datetime(2026, 1, 1), "hour", "UTC"),
+    ]:
+        try:
+            resolve_range(*args, now=NOW)
+            assert False, f"accepted {args}"
+        except AnalyticsRangeError:
+            pass
+
+
+def test_bucket_labels():
+    bucket = datetime(2026, 3, 15, 10)
+    assert format_bucket(bucket, "hour") == "2026-03-15T10:00"
+    assert format_bucket(bucket, "day") == "2026-03-15"
+    assert format_bucket(bucket, "month") == "2026-03"
@@ -0,0 +1,83 @@
+"""
+Tests for read/write session routing
+"""
+
+import sys
+import os
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "dotenv"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+
+from database import ReadRouter
+
+
+def make_router(has_replica=True, sticky_seconds=10.0, max_users=100):
+    return ReadRouter(has_replica, sticky_seconds, max_users, max_lag_seconds=5.0)
+
+
+def test_without_replica_everything_reads_from_primary():
+    router = make_router(has_replica=False)
+    router.mark_write("user-1")
+
+    assert router.use_primary("user-1")
+    assert router.use_primary(None)
+    assert router.get_stats()["stickyUsers"] == 0
+
+
+def test_recent_writer_reads_own_writes_from_primary():
+    router = make_router()
+    router.mark_write("user-1")
+
+    assert router.use_primary("user-1")
+    assert not router.use_primary("user-2")
+    assert not router.use_primary(None)
+
+    stats = router.get_stats()
+    assert (stats["stickyReads"], stats["replicaReads"]) == (1, 2)
+
+
+def test_stickiness_expires():
+    router = make_router(sticky_seconds=0.01)
+    router.mark_write("user-1")
+    time.sleep(0.02)
+
+    assert not router.use_primary("user-1")
+    assert router.get_stats()["stickyUsers"] == 0
+
+
+def test_lagging_or_unreachable_replica_falls_back_to_primary():
+    router = make_router()
+    router.replica_healthy = False
+
+    assert router.use_primary("user-2")
+    assert router.get_stats()["lagFallbacks"] == 1
+
+
+def test_recent_writers_are_bounded():
+    router = make_router(max_users=2)
+    for user_id in ("user-1", "user-2", "user-3"):
+        router.mark_write(user_id)
+
+    assert router.get_stats()["stickyUsers"] == 2
+    assert not router.use_primary("user-1")
+    assert router.use_primary("user-3")
+
+
+def test_write_time_echoed_by_the_client_keeps_reads_on_primary():
+    # Another worker took the write; this one only sees the header
+    router = make_router(sticky_seconds=10.0)
+
+    assert router.use_primary("user-1", f"{time.time() - 1:.3f}")
+    assert not router.use_primary("user-1", f"{time.time() - 11:.3f}")
+    assert not router.use_primary("user-1", "not-a-time")
+    # A forged time in the future does not pin reads to the primary
+    assert not router.use_primary("user-1", f"{time.time() + 3600:.3f}")
+    assert router.get_stats()["stickyReads"] == 1
@@ -0,0 +1,74 @@
+"""
+Tests for admin export formatting
+"""
+
+import sys
+import os
+import csv
+import io
+import json
+import uuid
+from datetime import datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from exports import EXPORT_DATASETS, resolve_export, format_rows, format_header, chunk_query, ExportError
+
+
+PAYMENT = (
+    uuid.UUID("00000000-0000-0000-0000-000000000001"), uuid.UUID("00000000-0000-0000-0000-000000000002"),
+    None, "pi_123", Decimal("199.00"), "SEK", "succeeded", "card",
+    datetime(2026, 3, 1, 12, 0, tzinfo=timezone.utc),
+)
+
+
+def test_every_dataset_keys_on_its_first_column_and_created_at():
+    for name, spec in EXPORT_DATASETS.items():
+        selected = [part.strip() for part in spec.select.split(",")]
+        assert len(selected) == len(spec.columns), name
+        assert selected[0] == spec.id_column
+        assert selected[spec.columns.index("createdAt")] == spec.time_column
+
+
+def test_csv_rows_round_trip():
+    spec = EXPORT_DATASETS["payments"]
+    text = format_header(spec, "csv") + format_rows(spec, "csv", [PAYMENT])
+
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert rows[0]["amount"] == "199.0"
+    assert rows[0]["subscriptionId"] == ""
+    assert rows[0]["createdAt"] == "2026-03-01T12:00:00+00:00"
+
+
+def test_ndjson_has_one_object_per_line():
+    spec = EXPORT_DATASETS["messages"]
+    row = (uuid.uuid4(), uuid.uuid4(), "user", "Hej,\n\"världen\"", [{"title": "SFS"}], 12,
+           datetime(2026, 3, 1, tzinfo=timezone.utc))
+
+    text = format_header(spec, "ndjson") + format_rows(spec, "ndjson", [row, row])
+
+    lines = text.splitlines()
+    assert len(lines) == 2
+    record = json.loads(lines[0])
+    assert record["content"] == "Hej,\n\"världen\""
+    assert record["sources"] == [{"title": "SFS"}]
+
+
+def test_chunk_query_only_includes_requested_bounds():
+    spec = EXPORT_DATASETS["messages"]
+
+    assert ":after_time" not in chunk_query(spec, False, False, False)
+    sql = chunk_query(spec, True, True, True)
+    assert "(created_at, message_id) > (:after_time, :after_id)" in sql
+    assert "created_at >= :start" in sql and "created_at < :end" in sql
+    assert sql.endswith("ORDER BY created_at, message_id LIMIT :chunk_rows")
+
+
+@pytest.mark.parametrize("dataset, fmt", [("passwords", "csv"), ("users", "xlsx")])
+def test_unknown_dataset_or_format_is_rejected(dataset, fmt):
+    with pytest.raises(ExportError):
+        resolve_export(dataset, fmt)
@@ -5,22 +5,61 @@ Run this to verify file processing works correctly
 
 import sys
 import os
+import asyncio
 
-# Add parent directory to path
+import pytest
+
+# Add parent directory and the benchmark documents to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from file_processing import FileProcessor, FileTooLargeError
+from documents import make_text, make_pdf, make_docx
 
-from file_processing import FileProcessor
+
+class FakeUpload:
+    """Minimal stand-in for FastAPI's UploadFile"""
+    
+    def __init__(self, content: bytes, content_type: str, filename: str, size=None):
+        self._buffer = content
+        self.content_type = content_type
+        self.filename = filename
+        self.size = size
+        self.bytes_read = 0
+    
+    async def read(self, size: int = -1) -> bytes:
+        if size < 0:
+            size = len(self._buffer) - self.bytes_read
+        chunk = self._buffer[self.bytes_read:self.bytes_read + size]
+        self.bytes_read += len(chunk)
+        return chunk
 
 
 def test_pdf_processing():
     """Test PDF file processing"""
     print("Testing PDF processing...")
-    # You would need a sample PDF file to test
-    # with open('sample.pdf', 'rb') as f:
-    #     content = f.read()
-    #     result = FileProcessor.process_file(content, 'application/pdf', 'sample.pdf')
-    #     print(f"Extracted {result['word_count']} words in {result['chunk_count']} chunks")
-    print("(Skipped - add sample PDF file to test)")
+    pytest.importorskip("pdfplumber")
+    
+    content = make_pdf(3)
+    result = FileProcessor.process_file(content, 'application/pdf', 'avtal.pdf')
+    assert "§ 1 " in result['extracted_text']
+    assert "uppsägning" in result['extracted_text'].lower()
+    assert result['word_count'] == len(make_text(3).split())
+    assert result['chunk_count'] == len(FileProcessor.chunk_text(result['extracted_text']))
+    print(f"✓ Extracted {result['word_count']} words in {result['chunk_count']} chunks")
+
+
+def test_docx_processing():
+    """Test DOCX file processing"""
+    print("\nTesting DOCX processing...")
+    pytest.importorskip("docx")
+    
+    content = make_docx(3)
+    result = FileProcessor.process_file(
+        content, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'avtal.docx'
+    )
+    assert result['extracted_text'] == make_text(3)
+    print(f"✓ Extracted {result['word_count']} words in {result['chunk_count']} chunks")
 
 
 def test_txt_processing():
@@ -83,6 +122,95 @@ def test_validation():
         print(f"✓ Valid file accepted")
 
 
+def test_upload_prevalidation():
+    """Test early rejection of uploads before they are fully read"""
+    print("\nTesting upload pre-validation...")
+    
+    # Declared size over the limit is rejected without reading anything
+    upload = FakeUpload(b"%PDF-1.4", 'application/pdf', 'big.pdf', size=FileProcessor.MAX_FILE_SIZE + 1)
+    try:
+        asyncio.run(FileProcessor.read_upload(upload))
+        assert False, "Oversized declared upload accepted"
+    except FileTooLargeError as e:
+        assert upload.bytes_read == 0
+        print(f"✓ Oversized declared upload rejected: {e}")
+    
+    # Content that does not match the declared type is rejected after the sniff
+    upload = FakeUpload(b"MZ\x90\x00" + b"\x00" * 100000, 'application/pdf', 'fake.pdf')
+    try:
+        asyncio.run(FileProcessor.read_upload(upload))
+        assert False, "Bogus PDF accepted"
+    except ValueError as e:
+        assert upload.bytes_read <= FileProcessor.SNIFF_SIZE
+        print(f"✓ Bogus PDF rejected: {e}")
+    
+    is_valid, _ = FileProcessor.sniff_file_type(b"PK\x03\x04rest", 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    assert is_valid
+    is_valid, _ = FileProcessor.sniff_file_type(b"%PDF-1.7", 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+    assert not is_valid
+    print("✓ DOCX magic bytes checked")
+    
+    # Streams without a declared size are abandoned once they pass the limit
+    upload = FakeUpload(b"a" * (FileProcessor.MAX_FILE_SIZE * 2), 'text/plain', 'stream.txt')
+    try:
+        asyncio.run(FileProcessor.read_upload(upload))
+        assert False, "Oversized stream accepted"
+    except FileTooLargeError:
+        assert upload.bytes_read <= FileProcessor.MAX_FILE_SIZE + FileProcessor.READ_CHUNK_SIZE
+        print("✓ Oversized stream aborted mid-read")
+    
+    # A valid upload is read in full
+    upload = FakeUpload(b"%PDF-1.4\n" + b"0" * 200000, 'application/pdf', 'ok.pdf')
+    content = asyncio.run(FileProcessor.read_upload(upload))
+    assert len(content) == 200009
+    print("✓ Valid upload read completely")
+
+
+def test_chunked_uploads_are_cut_off_at_the_request_limit(monkeypatch):
+    """A body without Content-Length is counted as it streams in"""
+    pytest.importorskip("fastapi")
+    pytest.importorskip("httpx")
+    from typing import List
+    from fastapi import FastAPI, File, Form, UploadFile
+    from fastapi.testclient import TestClient
+    from file_processing import UploadSizeLimit
+    
+    monkeypatch.setattr(FileProcessor, "max_request_size", staticmethod(lambda: 64 * 1024))
+    handled = []
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimit)
+    
+    @app.post("/api/conversations/c1/messages")
+    async def send_message(content: str = Form(...), files: List[UploadFile] = File(None)):
+        handled.append(content)
+        return {"ok": True}
+    
+    def multipart(size: int):
+        body = (
+            b'--b\r\nContent-Disposition: form-data; name="content"\r\n\r\nhej\r\n'
+            b'--b\r\nContent-Disposition: form-data; name="files"; filename="a.txt"\r\n'
+            b'Content-Type: text/plain\r\n\r\n' + b"a" * size + b'\r\n--b--\r\n'
+        )
+        for start in range(0, len(body), 8192):
+            yield body[start:start + 8192]
+    
+    client = TestClient(app)
+    headers = {"Content-Type": "multipart/form-data; boundary=b"}
+    
+    response = client.post("/api/conversations/c1/messages", content=multipart(1024), headers=headers)
+    assert response.status_code == 200
+    
+    response = client.post("/api/conversations/c1/messages", content=multipart(200 * 1024), headers=headers)
+    assert response.status_code == 413
+    assert handled == ["hej"]
+    
+    response = client.post(
+        "/api/conversations/c1/messages", content=b"x" * (65 * 1024),
+        headers={**headers, "Content-Length": str(65 * 1024)}
+    )
+    assert response.status_code == 413
+
+
 def test_context_creation():
     """Test AI context creation"""
     print("\nTesting AI context creation...")
@@ -109,9 +237,11 @@ if __name__ == "__main__":
     print("=" * 60)
     
     test_validation()
+    test_upload_prevalidation()
     test_txt_processing()
     test_context_creation()
-    # test_pdf_processing()  # Uncomment when you have sample PDF
+    test_pdf_processing()
+    test_docx_processing()
     
     print("\n" + "=" * 60)
     print("Testing complete!")
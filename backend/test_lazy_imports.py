@@ -0,0 +1,40 @@
+"""
+Tests for deferred imports of heavy dependencies
+"""
+
+import sys
+import os
+import subprocess
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from lazy_imports import optional_import, import_warmer, HEAVY_MODULES
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_missing_module_returns_none():
+    assert optional_import("not_a_real_module_xyz") is None
+    assert "not_a_real_module_xyz" in import_warmer.get_stats()["missing"]
+
+
+def test_installed_module_is_returned_and_timed():
+    module = optional_import("json")
+    assert module is sys.modules["json"]
+    assert "json" in import_warmer.get_stats()["importMs"]
+
+
+def test_importing_main_leaves_heavy_modules_unloaded():
+    for module in ("fastapi", "sqlalchemy", "asyncpg", "jose", "dotenv"):
+        pytest.importorskip(module)
+
+    env = dict(os.environ, DATABASE_URL="postgresql+asyncpg://localhost/juridik_ai_test", OPENAI_API_KEY="sk-test")
+    result = subprocess.run(
+        [sys.executable, "-c", f"import sys, main; print([m for m in {HEAVY_MODULES!r} if m in sys.modules])"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,97 @@
+"""
+Tests for the OpenAI client's retries, circuit breaker and hedging
+"""
+
+import sys
+import os
+import asyncio
+from collections import deque
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from llm_client import ResilientLLMClient, CircuitBreaker, LLMUnavailableError
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def make_client(outcomes, delays=None, **options):
+    """A client whose requests return or raise `outcomes` in order, after `delays` seconds"""
+    options.setdefault("retry_base", 0.001)
+    options.setdefault("retry_max", 0.001)
+    client = ResilientLLMClient(**options)
+    outcomes, delays = list(outcomes), list(delays or [])
+
+    async def request(kwargs, timeout):
+        outcome = outcomes.pop(0)
+        await asyncio.sleep(delays.pop(0) if delays else 0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    client._request = request
+    return client
+
+
+def test_retries_transient_errors():
+    client = make_client([UpstreamError(503), UpstreamError(429), "answer"], max_retries=2)
+
+    assert asyncio.run(client.chat_completion(model="m", messages=[])) == "answer"
+    stats = client.get_stats()
+    assert (stats["attempts"], stats["retries"], stats["successes"]) == (3, 2, 1)
+
+
+def test_gives_up_after_max_retries():
+    client = make_client([UpstreamError(500)] * 3, max_retries=1)
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(client.chat_completion(model="m", messages=[]))
+    assert client.get_stats()["attempts"] == 2
+
+
+def test_does_not_retry_bad_requests():
+    client = make_client([UpstreamError(400), "answer"], max_retries=2)
+
+    with pytest.raises(UpstreamError):
+        asyncio.run(client.chat_completion(model="m", messages=[]))
+    assert client.get_stats()["attempts"] == 1
+    assert client.breaker.state == "closed"
+
+
+def test_breaker_fails_fast_then_recovers():
+    breaker = CircuitBreaker(window=4, min_calls=4, error_rate=0.5, open_seconds=0.05)
+    client = make_client([UpstreamError(502)] * 4 + ["answer"], max_retries=0, breaker=breaker)
+
+    for _ in range(4):
+        with pytest.raises(LLMUnavailableError):
+            asyncio.run(client.chat_completion(model="m", messages=[]))
+    assert breaker.state == "open"
+
+    # Rejected without a request while open
+    with pytest.raises(LLMUnavailableError) as rejected:
+        asyncio.run(client.chat_completion(model="m", messages=[]))
+    assert rejected.value.retry_after > 0
+    assert client.get_stats()["attempts"] == 4
+
+    # After open_seconds one trial call goes through and closes the breaker
+    asyncio.run(asyncio.sleep(0.06))
+    assert asyncio.run(client.chat_completion(model="m", messages=[])) == "answer"
+    assert breaker.state == "closed"
+
+
+def test_hedges_slow_requests():
+    client = make_client(
+        ["slow", "fast"], delays=[1.0, 0.01],
+        hedge_enabled=True, hedge_min_samples=1, hedge_min_ms=0
+    )
+    client._latencies_ms["m"] = deque([50])
+
+    assert asyncio.run(client.chat_completion(model="m", messages=[])) == "fast"
+    stats = client.get_stats()
+    assert (stats["hedges"], stats["hedgeWins"]) == (1, 1)
@@ -0,0 +1,75 @@
+"""
+Tests for the load-test stand-ins for OpenAI and Firebase Storage
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory and the load-test scripts to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "loadtest"))
+
+for module in ("fastapi", "httpx", "openai"):
+    pytest.importorskip(module)
+
+from fastapi.testclient import TestClient
+from openai import OpenAI
+
+from fake_services import FakeSettings, create_app
+
+FAST = FakeSettings(latency_ms=0, tokens_per_second=100000, completion_tokens=20, jitter=0, storage_latency_ms=0)
+
+
+def fake_openai(settings=FAST):
+    client = TestClient(create_app(settings))
+    return client, OpenAI(base_url="http://testserver/v1", api_key="sk-test", http_client=client, max_retries=0)
+
+
+def test_completion_parses_with_the_openai_client():
+    fakes, openai = fake_openai()
+    response = openai.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "Vad gäller?"}], max_tokens=5
+    )
+    assert len(response.choices[0].message.content.split()) == 5
+    assert response.usage.completion_tokens == 5
+    assert fakes.get("/_stats").json()["completions"] == 1
+
+
+def test_streamed_completion_ends_with_usage():
+    _, openai = fake_openai()
+    stream = openai.chat.completions.create(
+        model="gpt-4o-mini", messages=[{"role": "user", "content": "Vad gäller?"}],
+        stream=True, stream_options={"include_usage": True}
+    )
+    chunks = list(stream)
+    text = "".join(chunk.choices[0].delta.content or "" for chunk in chunks if chunk.choices)
+    assert len(text.split()) == 20
+    assert chunks[-1].usage.completion_tokens == 20
+
+
+def test_error_rate_returns_server_errors():
+    from openai import InternalServerError
+
+    _, openai = fake_openai(FakeSettings(latency_ms=0, error_rate=1.0, jitter=0))
+    with pytest.raises(InternalServerError):
+        openai.chat.completions.create(model="gpt-4o-mini", messages=[{"role": "user", "content": "Hej"}])
+
+
+def test_multipart_upload_is_stored():
+    fakes = TestClient(create_app(FAST))
+    boundary = "===============123=="
+    body = (
+        f"--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n"
+        '{"name": "user-uploads/a.txt", "contentType": "text/plain"}\r\n'
+        f"--{boundary}\r\nContent-Type: text/plain\r\n\r\nhello world\r\n"
+        f"--{boundary}--"
+    ).encode()
+    response = fakes.post(
+        "/upload/storage/v1/b/bucket/o?uploadType=multipart", content=body,
+        headers={"Content-Type": f'multipart/related; boundary="{boundary}"'}
+    )
+    assert response.json()["size"] == "11"
+    assert fakes.get("/storage/v1/b/bucket/o/user-uploads/a.txt").status_code == 200
+    assert fakes.delete("/storage/v1/b/bucket/o/user-uploads/a.txt").status_code == 204
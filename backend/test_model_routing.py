@@ -0,0 +1,72 @@
+"""
+Tests for per-turn model routing and its cost accounting
+"""
+
+import sys
+import os
+from decimal import Decimal
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from model_routing import (
+    classify, route_turn, load_policy, completion_cost, RouteStats,
+    QUICK, STANDARD, ANALYSIS, DOCUMENT, ROUTING_POLICY
+)
+
+
+@pytest.mark.parametrize("content, has_attachments, route", [
+    ("Hej!", False, QUICK),
+    ("Tack så mycket för hjälpen :)", False, QUICK),
+    ("Hej, vad gäller vid uppsägning av hyresavtal?", False, STANDARD),
+    ("Kan du granska det här avtalet och jämföra med hyreslagen?", False, ANALYSIS),
+    ("Write me a draft appeal against the decision", False, ANALYSIS),
+    ("Hej!", True, DOCUMENT),
+    ("Vad står det om uppsägning?", True, DOCUMENT),
+])
+def test_classifies_turns(content, has_attachments, route):
+    assert classify(content, 200, has_attachments)[0] == route
+
+
+def test_long_prompts_go_to_analysis():
+    assert classify("Och vad gäller då?", 50_000, False)[0] == ANALYSIS
+
+
+def test_route_turn_uses_the_route_policy():
+    messages = [{"role": "system", "content": "Du är Anna."}, {"role": "user", "content": "Hej"}]
+    decision = route_turn(messages, "Hej", False)
+
+    assert decision.route == QUICK
+    assert decision.policy == ROUTING_POLICY[QUICK]
+    assert 0 < decision.prompt_tokens < 30
+    assert ROUTING_POLICY[DOCUMENT].max_tokens > ROUTING_POLICY[STANDARD].max_tokens
+
+
+def test_policy_overrides_are_merged():
+    policy = load_policy('{"document": {"model": "gpt-4o", "max_tokens": 6000}}')
+    assert (policy[DOCUMENT].model, policy[DOCUMENT].max_tokens) == ("gpt-4o", 6000)
+    assert policy[DOCUMENT].timeout_seconds == ROUTING_POLICY[DOCUMENT].timeout_seconds
+
+    with pytest.raises(ValueError):
+        load_policy('{"premium": {"model": "gpt-4o"}}')
+
+
+def test_completion_cost_matches_dated_snapshots():
+    assert completion_cost("gpt-4o-mini", 1_000_000, 1_000_000) == Decimal("0.75")
+    assert completion_cost("gpt-4o-mini-2024-07-18", 1000, 500) == Decimal("0.00045")
+    assert completion_cost("gpt-4o-2024-08-06", 1000, 0) == Decimal("0.0025")
+    assert completion_cost("some-local-model", 1000, 500) is None
+
+
+def test_route_stats_accumulate_per_route():
+    stats = RouteStats()
+    stats.record(QUICK, 300, 100, 20, Decimal("0.000027"))
+    stats.record(DOCUMENT, 9000, 12000, 3800, Decimal("0.00408"), truncated=True)
+    stats.record_failure(DOCUMENT)
+
+    routes = stats.get_stats()["routes"]
+    assert routes[QUICK]["calls"] == 1 and routes[QUICK]["latencyMs"]["p50"] == 300
+    assert (routes[DOCUMENT]["failures"], routes[DOCUMENT]["truncated"]) == (1, 1)
+    assert routes[DOCUMENT]["costUsd"] == pytest.approx(0.00408)
@@ -0,0 +1,53 @@
+"""
+Tests for keyset pagination cursors
+"""
+
+import sys
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+from pagination import encode_cursor, decode_cursor, split_page, build_pagination, InvalidCursorError
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2026, 3, 15, 10, 30, 0, 123456, tzinfo=timezone.utc)
+    row_id = uuid.uuid4()
+
+    cursor = encode_cursor(created_at, row_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", encode_cursor(datetime(2026, 1, 1), "x")])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidCursorError):
+        decode_cursor(cursor)
+
+
+def test_split_page_returns_cursor_only_when_more_rows_exist():
+    rows = [(datetime(2026, 1, day, tzinfo=timezone.utc), uuid.uuid4()) for day in range(5, 0, -1)]
+
+    page, next_cursor = split_page(rows, 4, lambda row: row)
+    assert len(page) == 4
+    assert decode_cursor(next_cursor) == rows[3]
+
+    page, next_cursor = split_page(rows, 5, lambda row: row)
+    assert len(page) == 5
+    assert next_cursor is None
+
+
+def test_build_pagination_marks_estimates():
+    pagination = build_pagination(2, 50, 101, True, "abc")
+    assert pagination["totalPages"] == 3
+    assert pagination["totalIsEstimate"] is True
+    assert pagination["nextCursor"] == "abc"
+    assert build_pagination(1, 50, 0, False, None)["totalPages"] == 0
@@ -0,0 +1,234 @@
+"""
+Query plan regression tests for the hot paths
+Runs the real route queries against a seeded Postgres and fails when a hot
+query sequentially scans a large table or sorts instead of walking an index
+
+Needs TEST_DATABASE_URL pointing at a scratch database with database/schema.sql
+and the migrations applied; skipped otherwise. Seed rows are inserted in a
+transaction that is rolled back at the end.
+
+    TEST_DATABASE_URL=postgresql+asyncpg://localhost/juridik_ai_test pytest test_query_plans.py
+"""
+
+import sys
+import os
+import json
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "jose", "passlib", "openai", "dotenv", "email_validator"):
+    pytest.importorskip(module)
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if not TEST_DATABASE_URL:
+    pytest.skip("TEST_DATABASE_URL not set", allow_module_level=True)
+
+os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+
+from fastapi import Response
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from pagination import encode_cursor
+from response_cache import response_cache
+from routes import admin, conversations
+
+
+HOT_TABLES = {"users", "conversations", "messages", "subscriptions", "payment_history", "admin_logs"}
+SORT_NODES = {"Sort", "Incremental Sort"}
+
+SEED_USERS = 3000
+CONVERSATIONS_PER_USER = 10
+HOT_CONVERSATION_MESSAGES = 5000
+# The hot user's sidebar - a few conversations are sorted in memory whatever
+# the query, so the plan that matters is the one for a user with many
+HOT_USER_CONVERSATIONS = 2000
+
+
+class PlanCapturingSession:
+    """Wraps an AsyncSession and records the EXPLAIN plan of every query it runs"""
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+        self.plans = []
+
+    async def execute(self, statement, params=None):
+        connection = await self.session.connection()
+        compiled = statement.compile(dialect=connection.dialect)
+        bound = compiled.construct_params(params or {})
+        values = [bound[name] for name in compiled.positiontup]
+
+        raw = await connection.get_raw_connection()
+        plan = await raw.driver_connection.fetchval(f"EXPLAIN (FORMAT JSON) {compiled.string}", *values)
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        self.plans.append((compiled.string, plan[0]["Plan"]))
+
+        return await self.session.execute(statement, params)
+
+
+async def seed(conn):
+    # Seed rows are backdated up to a few months
+    await conn.execute(text("SELECT ensure_messages_partitions(NOW() - INTERVAL '1 year', 3)"))
+    await conn.execute(text("""
+        INSERT INTO users (email, password_hash, first_name, last_name, created_at)
+        SELECT 'user' || g || '@example.se', 'x', 'Anna', 'Svensson', NOW() - g * INTERVAL '1 hour'
+        FROM generate_series(1, :users) AS g
+    """), {"users": SEED_USERS})
+    await conn.execute(text("""
+        INSERT INTO conversations (user_id, title, status, created_at, last_message_at)
+        SELECT u.user_id, 'Fråga ' || g,
+               CASE WHEN g % 5 = 0 THEN 'archived' ELSE 'active' END,
+               u.created_at + g * INTERVAL '1 minute', u.created_at + g * INTERVAL '2 minutes'
+        FROM users u CROSS JOIN generate_series(1, :per_user) AS g
+    """), {"per_user": CONVERSATIONS_PER_USER})
+    await conn.execute(text("""
+        INSERT INTO messages (conversation_id, role, content, created_at)
+        SELECT c.conversation_id, CASE WHEN g % 2 = 0 THEN 'assistant' ELSE 'user' END, 'Hej', c.created_at + g * INTERVAL '1 second'
+        FROM conversations c CROSS JOIN generate_series(1, 2) AS g
+    """))
+    await conn.execute(text("""
+        INSERT INTO subscriptions (user_id, status, created_at)
+        SELECT user_id, 'active', created_at FROM users
+    """))
+    await conn.execute(text("""
+        INSERT INTO payment_history (user_id, amount, status, created_at)
+        SELECT user_id, 199, 'succeeded', created_at + g * INTERVAL '30 days'
+        FROM users CROSS JOIN generate_series(1, 2) AS g
+    """))
+    await conn.execute(text("""
+        INSERT INTO admin_logs (admin_id, action, created_at)
+        SELECT user_id, 'update_user_status', created_at FROM users
+    """))
+
+    # One long conversation for the chat history paths
+    hot = (await conn.execute(text("""
+        SELECT c.user_id, c.conversation_id FROM conversations c
+        JOIN users u ON u.user_id = c.user_id
+        WHERE u.email = 'user1@example.se' AND c.status = 'active'
+        LIMIT 1
+    """))).first()
+    await conn.execute(text("""
+        INSERT INTO messages (conversation_id, role, content, created_at)
+        SELECT :conversation_id, 'user', 'Meddelande ' || g, NOW() - g * INTERVAL '1 minute'
+        FROM generate_series(1, :messages) AS g
+    """), {"conversation_id": hot[1], "messages": HOT_CONVERSATION_MESSAGES})
+    await conn.execute(text("""
+        INSERT INTO conversations (user_id, title, status, created_at, last_message_at)
+        SELECT :user_id, 'Fråga ' || g, 'active', NOW() - g * INTERVAL '1 hour', NOW() - g * INTERVAL '1 hour'
+        FROM generate_series(1, :conversations) AS g
+    """), {"user_id": hot[0], "conversations": HOT_USER_CONVERSATIONS})
+
+    for table in HOT_TABLES:
+        await conn.execute(text(f"ANALYZE {table}"))
+    return str(hot[0]), str(hot[1])
+
+
+def older_messages_cursor():
+    return encode_cursor(datetime.now(timezone.utc).replace(microsecond=0), "00000000-0000-0000-0000-000000000000")
+
+
+def admin_cursor():
+    return encode_cursor(datetime(2100, 1, 1, tzinfo=timezone.utc), "ffffffff-ffff-ffff-ffff-ffffffffffff")
+
+
+# (name, hot table, runner) - the runner calls the real route with a capturing session
+CASES = [
+    ("sidebar", "conversations",
+     lambda db, user_id, conversation_id: conversations.get_conversations(limit=100, user_id=user_id, db=db)),
+    ("chat_history_latest", "messages",
+     lambda db, user_id, conversation_id: conversations.get_messages(
+         conversation_id, Response(), limit=100, before=None, user_id=user_id, db=db)),
+    ("chat_history_older", "messages",
+     lambda db, user_id, conversation_id: conversations.get_messages(
+         conversation_id, Response(), limit=100, before=older_messages_cursor(), user_id=user_id, db=db)),
+    ("admin_users", "users",
+     lambda db, *_: admin.get_all_users(
+         admin=None, db=db, page=1, limit=50, cursor=admin_cursor(), include_total=False,
+         search=None, search_mode="contains", status=None)),
+    ("admin_conversations", "conversations",
+     lambda db, *_: admin.get_all_conversations(
+         admin=None, db=db, page=1, limit=50, cursor=admin_cursor(), include_total=False, user_id=None)),
+    ("admin_subscriptions", "subscriptions",
+     lambda db, *_: admin.get_all_subscriptions(
+         admin=None, db=db, page=1, limit=50, cursor=admin_cursor(), include_total=False, status_filter=None)),
+    ("admin_payments", "payment_history",
+     lambda db, *_: admin.get_all_payments(
+         admin=None, db=db, page=1, limit=50, cursor=admin_cursor(), include_total=False)),
+    ("admin_logs", "admin_logs",
+     lambda db, *_: admin.get_admin_logs(
+         admin=None, db=db, page=1, limit=50, cursor=admin_cursor(), include_total=False)),
+]
+
+
+async def collect_plans():
+    engine = create_async_engine(TEST_DATABASE_URL)
+    plans = {}
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            try:
+                user_id, conversation_id = await seed(conn)
+                session = AsyncSession(bind=conn)
+                for name, table, runner in CASES:
+                    capture = PlanCapturingSession(session)
+                    await runner(capture, user_id, conversation_id)
+                    plans[name] = [plan for sql, plan in capture.plans if f"FROM {table}" in sql]
+            finally:
+                await transaction.rollback()
+    finally:
+        await engine.dispose()
+    return plans
+
+
+@pytest.fixture(scope="module")
+def plans():
+    enabled = response_cache.enabled
+    response_cache.enabled = False
+    try:
+        return asyncio.run(collect_plans())
+    finally:
+        response_cache.enabled = enabled
+
+
+def is_hot(relation) -> bool:
+    # messages partitions are named messages_YYYY_MM
+    return relation in HOT_TABLES or (relation or "").startswith("messages_")
+
+
+def plan_problems(node, problems=None):
+    problems = [] if problems is None else problems
+    if node["Node Type"] == "Seq Scan" and is_hot(node.get("Relation Name")):
+        problems.append(f"Seq Scan on {node['Relation Name']}")
+    if node["Node Type"] in SORT_NODES:
+        problems.append(f"{node['Node Type']} on {node.get('Sort Key')}")
+    for child in node.get("Plans", []):
+        plan_problems(child, problems)
+    return problems
+
+
+@pytest.mark.parametrize("case", [name for name, _, _ in CASES])
+def test_hot_path_uses_an_index_in_order(plans, case):
+    assert plans[case], f"{case}: no query against the hot table was captured"
+    for plan in plans[case]:
+        assert plan_problems(plan) == [], json.dumps(plan, indent=2)
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def test_sidebar_reads_the_user_status_index_in_order(plans):
+    nodes = [node for plan in plans["sidebar"] for node in plan_nodes(plan)]
+    assert any(
+        node["Node Type"] == "Index Scan" and node.get("Index Name") == "idx_conversations_user_status_last_message"
+        for node in nodes
+    ), json.dumps(plans["sidebar"], indent=2)
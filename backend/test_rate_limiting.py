@@ -0,0 +1,163 @@
+"""
+Tests for chat admission control
+"""
+
+import sys
+import os
+import time
+import uuid
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from rate_limiting import TokenBucketLimiter, QuotaTracker, QuotaEntry, worker_share
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+def test_token_bucket_allows_burst_then_limits():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=3)
+    
+    assert [limiter.acquire("user-1") for _ in range(3)] == [0.0, 0.0, 0.0]
+    retry_after = limiter.acquire("user-1")
+    assert 0 < retry_after <= 1.0
+    
+    # Other keys have their own bucket
+    assert limiter.acquire("user-2") == 0.0
+
+
+def test_token_bucket_bounds_key_count():
+    limiter = TokenBucketLimiter(rate_per_minute=60, burst=1, max_keys=10)
+    for i in range(100):
+        limiter.acquire(f"ip-{i}")
+    assert limiter.get_stats()["keys"] == 10
+
+
+def test_rate_limits_are_shared_between_workers():
+    assert worker_share(60, 20, workers=1) == (60, 20)
+    assert worker_share(60, 20, workers=3) == (20, 7)
+    assert worker_share(20, 1, workers=4) == (5, 1)
+
+
+def test_quota_skips_users_without_limit():
+    tracker = QuotaTracker(cache_ttl=60)
+    tracker._entries["user-1"] = QuotaEntry(None, None, 0, time.monotonic())
+    
+    # No database session needed while the entry is fresh
+    assert all(asyncio.run(tracker.try_consume(None, "user-1"))[0] for _ in range(10))
+    assert tracker.get_stats()["reserved"] == 0
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_quota_is_enforced_across_workers():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+    
+    os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+    import database
+    
+    async def scenario():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        email = f"quota-{uuid.uuid4().hex[:12]}@example.com"
+        async with engine.begin() as conn:
+            user_id = (await conn.execute(text("""
+                INSERT INTO users (email, password_hash, first_name, last_name)
+                VALUES (:email, 'x', 'Quota', 'Test') RETURNING user_id
+            """), {"email": email})).scalar()
+            await conn.execute(text("""
+                INSERT INTO subscriptions (user_id, plan_type, status, query_limit, queries_used,
+                                           current_period_start, current_period_end)
+                VALUES (:user_id, 'monthly', 'active', 3, 0, NOW(), NOW() + INTERVAL '30 days')
+            """), {"user_id": user_id})
+        
+        # Two workers, four concurrent requests each
+        workers = [QuotaTracker(), QuotaTracker()]
+        
+        async def consume(tracker):
+            async with AsyncSession(engine) as session:
+                return (await tracker.try_consume(session, str(user_id)))[0]
+        
+        try:
+            results = await asyncio.gather(*(consume(tracker) for tracker in workers for _ in range(4)))
+            await workers[0].release(str(user_id))
+            async with engine.connect() as conn:
+                used = (await conn.execute(
+                    text("SELECT queries_used FROM subscriptions WHERE user_id = :user_id"), {"user_id": user_id}
+                )).scalar()
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(text("DELETE FROM users WHERE user_id = :user_id"), {"user_id": user_id})
+            await engine.dispose()
+            await database.engine.dispose()
+        return results, used
+    
+    results, used = asyncio.run(scenario())
+    assert results.count(True) == 3
+    assert used == 2
+
+
+def test_client_ip_ignores_forged_forwarded_for(monkeypatch):
+    for module in ("fastapi", "jose", "sqlalchemy"):
+        pytest.importorskip(module)
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+    from starlette.requests import Request
+    import dependencies
+
+    def request(forwarded_for):
+        return Request({
+            "type": "http", "client": ("10.0.0.5", 1234),
+            "headers": [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+        })
+
+    # The load balancer appends the address it saw; the client wrote the rest
+    assert dependencies.get_client_ip(request("6.6.6.6, 203.0.113.7")) == "203.0.113.7"
+    assert dependencies.get_client_ip(request("203.0.113.7")) == "203.0.113.7"
+    assert dependencies.get_client_ip(request(None)) == "10.0.0.5"
+
+    monkeypatch.setattr(dependencies, "TRUSTED_PROXY_HOPS", 2)
+    assert dependencies.get_client_ip(request("6.6.6.6, 203.0.113.7, 10.1.1.1")) == "203.0.113.7"
+
+    monkeypatch.setattr(dependencies, "TRUSTED_PROXY_HOPS", 0)
+    assert dependencies.get_client_ip(request("6.6.6.6")) == "10.0.0.5"
+
+
+def test_throttled_upload_is_refused_before_its_body_is_read(monkeypatch):
+    for module in ("fastapi", "jose", "sqlalchemy", "openai"):
+        pytest.importorskip(module)
+    os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+    from fastapi import FastAPI
+    import dependencies
+    from routes.conversations import router
+
+    limiter = TokenBucketLimiter(rate_per_minute=1, burst=1)
+    limiter.acquire("203.0.113.7")
+    monkeypatch.setattr(dependencies, "ip_rate_limiter", limiter)
+
+    async def no_db():
+        yield None
+
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    app.dependency_overrides[dependencies.get_current_user_id] = lambda: "user-1"
+    app.dependency_overrides[dependencies.get_db] = no_db
+
+    async def receive():
+        pytest.fail("the upload was read before admission")
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app({
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": f"/api/conversations/{uuid.uuid4()}/messages", "raw_path": b"",
+        "query_string": b"", "root_path": "", "client": ("203.0.113.7", 1234), "server": ("testserver", 80),
+        "headers": [(b"content-type", b"multipart/form-data; boundary=b"), (b"transfer-encoding", b"chunked")],
+    }, receive, send))
+
+    assert sent[0]["status"] == 429
+    assert "retry-after" in {name.decode() for name, _ in sent[0]["headers"]}
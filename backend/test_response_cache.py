@@ -0,0 +1,117 @@
+"""
+Tests for the admin response cache
+"""
+
+import sys
+import os
+import asyncio
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import response_cache as response_cache_module
+from response_cache import ResponseCache, CachePolicy
+
+
+class Loader:
+    def __init__(self, delay: float = 0):
+        self.calls = 0
+        self.delay = delay
+
+    async def __call__(self, db):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return {"call": self.calls, "db": db}
+
+
+def make_cache(ttl=60.0, stale_ttl=60.0):
+    return ResponseCache({"dashboard": CachePolicy(ttl, stale_ttl)}, max_entries=10)
+
+
+def test_hits_are_keyed_by_params():
+    async def scenario():
+        cache = make_cache()
+        loader = Loader()
+
+        first = await cache.get("dashboard", {"days": 7}, loader, "db")
+        again = await cache.get("dashboard", {"days": 7}, loader, "db")
+        other = await cache.get("dashboard", {"days": 30}, loader, "db")
+
+        assert first is again
+        assert other["call"] == 2
+        stats = cache.get_stats()["endpoints"]["dashboard"]
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 2)
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = make_cache()
+        loader = Loader(delay=0.01)
+
+        results = await asyncio.gather(*(cache.get("dashboard", None, loader, "db") for _ in range(10)))
+
+        assert loader.calls == 1
+        assert all(result is results[0] for result in results)
+
+    asyncio.run(scenario())
+
+
+def test_stale_entries_are_served_while_refreshing(monkeypatch):
+    class FakeSession:
+        async def __aenter__(self):
+            return "background-db"
+
+        async def __aexit__(self, *exc):
+            return False
+
+    fake_database = type(sys)("database")
+    fake_database.AsyncReadSessionLocal = FakeSession
+    monkeypatch.setitem(sys.modules, "database", fake_database)
+
+    async def scenario():
+        cache = make_cache(ttl=0.0, stale_ttl=60.0)
+        loader = Loader()
+
+        first = await cache.get("dashboard", None, loader, "db")
+        stale = await cache.get("dashboard", None, loader, "db")
+        assert stale is first
+
+        await asyncio.gather(*cache._tasks)
+        assert loader.calls == 2
+        stats = cache.get_stats()["endpoints"]["dashboard"]
+        assert (stats["staleHits"], stats["refreshes"]) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_drops_entries_and_discards_in_flight_results():
+    async def scenario():
+        cache = make_cache()
+        loader = Loader(delay=0.01)
+
+        await cache.get("dashboard", None, loader, "db")
+        cache.invalidate("dashboard")
+        assert cache.get_stats()["entries"] == 0
+
+        # A load that started before an invalidation must not be cached
+        pending = asyncio.create_task(cache.get("dashboard", None, loader, "db"))
+        await asyncio.sleep(0)
+        cache.invalidate("dashboard")
+        await pending
+        assert cache.get_stats()["entries"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_disabled_cache_always_loads():
+    async def scenario():
+        cache = ResponseCache(response_cache_module.CACHE_POLICIES, 10, enabled=False)
+        loader = Loader()
+        await cache.get("dashboard", None, loader, "db")
+        await cache.get("dashboard", None, loader, "db")
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,127 @@
+"""
+Tests for the daily_stats rollup refresh: the advisory lock and its schedule
+"""
+
+import sys
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("sqlalchemy", "asyncpg", "dotenv"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+
+import database
+import rollups
+from rollups import DailyStatsAggregator
+
+
+class FakeSession:
+    """Answers the advisory lock query and records the refresh calls"""
+
+    def __init__(self, lock_free: bool):
+        self.lock_free = lock_free
+        self.statements = []
+        self.committed = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        return SimpleNamespace(scalar=lambda: self.lock_free)
+
+    async def commit(self):
+        self.committed = True
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    sessions = []
+    invalidated = []
+
+    def session_factory(lock_free=True):
+        def make():
+            sessions.append(FakeSession(lock_free))
+            return sessions[-1]
+        monkeypatch.setattr(database, "AsyncSessionLocal", make)
+
+    async def invalidate_responses(*responses):
+        invalidated.append(responses)
+
+    monkeypatch.setattr(rollups, "invalidate_responses", invalidate_responses)
+    return session_factory, sessions, invalidated
+
+
+def test_refresh_is_skipped_while_another_worker_holds_the_lock(fake_db):
+    use_sessions, sessions, invalidated = fake_db
+    use_sessions(lock_free=False)
+    aggregator = DailyStatsAggregator()
+
+    assert asyncio.run(aggregator.refresh()) is False
+
+    assert aggregator.skipped == 1
+    assert aggregator.refreshes == 0
+    assert not any("refresh_daily_stats" in sql for sql, _ in sessions[0].statements)
+    assert not sessions[0].committed
+    assert invalidated == []
+
+
+def test_refresh_recomputes_recent_days_or_everything(fake_db, monkeypatch):
+    use_sessions, sessions, invalidated = fake_db
+    use_sessions(lock_free=True)
+    monkeypatch.setattr(rollups, "DAILY_STATS_REFRESH_DAYS", 3)
+    aggregator = DailyStatsAggregator()
+
+    assert asyncio.run(aggregator.refresh()) is True
+    assert asyncio.run(aggregator.refresh(full=True)) is True
+
+    incremental, full = [session.statements[-1] for session in sessions]
+    assert "pg_try_advisory_xact_lock" in sessions[0].statements[0][0]
+    assert incremental[1]["from_date"] == (datetime.now(timezone.utc) - timedelta(days=2)).date()
+    assert full[1]["from_date"] is None
+    assert all(session.committed for session in sessions)
+    assert aggregator.refreshes == 2
+    assert invalidated == [("dashboard", "usage_analytics")] * 2
+
+
+def test_full_refresh_runs_once_per_interval_and_retries_when_skipped(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(rollups, "time", SimpleNamespace(monotonic=lambda: clock[0], perf_counter=time.perf_counter))
+    monkeypatch.setattr(rollups, "DAILY_STATS_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(rollups, "DAILY_STATS_FULL_REFRESH_SECONDS", 3 * 3600)
+
+    # One refresh an hour: the lock is held on the fourth, the second fails
+    outcomes = [True, RuntimeError("connection lost"), True, False, True, True]
+    calls = []
+
+    async def refresh(full=False):
+        calls.append(full)
+        clock[0] += 3600
+        if len(calls) > len(outcomes):
+            raise asyncio.CancelledError
+        outcome = outcomes[len(calls) - 1]
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    aggregator = DailyStatsAggregator()
+    monkeypatch.setattr(aggregator, "refresh", refresh)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(aggregator._run())
+
+    # The skipped full refresh is retried on the next tick, then the interval restarts
+    assert calls == [False, False, False, True, True, False, False]
+    assert aggregator.errors == 1
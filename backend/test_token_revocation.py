@@ -0,0 +1,96 @@
+"""
+Tests for the in-memory side of token revocation
+"""
+
+import sys
+import os
+import time
+import uuid
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from token_revocation import BloomFilter, RevocationStore, token_fingerprint
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [token_fingerprint(f"token-{i}") for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    
+    assert all(key in bloom for key in keys)
+    
+    false_positives = sum(token_fingerprint(f"other-{i}") in bloom for i in range(10000))
+    assert false_positives < 300  # ~1% expected
+
+
+def test_revoked_token_is_rejected():
+    store = RevocationStore(capacity=100, error_rate=0.01)
+    payload = {"sub": "user-1", "iat": time.time(), "exp": time.time() + 60}
+    
+    assert not store.is_revoked("token-a", payload)
+    store.apply(token_fingerprint("token-a"), None, payload["exp"], time.time())
+    assert store.is_revoked("token-a", payload)
+    assert not store.is_revoked("token-b", payload)
+
+
+def test_user_revocation_covers_earlier_tokens_only():
+    store = RevocationStore(capacity=100, error_rate=0.01)
+    now = time.time()
+    store.apply(None, "user-1", now + 3600, now)
+    
+    assert store.is_revoked("old", {"sub": "user-1", "iat": now - 10})
+    assert store.is_revoked("legacy", {"sub": "user-1"})  # tokens issued before iat was added
+    assert not store.is_revoked("new", {"sub": "user-1", "iat": now + 10})
+    assert not store.is_revoked("other", {"sub": "user-2", "iat": now - 10})
+
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL not set")
+def test_refresh_picks_up_revocations_committed_out_of_order():
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    
+    os.environ.setdefault("DATABASE_URL", TEST_DATABASE_URL)
+    import database
+    
+    insert = text("""
+        INSERT INTO revoked_tokens (token_hash, expires_at)
+        VALUES (:token_hash, NOW() + INTERVAL '1 hour') RETURNING revocation_id
+    """)
+    late, early = token_fingerprint(f"late-{uuid.uuid4()}"), token_fingerprint(f"early-{uuid.uuid4()}")
+    
+    async def scenario():
+        engine = create_async_engine(TEST_DATABASE_URL)
+        store = RevocationStore(capacity=100, error_rate=0.01)
+        try:
+            # The slow transaction takes the lower id but commits last
+            async with engine.connect() as slow:
+                await slow.begin()
+                slow_id = (await slow.execute(insert, {"token_hash": late})).scalar()
+                async with engine.begin() as fast:
+                    fast_id = (await fast.execute(insert, {"token_hash": early})).scalar()
+                
+                await store.refresh()
+                assert fast_id > slow_id and store.get_stats()["lastRevocationId"] >= fast_id
+                assert late not in store._tokens
+                await slow.commit()
+            
+            await store.refresh()
+            return late in store._tokens
+        finally:
+            async with engine.begin() as conn:
+                await conn.execute(
+                    text("DELETE FROM revoked_tokens WHERE token_hash IN (:late, :early)"),
+                    {"late": late, "early": early}
+                )
+            await engine.dispose()
+            await database.engine.dispose()
+    
+    assert asyncio.run(scenario())
@@ -0,0 +1,103 @@
+"""
+Tests for conditional commits and round-trip counting
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "dotenv"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+
+from sqlalchemy import create_engine, text, Column, Integer, String
+from sqlalchemy.orm import Session, declarative_base
+
+from database import RoundTripStats, has_pending_writes
+
+
+Base = declarative_base()
+
+
+class Note(Base):
+    __tablename__ = "notes"
+    note_id = Column(Integer, primary_key=True)
+    body = Column(String)
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+def test_reads_leave_nothing_to_commit(engine):
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        session.query(Note).all()
+
+        assert not has_pending_writes(session)
+
+
+def test_raw_sql_writes_need_a_commit_until_committed(engine):
+    with Session(engine) as session:
+        session.execute(text("INSERT INTO notes (body) VALUES ('a')"))
+        assert has_pending_writes(session)
+
+        session.commit()
+        assert not has_pending_writes(session)
+
+
+def test_unflushed_and_flushed_objects_need_a_commit(engine):
+    with Session(engine) as session:
+        session.add(Note(body="a"))
+        assert has_pending_writes(session)
+
+        session.flush()
+        assert has_pending_writes(session)
+
+        session.rollback()
+        assert not has_pending_writes(session)
+
+
+def test_round_trips_count_statements_and_transaction_ends(engine):
+    stats = RoundTripStats(enabled=True)
+    stats.install(engine)
+
+    token = stats.start_request()
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+        session.execute(text("SELECT 2"))
+        session.commit()
+    count = stats.finish_request(token, "GET /notes")
+
+    # BEGIN, two statements, COMMIT
+    assert count == 4
+    assert stats.get_stats()["routes"]["GET /notes"] == {"requests": 1, "roundTrips": 4, "max": 4, "avg": 4.0}
+
+
+def test_autocommit_skips_transaction_round_trips(engine):
+    stats = RoundTripStats(enabled=True)
+    stats.install(engine)
+
+    token = stats.start_request()
+    with Session(engine.execution_options(isolation_level="AUTOCOMMIT")) as session:
+        session.execute(text("SELECT 1"))
+    assert stats.finish_request(token, "GET /notes") == 1
+
+
+def test_nothing_is_counted_outside_a_request(engine):
+    stats = RoundTripStats(enabled=True)
+    stats.install(engine)
+
+    with Session(engine) as session:
+        session.execute(text("SELECT 1"))
+
+    assert stats.get_stats()["routes"] == {}
@@ -0,0 +1,73 @@
+"""
+Tests for admin user search query building
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("sqlalchemy")
+from sqlalchemy import column, select
+from sqlalchemy.dialects import postgresql
+
+from user_search import user_search, escape_like, UserSearchError
+
+
+class Columns:
+    email = column("email")
+    first_name = column("first_name")
+    last_name = column("last_name")
+
+
+def render(condition) -> str:
+    return str(select(Columns.email).where(condition).compile(dialect=postgresql.dialect()))
+
+
+def test_escape_like_matches_wildcards_literally():
+    assert escape_like("50%_off\\") == "50\\%\\_off\\\\"
+
+
+def test_contains_search_is_ranked_trigram_ilike():
+    condition, rank = user_search(Columns, "  lindqvist ", "contains")
+
+    sql = render(condition)
+    assert sql.count("ILIKE") == 3
+    assert rank is not None
+    assert condition.compile().params["email_1"] == "%lindqvist%"
+
+
+def test_fuzzy_search_uses_similarity_operator():
+    condition, rank = user_search(Columns, "svenson", "fuzzy")
+    assert "email %" in render(condition).replace("%%", "%")
+    assert rank is not None
+
+
+def test_prefix_search_looks_up_the_email_prefix():
+    condition, rank = user_search(Columns, "Anna.L", "prefix")
+
+    assert "lower(email) LIKE" in render(condition)
+    assert "first_name" not in render(condition)
+    assert rank is None
+    assert list(condition.compile().params.values()) == ["anna.l%"]
+
+
+@pytest.mark.parametrize("mode", ["contains", "fuzzy"])
+def test_short_terms_match_email_and_name_prefixes(mode):
+    condition, rank = user_search(Columns, "An", mode)
+
+    sql = render(condition)
+    for field in ("email", "first_name", "last_name"):
+        assert f"lower({field}) LIKE" in sql
+    assert rank is None
+    assert set(condition.compile().params.values()) == {"an%"}
+
+
+def test_invalid_mode_and_empty_term_are_rejected():
+    with pytest.raises(UserSearchError):
+        user_search(Columns, "anna", "regex")
+    with pytest.raises(UserSearchError):
+        user_search(Columns, "   ", "contains")
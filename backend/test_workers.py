@@ -0,0 +1,83 @@
+"""
+Tests for per-worker connection budgets and fork safety
+"""
+
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+for module in ("fastapi", "sqlalchemy", "asyncpg", "dotenv"):
+    pytest.importorskip(module)
+
+os.environ.setdefault("DATABASE_URL", "postgresql+asyncpg://localhost/juridik_ai_test")
+
+import database
+import serve
+
+
+def test_connection_budget_is_split_between_workers(monkeypatch):
+    monkeypatch.setattr(database, "WEB_CONCURRENCY", 4)
+    assert database.pool_limits("60", "10", "20") == (5, 10)
+
+    monkeypatch.setattr(database, "WEB_CONCURRENCY", 100)
+    assert database.pool_limits("60", "10", "20") == (1, 0)
+
+
+def test_per_worker_settings_without_a_budget(monkeypatch):
+    monkeypatch.setattr(database, "WEB_CONCURRENCY", 4)
+    assert database.pool_limits(None, "10", "20") == (10, 20)
+
+
+def test_worker_count(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "3")
+    assert serve.worker_count() == 3
+
+    monkeypatch.delenv("WEB_CONCURRENCY")
+    monkeypatch.setattr(serve, "available_cpus", lambda: 8)
+    assert serve.worker_count() == 8
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_worker_gets_its_own_pool():
+    database.engine.sync_engine.pool.opened_by_parent = True
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        inherited = hasattr(database.engine.sync_engine.pool, "opened_by_parent")
+        os.write(write_fd, b"1" if inherited else b"0")
+        os._exit(0)
+
+    os.close(write_fd)
+    inherited = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+    assert inherited == b"0"
+
+
+def test_invalidations_from_other_workers_are_applied():
+    import json
+    import uuid
+    from cache_invalidation import InvalidationListener, INVALIDATION_CHANNEL
+    from security import user_cache, CurrentUser
+    from response_cache import response_cache
+
+    user_id = uuid.uuid4()
+    user_cache.put(CurrentUser(user_id, "a@example.com", "user", "active"))
+    listener = InvalidationListener()
+
+    payload = json.dumps({"users": [str(user_id)], "responses": ["dashboard"]})
+    before = response_cache.get_stats()["endpoints"]["dashboard"]["invalidations"]
+    listener.on_notify(None, 0, INVALIDATION_CHANNEL, payload)
+
+    assert user_cache.get(str(user_id)) is None
+    assert response_cache.get_stats()["endpoints"]["dashboard"]["invalidations"] == before + 1
+    assert listener.get_stats()["received"] == 1
+
+    # A malformed message is counted, not raised into asyncpg
+    listener.on_notify(None, 0, INVALIDATION_CHANNEL, "not json")
+    assert listener.get_stats()["errors"] == 1
@@ -0,0 +1,130 @@
+"""
+Tests for the write-behind buffer
+"""
+
+import sys
+import os
+import types
+import uuid
+import asyncio
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+pytest.importorskip("sqlalchemy")
+
+from write_buffer import WriteBehindBuffer
+
+
+def fake_database(monkeypatch, fail=False, reject=None):
+    """
+    Replaces the database module with one whose sessions record statements
+    reject(params) says which statements the database refuses as bad data
+    """
+    from sqlalchemy.exc import DataError
+
+    executed = []
+
+    class Savepoint:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+    class FakeSession:
+        async def __aenter__(self):
+            return self
+
+        async def __aexit__(self, *exc):
+            return False
+
+        def begin_nested(self):
+            return Savepoint()
+
+        async def execute(self, statement, params):
+            if fail:
+                raise ConnectionError("database unreachable")
+            if reject and reject(params):
+                raise DataError(str(statement), params, ValueError("integer out of range"))
+            executed.append((str(statement).split()[0:3], params))
+
+        async def commit(self):
+            pass
+
+    database = types.ModuleType("database")
+    database.AsyncSessionLocal = FakeSession
+    monkeypatch.setitem(sys.modules, "database", database)
+    return executed
+
+
+def test_flush_writes_one_statement_per_table(monkeypatch):
+    executed = fake_database(monkeypatch)
+    buffer = WriteBehindBuffer()
+    admin_id = uuid.uuid4()
+    for i in range(3):
+        buffer.log_admin_action(admin_id, "update_user_status", "user", uuid.uuid4(), {"new_status": "active"})
+    buffer.record_query(uuid.uuid4(), uuid.uuid4(), uuid.uuid4(), "Vad gäller?", response_generated=True)
+
+    assert asyncio.run(buffer.flush()) == 4
+    assert len(executed) == 2
+    analytics, logs = executed[0][1], executed[1][1]
+    assert analytics["queries"] == ["Vad gäller?"]
+    assert logs["admin_ids"] == [admin_id] * 3
+    assert buffer.pending() == 0
+
+
+def test_repeated_logins_are_written_once(monkeypatch):
+    executed = fake_database(monkeypatch)
+    buffer = WriteBehindBuffer()
+    user_id = str(uuid.uuid4())
+    for _ in range(5):
+        buffer.record_login(user_id)
+
+    assert buffer.pending() == 1
+    asyncio.run(buffer.flush())
+    assert executed[0][1]["user_ids"] == [uuid.UUID(user_id)]
+
+
+def test_failed_flush_keeps_rows_for_the_next_one(monkeypatch):
+    fake_database(monkeypatch, fail=True)
+    buffer = WriteBehindBuffer()
+    buffer.record_login(uuid.uuid4())
+    buffer.log_admin_action(uuid.uuid4(), "export_data")
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(buffer.flush())
+
+    assert buffer.pending() == 2
+    assert buffer.get_stats()["flushErrors"] == 1
+
+
+def test_rejected_rows_are_dropped_and_the_rest_written(monkeypatch):
+    executed = fake_database(
+        monkeypatch, reject=lambda params: 2 ** 40 in params.get("processing_times", [])
+    )
+    buffer = WriteBehindBuffer()
+    buffer.record_query(uuid.uuid4(), uuid.uuid4(), None, "ok", response_generated=True, processing_time=10)
+    buffer.record_query(uuid.uuid4(), uuid.uuid4(), None, "bad", response_generated=True, processing_time=2 ** 40)
+    buffer.log_admin_action(uuid.uuid4(), "export_data")
+    buffer.record_login(uuid.uuid4())
+
+    # The whole batch fails once, then every row but the bad one is written
+    assert asyncio.run(buffer.flush()) == 3
+    assert [params.get("queries") for _, params in executed] == [["ok"], None, None]
+    assert buffer.pending() == 0
+    stats = buffer.get_stats()
+    assert (stats["rejected"], stats["written"], stats["flushErrors"]) == (1, 3, 1)
+
+
+def test_oldest_rows_are_dropped_beyond_max_rows(monkeypatch):
+    fake_database(monkeypatch)
+    buffer = WriteBehindBuffer(max_rows=3)
+    for i in range(5):
+        buffer.log_admin_action(uuid.uuid4(), f"action-{i}")
+
+    assert buffer.pending() == 3
+    assert [row["actions"] for row in buffer._rows["admin_logs"]] == ["action-2", "action-3", "action-4"]
+    assert buffer.get_stats()["dropped"] == 2
@@ -0,0 +1,259 @@
+"""
+Token revocation for Juridik AI
+Revocations are stored in Postgres for durability and mirrored in every worker
+by a Bloom filter plus an exact set, so checking a token never hits the database
+"""
+
+import os
+import math
+import time
+import asyncio
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+
+REVOCATION_REFRESH_SECONDS = float(os.getenv("REVOCATION_REFRESH_SECONDS", 5))
+REVOCATION_REBUILD_SECONDS = float(os.getenv("REVOCATION_REBUILD_SECONDS", 3600))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", 100000))
+REVOCATION_BLOOM_ERROR_RATE = float(os.getenv("REVOCATION_BLOOM_ERROR_RATE", 0.001))
+# revocation_id is taken when a row is inserted, not when it commits, so a
+# refresh can see id 12 before id 11 commits. Each refresh also re-reads the
+# rows revoked in this window - it must exceed the longest revoking transaction
+REVOCATION_OVERLAP_SECONDS = float(os.getenv("REVOCATION_OVERLAP_SECONDS", 60))
+
+
+def token_fingerprint(token: str) -> str:
+    """SHA-256 of a token - the raw token is never stored"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over hex fingerprints"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fingerprint: str):
+        # Double hashing over two 64-bit halves of the fingerprint
+        h1 = int(fingerprint[:16], 16)
+        h2 = int(fingerprint[16:32], 16) | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, fingerprint: str):
+        for position in self._positions(fingerprint):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, fingerprint: str) -> bool:
+        for position in self._positions(fingerprint):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class RevocationStore:
+    """Per-worker view of the revoked_tokens table"""
+
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY, error_rate: float = REVOCATION_BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._tokens: Dict[str, float] = {}  # fingerprint -> expires_at (epoch)
+        self._users: Dict[str, float] = {}  # user_id -> revoked_at (epoch)
+        self._last_id = 0
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.checks = 0
+        self.bloom_positives = 0
+        self.false_positives = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+
+    def apply(self, token_hash: Optional[str], user_id: Optional[str], expires_at: float, revoked_at: float):
+        """Record a revocation in memory (idempotent)"""
+        with self._lock:
+            if token_hash:
+                if token_hash not in self._tokens:
+                    self._bloom.add(token_hash)
+                self._tokens[token_hash] = expires_at
+            if user_id:
+                self._users[str(user_id)] = max(revoked_at, self._users.get(str(user_id), 0))
+
+    def is_revoked(self, token: str, payload: dict) -> bool:
+        """O(1) in-memory check of a verified token"""
+        self.checks += 1
+
+        # Every token issued to the user before the cutoff is revoked
+        cutoff = self._users.get(str(payload.get("sub")))
+        if cutoff is not None and payload.get("iat", 0) <= cutoff:
+            return True
+
+        fingerprint = token_fingerprint(token)
+        if fingerprint not in self._bloom:
+            return False
+
+        self.bloom_positives += 1
+        if fingerprint in self._tokens:
+            return True
+        self.false_positives += 1
+        return False
+
+    # ---- Writes ----
+
+    async def revoke_token(self, db, token: str, payload: dict):
+        """Revoke a single token until it would have expired anyway"""
+        from sqlalchemy import text
+
+        token_hash = token_fingerprint(token)
+        expires_at = datetime.fromtimestamp(payload.get("exp", time.time()), tz=timezone.utc)
+        await db.execute(
+            text("""
+                INSERT INTO revoked_tokens (token_hash, user_id, expires_at)
+                VALUES (:token_hash, NULL, :expires_at)
+            """),
+            {"token_hash": token_hash, "expires_at": expires_at}
+        )
+        await db.commit()
+        self.apply(token_hash, None, expires_at.timestamp(), time.time())
+
+    async def revoke_user(self, db, user_id: str, max_token_lifetime_seconds: float):
+        """Revoke every token issued to a user up to now"""
+        from sqlalchemy import text
+
+        now = time.time()
+        await db.execute(
+            text("""
+                INSERT INTO revoked_tokens (token_hash, user_id, expires_at, revoked_at)
+                VALUES (NULL, :user_id, :expires_at, :revoked_at)
+            """),
+            {
+                "user_id": str(user_id),
+                "expires_at": datetime.fromtimestamp(now + max_token_lifetime_seconds, tz=timezone.utc),
+                "revoked_at": datetime.fromtimestamp(now, tz=timezone.utc)
+            }
+        )
+        await db.commit()
+        self.apply(None, str(user_id), now + max_token_lifetime_seconds, now)
+
+    # ---- Sync with Postgres ----
+
+    async def _load(self, last_id: int):
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                text("""
+                    SELECT revocation_id, token_hash, user_id, expires_at, revoked_at
+                    FROM revoked_tokens
+                    WHERE (revocation_id > :last_id
+                           OR revoked_at > NOW() - make_interval(secs => :overlap))
+                      AND expires_at > NOW()
+                    ORDER BY revocation_id
+                """),
+                {"last_id": last_id, "overlap": REVOCATION_OVERLAP_SECONDS}
+            )
+            return result.all()
+
+    async def refresh(self):
+        """Pull revocations added since the last refresh, and the overlap window again"""
+        rows = await self._load(self._last_id)
+        for revocation_id, token_hash, user_id, expires_at, revoked_at in rows:
+            # apply() is idempotent, so rows read again change nothing
+            self.apply(token_hash, user_id, expires_at.timestamp(), revoked_at.timestamp())
+            self._last_id = max(self._last_id, revocation_id)
+        self.refreshes += 1
+
+    async def rebuild(self):
+        """Drop expired revocations and reload the filter from scratch"""
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            await session.execute(text("DELETE FROM revoked_tokens WHERE expires_at <= NOW()"))
+            await session.commit()
+
+        rows = await self._load(0)
+
+        # Build the new view aside and swap it in, so checks never see a gap
+        bloom = BloomFilter(max(self.capacity, len(rows) * 2), self.error_rate)
+        tokens: Dict[str, float] = {}
+        users: Dict[str, float] = {}
+        last_id = 0
+        for revocation_id, token_hash, user_id, expires_at, revoked_at in rows:
+            if token_hash:
+                bloom.add(token_hash)
+                tokens[token_hash] = expires_at.timestamp()
+            if user_id:
+                users[str(user_id)] = max(revoked_at.timestamp(), users.get(str(user_id), 0))
+            last_id = max(last_id, revocation_id)
+
+        with self._lock:
+            # Keep local revocations newer than the snapshot
+            for token_hash, expires_at in self._tokens.items():
+                if token_hash not in tokens and expires_at > time.time():
+                    bloom.add(token_hash)
+                    tokens[token_hash] = expires_at
+            for user_id, revoked_at in self._users.items():
+                users[user_id] = max(revoked_at, users.get(user_id, 0))
+            self._bloom, self._tokens, self._users = bloom, tokens, users
+            self._last_id = max(self._last_id, last_id)
+        self.refreshes += 1
+
+    async def _run(self):
+        last_rebuild = time.monotonic()
+        while True:
+            await asyncio.sleep(REVOCATION_REFRESH_SECONDS)
+            try:
+                if time.monotonic() - last_rebuild >= REVOCATION_REBUILD_SECONDS:
+                    await self.rebuild()
+                    last_rebuild = time.monotonic()
+                else:
+                    await self.refresh()
+            except Exception as e:
+                self.refresh_errors += 1
+                print(f"Token revocation refresh failed: {e}")
+
+    async def start(self):
+        """Load revocations and start the background refresh task"""
+        try:
+            await self.refresh()
+            print("✓ Token revocation list loaded")
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"✗ Token revocation list not loaded: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict:
+        return {
+            "revokedTokens": len(self._tokens),
+            "revokedUsers": len(self._users),
+            "bloomBits": self._bloom.size,
+            "bloomHashes": self._bloom.hash_count,
+            "checks": self.checks,
+            "bloomPositives": self.bloom_positives,
+            "falsePositives": self.false_positives,
+            "refreshes": self.refreshes,
+            "refreshErrors": self.refresh_errors,
+            "lastRevocationId": self._last_id,
+        }
+
+
+revocation_store = RevocationStore()
@@ -0,0 +1,61 @@
+"""
+Admin user search for Juridik AI
+Substring and fuzzy matches are served by pg_trgm GIN indexes and ranked by
+similarity; prefix lookups use text_pattern_ops btrees on lower(email) and the
+lowercased names
+"""
+
+from typing import Optional, Tuple
+
+
+SEARCH_MODES = ("contains", "prefix", "fuzzy")
+
+# pg_trgm cannot use its index for terms shorter than one trigram
+MIN_TRIGRAM_LENGTH = 3
+
+
+class UserSearchError(ValueError):
+    """Raised for an unknown search mode or empty search term"""
+
+
+def escape_like(term: str) -> str:
+    """Escape LIKE wildcards so the term matches literally"""
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def user_search(columns, term: str, mode: str = "contains") -> Tuple[object, Optional[object]]:
+    """
+    Build the WHERE condition and ranking expression for a user search
+    `columns` is anything with email/first_name/last_name columns (User, users.c).
+    The rank is None for prefix lookups, which keep the listing's normal order.
+    Terms too short for a trigram match the start of the email or of either
+    name instead - "an" finds Anna and Andersson, but not Johansson.
+    """
+    from sqlalchemy import func, or_
+
+    if mode not in SEARCH_MODES:
+        raise UserSearchError(f"Invalid search mode. Must be one of: {', '.join(SEARCH_MODES)}")
+
+    term = term.strip()
+    if not term:
+        raise UserSearchError("Search term must not be empty")
+
+    pattern = escape_like(term.lower()) + "%"
+    if mode == "prefix":
+        return func.lower(columns.email).like(pattern, escape="\\"), None
+
+    fields = (columns.email, columns.first_name, columns.last_name)
+
+    if len(term) < MIN_TRIGRAM_LENGTH:
+        condition = or_(*(func.lower(field).like(pattern, escape="\\") for field in fields))
+        return condition, None
+
+    if mode == "fuzzy":
+        # `%` is pg_trgm's similarity operator (threshold pg_trgm.similarity_threshold)
+        condition = or_(*(field.op("%")(term) for field in fields))
+    else:
+        pattern = f"%{escape_like(term)}%"
+        condition = or_(*(field.ilike(pattern, escape="\\") for field in fields))
+
+    rank = func.greatest(*(func.similarity(field, term) for field in fields))
+    return condition, rank
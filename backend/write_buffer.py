@@ -0,0 +1,312 @@
+"""
+Write-behind buffer for Juridik AI
+Non-critical writes - query analytics, last login times and admin action
+logs - are queued in memory and written periodically, one multi-row
+statement per table in a single transaction, instead of costing the request
+that produced them its own INSERT or UPDATE and commit.
+A row the database rejects is dropped rather than blocking the others
+"""
+
+import os
+import json
+import uuid
+import asyncio
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+
+WRITE_BUFFER_FLUSH_SECONDS = float(os.getenv("WRITE_BUFFER_FLUSH_SECONDS", 2))
+# Flush early once this many rows are queued
+WRITE_BUFFER_BATCH_SIZE = int(os.getenv("WRITE_BUFFER_BATCH_SIZE", 500))
+# Oldest rows are dropped beyond this while the database is unreachable
+WRITE_BUFFER_MAX_ROWS = int(os.getenv("WRITE_BUFFER_MAX_ROWS", 20000))
+
+
+# One statement per table; every column is passed as an array and unnested.
+# Rows whose user was deleted in the meantime are dropped, and references to
+# deleted conversations and messages cleared, as the ON DELETE rules (and
+# delete_message_references() for messages) would have done.
+INSERT_QUERY_ANALYTICS = """
+    INSERT INTO query_analytics (user_id, conversation_id, message_id, query, response_generated,
+                                 error_occurred, error_message, processing_time, created_at)
+    SELECT u.user_id, c.conversation_id,
+           CASE WHEN EXISTS (SELECT 1 FROM all_messages m WHERE m.message_id = v.message_id)
+                THEN v.message_id END,
+           v.query, v.response_generated,
+           v.error_message IS NOT NULL, v.error_message, v.processing_time, v.created_at
+    FROM unnest(
+        CAST(:user_ids AS uuid[]), CAST(:conversation_ids AS uuid[]), CAST(:message_ids AS uuid[]),
+        CAST(:queries AS text[]), CAST(:response_generated AS boolean[]), CAST(:error_messages AS text[]),
+        CAST(:processing_times AS integer[]), CAST(:created_ats AS timestamptz[])
+    ) AS v(user_id, conversation_id, message_id, query, response_generated, error_message, processing_time, created_at)
+    LEFT JOIN users u ON u.user_id = v.user_id
+    LEFT JOIN conversations c ON c.conversation_id = v.conversation_id
+"""
+
+INSERT_ADMIN_LOGS = """
+    INSERT INTO admin_logs (admin_id, action, target_type, target_id, details, created_at)
+    SELECT v.admin_id, v.action, v.target_type, v.target_id, CAST(v.details AS jsonb), v.created_at
+    FROM unnest(
+        CAST(:admin_ids AS uuid[]), CAST(:actions AS text[]), CAST(:target_types AS text[]),
+        CAST(:target_ids AS uuid[]), CAST(:details AS text[]), CAST(:created_ats AS timestamptz[])
+    ) AS v(admin_id, action, target_type, target_id, details, created_at)
+    WHERE EXISTS (SELECT 1 FROM users u WHERE u.user_id = v.admin_id)
+"""
+
+UPDATE_LAST_LOGIN = """
+    UPDATE users AS u
+    SET last_login_at = GREATEST(u.last_login_at, v.logged_in_at)
+    FROM unnest(CAST(:user_ids AS uuid[]), CAST(:logged_in_ats AS timestamptz[])) AS v(user_id, logged_in_at)
+    WHERE u.user_id = v.user_id
+"""
+
+
+# Table -> (statement, columns); last_logins rows come from the coalesced logins
+STATEMENTS = {
+    "query_analytics": (INSERT_QUERY_ANALYTICS, [
+        "user_ids", "conversation_ids", "message_ids", "queries", "response_generated",
+        "error_messages", "processing_times", "created_ats"
+    ]),
+    "admin_logs": (INSERT_ADMIN_LOGS, [
+        "admin_ids", "actions", "target_types", "target_ids", "details", "created_ats"
+    ]),
+    "last_logins": (UPDATE_LAST_LOGIN, ["user_ids", "logged_in_ats"]),
+}
+
+
+def _uuid(value) -> Optional[uuid.UUID]:
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    return uuid.UUID(str(value))
+
+
+def _columns(rows: List[Dict], names: List[str]) -> Dict[str, List]:
+    return {name: [row[name] for row in rows] for name in names}
+
+
+def _is_row_error(error: Exception) -> bool:
+    """Whether the database rejected the data itself - retrying the same rows cannot succeed"""
+    from sqlalchemy.exc import DBAPIError, DataError, IntegrityError
+
+    if isinstance(error, (DataError, IntegrityError)):
+        return True
+    # SQLSTATE class 22 (data exception) or 23 (integrity constraint violation) -
+    # asyncpg also raises 22000 for values it cannot encode, as a plain DBAPIError
+    sqlstate = getattr(error.orig, "sqlstate", None) if isinstance(error, DBAPIError) else None
+    return (sqlstate or "")[:2] in ("22", "23")
+
+
+class WriteBehindBuffer:
+    """
+    Queues non-critical writes and flushes them every WRITE_BUFFER_FLUSH_SECONDS
+
+    Each flush writes every queued row in one transaction with one statement
+    per table. A flush that fails because of the database (unreachable,
+    timed out) puts its rows back to be retried; stop() makes a final flush,
+    so a graceful shutdown loses nothing. One that fails on a row the
+    database rejects (bad value, constraint) is redone row by row, each in
+    its own savepoint, and the rows that fail again are dropped and counted
+    in rejected. Rows still queued when a worker crashes are lost - only
+    writes that may be are routed here.
+    """
+
+    TABLES = ("query_analytics", "admin_logs")
+
+    def __init__(self, batch_size: int = WRITE_BUFFER_BATCH_SIZE, max_rows: int = WRITE_BUFFER_MAX_ROWS):
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self._rows: Dict[str, List[Dict]] = {table: [] for table in self.TABLES}
+        self._logins: Dict[uuid.UUID, datetime] = {}  # user_id -> latest login, coalesced
+        self._wake = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_lock = asyncio.Lock()
+        self.queued = 0
+        self.written = 0
+        self.dropped = 0
+        self.rejected = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    # ----- queueing -----
+
+    def _queue(self, table: str, row: Dict):
+        self._rows[table].append(row)
+        self.queued += 1
+        self._trim()
+        if self.pending() >= self.batch_size:
+            self._wake.set()
+
+    def _trim(self):
+        """Drop the oldest rows while over max_rows"""
+        while self.pending() > self.max_rows:
+            table = max(self.TABLES, key=lambda name: len(self._rows[name]))
+            if self._rows[table]:
+                self._rows[table].pop(0)
+            else:
+                self._logins.pop(next(iter(self._logins)))
+            self.dropped += 1
+
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._rows.values()) + len(self._logins)
+
+    def record_query(self, user_id, conversation_id, message_id, query: str,
+                     response_generated: bool, error_message: Optional[str] = None,
+                     processing_time: Optional[int] = None):
+        """Queue a query_analytics row for one chat turn"""
+        self._queue("query_analytics", {
+            "user_ids": _uuid(user_id),
+            "conversation_ids": _uuid(conversation_id),
+            "message_ids": _uuid(message_id),
+            "queries": query,
+            "response_generated": response_generated,
+            "error_messages": error_message,
+            "processing_times": processing_time,
+            "created_ats": datetime.now(timezone.utc),
+        })
+
+    def log_admin_action(self, admin_id, action: str, target_type: Optional[str] = None,
+                         target_id=None, details: Optional[Dict] = None):
+        """Queue an admin_logs row"""
+        self._queue("admin_logs", {
+            "admin_ids": _uuid(admin_id),
+            "actions": action,
+            "target_types": target_type,
+            "target_ids": _uuid(target_id),
+            "details": json.dumps(details or {}),
+            "created_ats": datetime.now(timezone.utc),
+        })
+
+    def record_login(self, user_id):
+        """Queue a users.last_login_at update; repeated logins before a flush write once"""
+        self._logins[_uuid(user_id)] = datetime.now(timezone.utc)
+        self.queued += 1
+        self._trim()
+        if self.pending() >= self.batch_size:
+            self._wake.set()
+
+    # ----- flushing -----
+
+    async def flush(self) -> int:
+        """Write everything queued so far. Returns the number of rows written"""
+        async with self._flush_lock:
+            if not self.pending():
+                return 0
+
+            rows, self._rows = self._rows, {table: [] for table in self.TABLES}
+            logins, self._logins = self._logins, {}
+            batches = {table: table_rows for table, table_rows in rows.items() if table_rows}
+            if logins:
+                batches["last_logins"] = [
+                    {"user_ids": user_id, "logged_in_ats": logged_in_at}
+                    for user_id, logged_in_at in logins.items()
+                ]
+
+            try:
+                try:
+                    written = await self._write_batches(batches)
+                except Exception as e:
+                    if not _is_row_error(e):
+                        raise
+                    # The same batch would fail every retry - find the bad rows instead
+                    self.flush_errors += 1
+                    print(f"Write buffer flush rejected, writing row by row: {getattr(e, 'orig', e)}")
+                    written = await self._write_rows(batches)
+            except Exception:
+                # Put the rows back ahead of anything queued meanwhile, to retry next flush
+                for table in self.TABLES:
+                    self._rows[table] = rows[table] + self._rows[table]
+                for user_id, logged_in_at in logins.items():
+                    if user_id not in self._logins:
+                        self._logins[user_id] = logged_in_at
+                self._trim()
+                self.flush_errors += 1
+                raise
+
+            self.written += written
+            self.flushes += 1
+            return written
+
+    async def _write_batches(self, batches: Dict[str, List[Dict]]) -> int:
+        """One statement per table, in one transaction"""
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as session:
+            for table, table_rows in batches.items():
+                statement, columns = STATEMENTS[table]
+                await session.execute(text(statement), _columns(table_rows, columns))
+            await session.commit()
+        return sum(len(table_rows) for table_rows in batches.values())
+
+    async def _write_rows(self, batches: Dict[str, List[Dict]]) -> int:
+        """One statement per row, each in a savepoint; rows the database rejects are dropped"""
+        from sqlalchemy import text
+        from database import AsyncSessionLocal
+
+        written = rejected = 0
+        async with AsyncSessionLocal() as session:
+            for table, table_rows in batches.items():
+                statement, columns = STATEMENTS[table]
+                for row in table_rows:
+                    try:
+                        async with session.begin_nested():
+                            await session.execute(text(statement), _columns([row], columns))
+                        written += 1
+                    except Exception as e:
+                        if not _is_row_error(e):
+                            raise
+                        rejected += 1
+                        print(f"Write buffer dropped a {table} row: {getattr(e, 'orig', e)}")
+            await session.commit()
+        self.rejected += rejected
+        return written
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=WRITE_BUFFER_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Write buffer flush failed: {e}")
+                # Back off rather than retrying straight away on a full buffer
+                await asyncio.sleep(WRITE_BUFFER_FLUSH_SECONDS)
+
+    def start(self):
+        """Start the periodic flush task"""
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flush task and write anything still queued"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Final write buffer flush failed, {self.pending()} rows lost: {e}")
+
+    def get_stats(self) -> Dict:
+        return {
+            "pending": {
+                **{table: len(rows) for table, rows in self._rows.items()},
+                "lastLogins": len(self._logins),
+            },
+            "queued": self.queued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "flushes": self.flushes,
+            "flushErrors": self.flush_errors,
+        }
+
+
+write_buffer = WriteBehindBuffer()
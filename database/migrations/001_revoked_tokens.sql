@@ -0,0 +1,18 @@
+-- ============================================
+-- Migration 001: Token revocation list
+-- Backs /auth/logout and account deletion; each API worker
+-- mirrors this table in memory (see backend/token_revocation.py)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    revocation_id BIGSERIAL PRIMARY KEY,
+    token_hash CHAR(64),
+    user_id UUID,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CHECK (token_hash IS NOT NULL OR user_id IS NOT NULL)
+);
+
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+COMMENT ON TABLE revoked_tokens IS 'Revoked JWTs (by SHA-256) and per-user revocation cutoffs';
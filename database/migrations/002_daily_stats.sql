@@ -0,0 +1,85 @@
+-- ============================================
+-- Migration 002: daily_stats rollup
+-- Per-day counters for the admin dashboard, maintained by
+-- refresh_daily_stats() which the API runs periodically
+-- (see backend/rollups.py)
+-- ============================================
+
+CREATE TABLE IF NOT EXISTS daily_stats (
+    stat_date DATE PRIMARY KEY,
+    new_users INTEGER NOT NULL DEFAULT 0,
+    new_conversations INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    active_users INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recompute daily_stats rows from from_date (UTC) through today.
+-- Pass NULL to rebuild the whole history.
+CREATE OR REPLACE FUNCTION refresh_daily_stats(from_date DATE)
+RETURNS VOID AS $$
+DECLARE
+    start_date DATE;
+    start_ts TIMESTAMP WITH TIME ZONE;
+BEGIN
+    start_date := COALESCE(
+        from_date,
+        (SELECT (MIN(created_at) AT TIME ZONE 'UTC')::date FROM users),
+        (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date
+    );
+    start_ts := start_date::timestamp AT TIME ZONE 'UTC';
+
+    INSERT INTO daily_stats (stat_date, new_users, new_conversations, messages, active_users, revenue, updated_at)
+    SELECT
+        d.day,
+        COALESCE(u.n, 0),
+        COALESCE(c.n, 0),
+        COALESCE(m.n, 0),
+        COALESCE(m.active, 0),
+        COALESCE(p.amount, 0),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT generate_series(start_date, (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date, INTERVAL '1 day')::date AS day
+    ) d
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM users
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) u ON u.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM conversations
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) c ON c.day = d.day
+    LEFT JOIN (
+        SELECT (m.created_at AT TIME ZONE 'UTC')::date AS day,
+               COUNT(*) AS n,
+               COUNT(DISTINCT c.user_id) AS active
+        FROM messages m
+        JOIN conversations c ON c.conversation_id = m.conversation_id
+        WHERE m.created_at >= start_ts
+        GROUP BY 1
+    ) m ON m.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, SUM(amount) AS amount
+        FROM payment_history
+        WHERE created_at >= start_ts AND status = 'succeeded'
+        GROUP BY 1
+    ) p ON p.day = d.day
+    ON CONFLICT (stat_date) DO UPDATE SET
+        new_users = EXCLUDED.new_users,
+        new_conversations = EXCLUDED.new_conversations,
+        messages = EXCLUDED.messages,
+        active_users = EXCLUDED.active_users,
+        revenue = EXCLUDED.revenue,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE daily_stats IS 'Per-day rollup of users, conversations, messages, active users and revenue';
+
+-- Backfill existing history
+SELECT refresh_daily_stats(NULL);
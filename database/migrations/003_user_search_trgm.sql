@@ -0,0 +1,13 @@
+-- ============================================
+-- Migration 003: Trigram indexes for admin user search
+-- Serves ILIKE '%term%' and similarity search on email/name, plus
+-- email prefix lookups (see backend/user_search.py)
+-- Built CONCURRENTLY so users stays writable - run outside a transaction
+-- ============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_email_prefix ON users (lower(email) text_pattern_ops);
@@ -0,0 +1,37 @@
+-- ============================================
+-- Migration 004: Composite indexes for the hot query shapes
+-- Each index matches a WHERE + ORDER BY used by the API so the planner can
+-- walk it in order and stop at the LIMIT, with no separate sort step
+-- (checked by backend/test_query_plans.py)
+-- Built CONCURRENTLY - run outside a transaction
+-- ============================================
+
+-- Chat history: WHERE conversation_id = ? ORDER BY created_at, message_id
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_conversation_created
+    ON messages (conversation_id, created_at, message_id);
+
+-- Sidebar: WHERE user_id = ? AND status = 'active' ORDER BY last_message_at DESC
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_user_status_last_message
+    ON conversations (user_id, status, last_message_at DESC);
+
+-- Latest subscription per user (quota checks, admin user list)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subscriptions_user_created
+    ON subscriptions (user_id, created_at DESC);
+
+-- Keyset pagination and exports: ORDER BY created_at, <id>
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_created_id ON users (created_at, user_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_conversations_created_id ON conversations (created_at, conversation_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_messages_created_id ON messages (created_at, message_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_subscriptions_created_id ON subscriptions (created_at, subscription_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_payment_history_created_id ON payment_history (created_at, payment_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_admin_logs_created_id ON admin_logs (created_at, log_id);
+
+-- Superseded: each is a leading prefix of a composite above
+DROP INDEX CONCURRENTLY IF EXISTS idx_messages_conversation_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_subscriptions_user_id;
+DROP INDEX CONCURRENTLY IF EXISTS idx_users_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_conversations_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_messages_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_payment_history_created_at;
+DROP INDEX CONCURRENTLY IF EXISTS idx_admin_logs_created_at;
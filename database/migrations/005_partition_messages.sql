@@ -0,0 +1,262 @@
+-- ============================================
+-- Migration 005: Monthly partitions for messages + message archive
+-- messages becomes range-partitioned on created_at, one partition per UTC
+-- month, so each month's indexes stay small and settled months are no longer
+-- rewritten by vacuum. Messages of conversations the user deleted
+-- (status = 'archived') are moved to messages_archive by
+-- archive_conversation_messages() - see backend/message_archive.py, which also
+-- keeps partitions created ahead of time via ensure_messages_partitions().
+--
+-- Copies every message under an exclusive lock - run in a maintenance window.
+-- ============================================
+
+BEGIN;
+
+-- A partitioned table cannot have a unique key on message_id alone, so the
+-- foreign keys pointing at it are replaced by delete_message_references() below
+ALTER TABLE query_analytics DROP CONSTRAINT IF EXISTS query_analytics_message_id_fkey;
+ALTER TABLE user_feedback DROP CONSTRAINT IF EXISTS user_feedback_message_id_fkey;
+DROP VIEW IF EXISTS conversation_summary;
+
+ALTER TABLE messages RENAME TO messages_unpartitioned;
+
+CREATE TABLE messages (
+    message_id UUID NOT NULL DEFAULT uuid_generate_v4(),
+    conversation_id UUID NOT NULL
+        CONSTRAINT messages_conversation_id_fkey REFERENCES conversations(conversation_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL CONSTRAINT messages_role_check CHECK (role IN ('user', 'assistant', 'system')),
+    content TEXT NOT NULL,
+    sources JSONB DEFAULT '[]'::jsonb,
+    attached_documents JSONB DEFAULT '[]'::jsonb,
+    tokens_used INTEGER DEFAULT 0,
+    response_time INTEGER,
+    feedback VARCHAR(20) CONSTRAINT messages_feedback_check CHECK (feedback IN ('helpful', 'not_helpful', NULL)),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (created_at);
+
+-- Create the monthly partitions (messages_YYYY_MM) covering from_ts's month
+-- through months_ahead months past the current one. Returns how many were created.
+CREATE OR REPLACE FUNCTION ensure_messages_partitions(from_ts TIMESTAMP WITH TIME ZONE, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    last_month DATE;
+    partition_name TEXT;
+    created INTEGER := 0;
+BEGIN
+    month_start := date_trunc('month', COALESCE(from_ts, CURRENT_TIMESTAMP) AT TIME ZONE 'UTC')::date;
+    last_month := (date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + make_interval(months => months_ahead))::date;
+
+    WHILE month_start <= last_month LOOP
+        partition_name := 'messages_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                month_start::timestamp AT TIME ZONE 'UTC',
+                (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT ensure_messages_partitions((SELECT MIN(created_at) FROM messages_unpartitioned), 3);
+
+INSERT INTO messages (message_id, conversation_id, role, content, sources, attached_documents,
+                      tokens_used, response_time, feedback, created_at)
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, COALESCE(created_at, CURRENT_TIMESTAMP)
+FROM messages_unpartitioned;
+
+DROP TABLE messages_unpartitioned;
+
+ALTER TABLE messages ADD PRIMARY KEY (message_id, created_at);
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at, message_id);
+CREATE INDEX idx_messages_created_id ON messages(created_at, message_id);
+CREATE INDEX idx_messages_role ON messages(role);
+
+-- Messages of deleted conversations, out of the hot partitions.
+-- Append-only; toast_tuple_target makes Postgres compress anything over 128 bytes.
+CREATE TABLE messages_archive (
+    message_id UUID PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES conversations(conversation_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    sources JSONB,
+    attached_documents JSONB,
+    tokens_used INTEGER,
+    response_time INTEGER,
+    feedback VARCHAR(20),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+) WITH (toast_tuple_target = 128, fillfactor = 100);
+
+CREATE INDEX idx_messages_archive_conversation_created ON messages_archive(conversation_id, created_at, message_id);
+CREATE INDEX idx_messages_archive_created_id ON messages_archive(created_at, message_id);
+
+-- Archived conversations whose messages have not been moved yet
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS messages_archived_at TIMESTAMP WITH TIME ZONE;
+CREATE INDEX idx_conversations_archive_pending ON conversations(updated_at)
+    WHERE status = 'archived' AND messages_archived_at IS NULL;
+
+-- Looked up for every deleted message by delete_message_references()
+CREATE INDEX idx_query_analytics_message_id ON query_analytics(message_id);
+
+-- Stands in for the ON DELETE rules of the dropped foreign keys. A message
+-- that was only moved to messages_archive keeps its feedback and analytics.
+CREATE OR REPLACE FUNCTION delete_message_references()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM messages_archive WHERE message_id = OLD.message_id) THEN
+        RETURN OLD;
+    END IF;
+    DELETE FROM user_feedback WHERE message_id = OLD.message_id;
+    UPDATE query_analytics SET message_id = NULL WHERE message_id = OLD.message_id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER delete_messages_references AFTER DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION delete_message_references();
+
+CREATE TRIGGER delete_messages_archive_references AFTER DELETE ON messages_archive
+    FOR EACH ROW EXECUTE FUNCTION delete_message_references();
+
+-- Move the messages of up to batch_size conversations deleted before
+-- archived_before into messages_archive, in this transaction
+CREATE OR REPLACE FUNCTION archive_conversation_messages(archived_before TIMESTAMP WITH TIME ZONE, batch_size INTEGER)
+RETURNS TABLE (archived_conversations INTEGER, archived_messages INTEGER) AS $$
+DECLARE
+    batch UUID[];
+    moved INTEGER;
+BEGIN
+    SELECT array_agg(c.conversation_id) INTO batch
+    FROM (
+        SELECT conversation_id FROM conversations
+        WHERE status = 'archived' AND messages_archived_at IS NULL AND updated_at < archived_before
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ) c;
+
+    IF batch IS NULL THEN
+        RETURN QUERY SELECT 0, 0;
+        RETURN;
+    END IF;
+
+    INSERT INTO messages_archive (message_id, conversation_id, role, content, sources, attached_documents,
+                                  tokens_used, response_time, feedback, created_at)
+    SELECT message_id, conversation_id, role, content, sources, attached_documents,
+           tokens_used, response_time, feedback, created_at
+    FROM messages
+    WHERE conversation_id = ANY(batch)
+    ON CONFLICT (message_id) DO NOTHING;
+
+    DELETE FROM messages WHERE conversation_id = ANY(batch);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+
+    UPDATE conversations SET messages_archived_at = CURRENT_TIMESTAMP
+    WHERE conversation_id = ANY(batch);
+
+    RETURN QUERY SELECT cardinality(batch), moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Live and archived messages together, for admin views, exports and rollups
+CREATE VIEW all_messages AS
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at
+FROM messages
+UNION ALL
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at
+FROM messages_archive;
+
+CREATE VIEW conversation_summary AS
+SELECT
+    c.conversation_id,
+    c.user_id,
+    c.title,
+    c.created_at,
+    c.last_message_at,
+    COUNT(m.message_id) as total_messages,
+    SUM(CASE WHEN m.role = 'user' THEN 1 ELSE 0 END) as user_messages,
+    SUM(CASE WHEN m.role = 'assistant' THEN 1 ELSE 0 END) as assistant_messages
+FROM conversations c
+LEFT JOIN all_messages m ON c.conversation_id = m.conversation_id
+GROUP BY c.conversation_id, c.user_id, c.title, c.created_at, c.last_message_at;
+
+-- Same as migration 002, counting archived messages too
+CREATE OR REPLACE FUNCTION refresh_daily_stats(from_date DATE)
+RETURNS VOID AS $$
+DECLARE
+    start_date DATE;
+    start_ts TIMESTAMP WITH TIME ZONE;
+BEGIN
+    start_date := COALESCE(
+        from_date,
+        (SELECT (MIN(created_at) AT TIME ZONE 'UTC')::date FROM users),
+        (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date
+    );
+    start_ts := start_date::timestamp AT TIME ZONE 'UTC';
+
+    INSERT INTO daily_stats (stat_date, new_users, new_conversations, messages, active_users, revenue, updated_at)
+    SELECT
+        d.day,
+        COALESCE(u.n, 0),
+        COALESCE(c.n, 0),
+        COALESCE(m.n, 0),
+        COALESCE(m.active, 0),
+        COALESCE(p.amount, 0),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT generate_series(start_date, (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date, INTERVAL '1 day')::date AS day
+    ) d
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM users
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) u ON u.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM conversations
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) c ON c.day = d.day
+    LEFT JOIN (
+        SELECT (m.created_at AT TIME ZONE 'UTC')::date AS day,
+               COUNT(*) AS n,
+               COUNT(DISTINCT c.user_id) AS active
+        FROM all_messages m
+        JOIN conversations c ON c.conversation_id = m.conversation_id
+        WHERE m.created_at >= start_ts
+        GROUP BY 1
+    ) m ON m.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, SUM(amount) AS amount
+        FROM payment_history
+        WHERE created_at >= start_ts AND status = 'succeeded'
+        GROUP BY 1
+    ) p ON p.day = d.day
+    ON CONFLICT (stat_date) DO UPDATE SET
+        new_users = EXCLUDED.new_users,
+        new_conversations = EXCLUDED.new_conversations,
+        messages = EXCLUDED.messages,
+        active_users = EXCLUDED.active_users,
+        revenue = EXCLUDED.revenue,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON TABLE messages IS 'Individual messages within conversations, partitioned by month';
+COMMENT ON TABLE messages_archive IS 'Messages of deleted conversations, moved out of the hot partitions';
+
+ANALYZE messages;
+
+COMMIT;
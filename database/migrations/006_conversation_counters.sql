@@ -0,0 +1,99 @@
+-- ============================================
+-- Migration 006: Trigger-maintained conversation counters
+-- message_count, the per-role counts and last_message_at on conversations
+-- are kept by statement-level triggers on messages - one atomic UPDATE per
+-- conversation per INSERT, so concurrent sends no longer lose increments
+-- and conversation_summary reads the counters instead of aggregating messages
+-- ============================================
+
+BEGIN;
+
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS user_message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN IF NOT EXISTS assistant_message_count INTEGER NOT NULL DEFAULT 0;
+
+CREATE OR REPLACE FUNCTION count_inserted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations c SET
+        message_count = COALESCE(c.message_count, 0) + n.total,
+        user_message_count = c.user_message_count + n.user_messages,
+        assistant_message_count = c.assistant_message_count + n.assistant_messages,
+        last_message_at = GREATEST(c.last_message_at, n.latest)
+    FROM (
+        SELECT conversation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE role = 'user') AS user_messages,
+               COUNT(*) FILTER (WHERE role = 'assistant') AS assistant_messages,
+               MAX(created_at) AS latest
+        FROM new_messages
+        GROUP BY conversation_id
+    ) n
+    WHERE c.conversation_id = n.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Messages moved to messages_archive still count
+CREATE OR REPLACE FUNCTION count_deleted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations c SET
+        message_count = GREATEST(COALESCE(c.message_count, 0) - n.total, 0),
+        user_message_count = GREATEST(c.user_message_count - n.user_messages, 0),
+        assistant_message_count = GREATEST(c.assistant_message_count - n.assistant_messages, 0)
+    FROM (
+        SELECT o.conversation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE o.role = 'user') AS user_messages,
+               COUNT(*) FILTER (WHERE o.role = 'assistant') AS assistant_messages
+        FROM old_messages o
+        WHERE NOT EXISTS (SELECT 1 FROM messages_archive a WHERE a.message_id = o.message_id)
+        GROUP BY o.conversation_id
+    ) n
+    WHERE c.conversation_id = n.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Creating the triggers blocks inserts into messages until COMMIT,
+-- so the backfill below cannot miss or double-count a message
+CREATE TRIGGER count_messages_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_messages();
+
+CREATE TRIGGER count_messages_delete AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_messages();
+
+UPDATE conversations c SET
+    message_count = COALESCE(n.total, 0),
+    user_message_count = COALESCE(n.user_messages, 0),
+    assistant_message_count = COALESCE(n.assistant_messages, 0)
+FROM conversations c2
+LEFT JOIN (
+    SELECT conversation_id,
+           COUNT(*) AS total,
+           COUNT(*) FILTER (WHERE role = 'user') AS user_messages,
+           COUNT(*) FILTER (WHERE role = 'assistant') AS assistant_messages
+    FROM all_messages
+    GROUP BY conversation_id
+) n ON n.conversation_id = c2.conversation_id
+WHERE c.conversation_id = c2.conversation_id;
+
+ALTER TABLE conversations ALTER COLUMN message_count SET NOT NULL;
+
+-- Column types change (bigint -> integer), so the view is recreated
+DROP VIEW IF EXISTS conversation_summary;
+CREATE VIEW conversation_summary AS
+SELECT
+    c.conversation_id,
+    c.user_id,
+    c.title,
+    c.created_at,
+    c.last_message_at,
+    c.message_count as total_messages,
+    c.user_message_count as user_messages,
+    c.assistant_message_count as assistant_messages
+FROM conversations c;
+
+COMMIT;
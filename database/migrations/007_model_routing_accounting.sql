@@ -0,0 +1,78 @@
+-- ============================================
+-- Migration 007: Model routing accounting on messages
+-- Assistant messages record the model and route (backend/model_routing.py)
+-- that produced them, their prompt and completion tokens and estimated cost;
+-- response_time now holds the OpenAI call's latency in ms. Archived messages
+-- and the all_messages view carry the new columns too.
+-- Adding nullable columns does not rewrite the tables.
+-- ============================================
+
+BEGIN;
+
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS model VARCHAR(50);
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS model_route VARCHAR(20);
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN IF NOT EXISTS cost_usd NUMERIC(12, 6);
+
+ALTER TABLE messages_archive ADD COLUMN IF NOT EXISTS model VARCHAR(50);
+ALTER TABLE messages_archive ADD COLUMN IF NOT EXISTS model_route VARCHAR(20);
+ALTER TABLE messages_archive ADD COLUMN IF NOT EXISTS prompt_tokens INTEGER;
+ALTER TABLE messages_archive ADD COLUMN IF NOT EXISTS completion_tokens INTEGER;
+ALTER TABLE messages_archive ADD COLUMN IF NOT EXISTS cost_usd NUMERIC(12, 6);
+
+-- Move the messages of up to batch_size conversations deleted before
+-- archived_before into messages_archive, in this transaction
+CREATE OR REPLACE FUNCTION archive_conversation_messages(archived_before TIMESTAMP WITH TIME ZONE, batch_size INTEGER)
+RETURNS TABLE (archived_conversations INTEGER, archived_messages INTEGER) AS $$
+DECLARE
+    batch UUID[];
+    moved INTEGER;
+BEGIN
+    SELECT array_agg(c.conversation_id) INTO batch
+    FROM (
+        SELECT conversation_id FROM conversations
+        WHERE status = 'archived' AND messages_archived_at IS NULL AND updated_at < archived_before
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ) c;
+
+    IF batch IS NULL THEN
+        RETURN QUERY SELECT 0, 0;
+        RETURN;
+    END IF;
+
+    INSERT INTO messages_archive (message_id, conversation_id, role, content, sources, attached_documents,
+                                  tokens_used, response_time, feedback, created_at,
+                                  model, model_route, prompt_tokens, completion_tokens, cost_usd)
+    SELECT message_id, conversation_id, role, content, sources, attached_documents,
+           tokens_used, response_time, feedback, created_at,
+           model, model_route, prompt_tokens, completion_tokens, cost_usd
+    FROM messages
+    WHERE conversation_id = ANY(batch)
+    ON CONFLICT (message_id) DO NOTHING;
+
+    DELETE FROM messages WHERE conversation_id = ANY(batch);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+
+    UPDATE conversations SET messages_archived_at = CURRENT_TIMESTAMP
+    WHERE conversation_id = ANY(batch);
+
+    RETURN QUERY SELECT cardinality(batch), moved;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Live and archived messages together, for admin views, exports and rollups
+CREATE OR REPLACE VIEW all_messages AS
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at,
+       model, model_route, prompt_tokens, completion_tokens, cost_usd
+FROM messages
+UNION ALL
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at,
+       model, model_route, prompt_tokens, completion_tokens, cost_usd
+FROM messages_archive;
+
+COMMIT;
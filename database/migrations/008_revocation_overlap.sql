@@ -0,0 +1,9 @@
+-- ============================================
+-- Migration 008: Index revoked_tokens by revocation time
+-- Workers re-read the revocations of the last REVOCATION_OVERLAP_SECONDS on
+-- every refresh, so rows whose transaction committed after a higher
+-- revocation_id was already seen are still picked up
+-- (see backend/token_revocation.py)
+-- ============================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
@@ -0,0 +1,101 @@
+-- ============================================
+-- Migration 009: Default partition for messages
+-- A message whose created_at has no monthly partition (the partition
+-- maintenance stopped, a clock far off) now lands in messages_default instead
+-- of failing the insert. backend/message_archive.py reports rows there as an
+-- alert; ensure_messages_partitions() moves a month's rows out of it when
+-- that month's partition is created.
+--
+-- Also clears conversations.messages_archived_at when a message is added,
+-- so the archiver picks such a conversation up again.
+-- ============================================
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS messages_default PARTITION OF messages DEFAULT;
+
+-- Create the monthly partitions (messages_YYYY_MM) covering from_ts's month
+-- through months_ahead months past the current one. Returns how many were created.
+CREATE OR REPLACE FUNCTION ensure_messages_partitions(from_ts TIMESTAMP WITH TIME ZONE, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    last_month DATE;
+    partition_name TEXT;
+    range_start TIMESTAMP WITH TIME ZONE;
+    range_end TIMESTAMP WITH TIME ZONE;
+    moving BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    month_start := date_trunc('month', COALESCE(from_ts, CURRENT_TIMESTAMP) AT TIME ZONE 'UTC')::date;
+    last_month := (date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + make_interval(months => months_ahead))::date;
+
+    WHILE month_start <= last_month LOOP
+        partition_name := 'messages_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            range_start := month_start::timestamp AT TIME ZONE 'UTC';
+            range_end := (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+
+            -- The new partition cannot be created while messages_default holds
+            -- rows in its range, so set them aside first. They are moved, not
+            -- deleted: delete_message_references() must not run, and inserting
+            -- into the partition directly skips the counter triggers.
+            moving := EXISTS (
+                SELECT 1 FROM messages_default WHERE created_at >= range_start AND created_at < range_end
+            );
+            IF moving THEN
+                CREATE TEMP TABLE messages_moved (LIKE messages) ON COMMIT DROP;
+                ALTER TABLE messages_default DISABLE TRIGGER delete_messages_references;
+                WITH moved AS (
+                    DELETE FROM messages_default
+                    WHERE created_at >= range_start AND created_at < range_end
+                    RETURNING *
+                )
+                INSERT INTO messages_moved SELECT * FROM moved;
+                ALTER TABLE messages_default ENABLE TRIGGER delete_messages_references;
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                partition_name, range_start, range_end
+            );
+
+            IF moving THEN
+                EXECUTE format('INSERT INTO %I SELECT * FROM messages_moved', partition_name);
+                DROP TABLE messages_moved;
+            END IF;
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A conversation whose messages were archived gets new ones back in
+-- messages (a send that raced the archiver) - archive it again later
+CREATE OR REPLACE FUNCTION count_inserted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations c SET
+        message_count = COALESCE(c.message_count, 0) + n.total,
+        user_message_count = c.user_message_count + n.user_messages,
+        assistant_message_count = c.assistant_message_count + n.assistant_messages,
+        last_message_at = GREATEST(c.last_message_at, n.latest),
+        messages_archived_at = NULL
+    FROM (
+        SELECT conversation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE role = 'user') AS user_messages,
+               COUNT(*) FILTER (WHERE role = 'assistant') AS assistant_messages,
+               MAX(created_at) AS latest
+        FROM new_messages
+        GROUP BY conversation_id
+    ) n
+    WHERE c.conversation_id = n.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMIT;
@@ -0,0 +1,10 @@
+-- ============================================
+-- Migration 010: Name prefix indexes for short user searches
+-- Search terms under three characters cannot use the trigram indexes, so
+-- they match the start of the email or either name (see
+-- backend/user_search.py); these serve the name half
+-- Built CONCURRENTLY so users stays writable - run outside a transaction
+-- ============================================
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_first_name_prefix ON users (lower(first_name) text_pattern_ops);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_users_last_name_prefix ON users (lower(last_name) text_pattern_ops);
@@ -1,7 +1,7 @@
 -- ============================================
 -- Anna Legal AI Chat Assistant - Database Schema
 -- Database: PostgreSQL 14+
--- Extensions: pgvector for embeddings
+-- Extensions: pgvector for embeddings, pg_trgm for user search
 -- ============================================
 
 -- Enable UUID extension
@@ -10,6 +10,9 @@ CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
 -- Enable pgvector extension for embeddings
 CREATE EXTENSION IF NOT EXISTS vector;
 
+-- Enable pg_trgm for indexed substring / fuzzy user search
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 -- ============================================
 -- TABLE: users
 -- Stores user account information
@@ -32,7 +35,16 @@ CREATE TABLE users (
 -- Indexes for users table
 CREATE INDEX idx_users_email ON users(email);
 CREATE INDEX idx_users_account_status ON users(account_status);
-CREATE INDEX idx_users_created_at ON users(created_at);
+CREATE INDEX idx_users_created_id ON users(created_at, user_id);
+
+-- Admin user search: trigram indexes serve ILIKE '%term%' and similarity,
+-- the text_pattern_ops index serves email prefix lookups
+CREATE INDEX idx_users_email_trgm ON users USING gin (email gin_trgm_ops);
+CREATE INDEX idx_users_first_name_trgm ON users USING gin (first_name gin_trgm_ops);
+CREATE INDEX idx_users_last_name_trgm ON users USING gin (last_name gin_trgm_ops);
+CREATE INDEX idx_users_email_prefix ON users (lower(email) text_pattern_ops);
+CREATE INDEX idx_users_first_name_prefix ON users (lower(first_name) text_pattern_ops);
+CREATE INDEX idx_users_last_name_prefix ON users (lower(last_name) text_pattern_ops);
 
 -- ============================================
 -- TABLE: subscriptions
@@ -55,7 +67,8 @@ CREATE TABLE subscriptions (
 );
 
 -- Indexes for subscriptions table
-CREATE INDEX idx_subscriptions_user_id ON subscriptions(user_id);
+CREATE INDEX idx_subscriptions_user_created ON subscriptions(user_id, created_at DESC);
+CREATE INDEX idx_subscriptions_created_id ON subscriptions(created_at, subscription_id);
 CREATE INDEX idx_subscriptions_stripe_customer_id ON subscriptions(stripe_customer_id);
 CREATE INDEX idx_subscriptions_status ON subscriptions(status);
 
@@ -78,7 +91,7 @@ CREATE TABLE payment_history (
 -- Indexes for payment_history table
 CREATE INDEX idx_payment_history_user_id ON payment_history(user_id);
 CREATE INDEX idx_payment_history_subscription_id ON payment_history(subscription_id);
-CREATE INDEX idx_payment_history_created_at ON payment_history(created_at);
+CREATE INDEX idx_payment_history_created_id ON payment_history(created_at, payment_id);
 CREATE INDEX idx_payment_history_status ON payment_history(status);
 
 -- ============================================
@@ -90,23 +103,32 @@ CREATE TABLE conversations (
     user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
     title VARCHAR(255),
     status VARCHAR(20) DEFAULT 'active' CHECK (status IN ('active', 'archived')),
-    message_count INTEGER DEFAULT 0,
+    message_count INTEGER NOT NULL DEFAULT 0,  -- counters maintained by the messages triggers
+    user_message_count INTEGER NOT NULL DEFAULT 0,
+    assistant_message_count INTEGER NOT NULL DEFAULT 0,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    last_message_at TIMESTAMP WITH TIME ZONE
+    last_message_at TIMESTAMP WITH TIME ZONE,
+    messages_archived_at TIMESTAMP WITH TIME ZONE
 );
 
 -- Indexes for conversations table
-CREATE INDEX idx_conversations_user_id ON conversations(user_id);
-CREATE INDEX idx_conversations_created_at ON conversations(created_at);
+CREATE INDEX idx_conversations_user_status_last_message ON conversations(user_id, status, last_message_at DESC);
+CREATE INDEX idx_conversations_created_id ON conversations(created_at, conversation_id);
 CREATE INDEX idx_conversations_last_message_at ON conversations(last_message_at);
+-- Archived conversations whose messages have not been moved to messages_archive yet
+CREATE INDEX idx_conversations_archive_pending ON conversations(updated_at)
+    WHERE status = 'archived' AND messages_archived_at IS NULL;
 
 -- ============================================
 -- TABLE: messages
 -- Stores individual chat messages
+-- Range-partitioned by UTC month (messages_YYYY_MM), partitions are
+-- created ahead by ensure_messages_partitions() (see FUNCTIONS below);
+-- messages_default takes anything outside them
 -- ============================================
 CREATE TABLE messages (
-    message_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    message_id UUID NOT NULL DEFAULT uuid_generate_v4(),
     conversation_id UUID NOT NULL REFERENCES conversations(conversation_id) ON DELETE CASCADE,
     role VARCHAR(20) NOT NULL CHECK (role IN ('user', 'assistant', 'system')),
     content TEXT NOT NULL,
@@ -115,14 +137,54 @@ CREATE TABLE messages (
     tokens_used INTEGER DEFAULT 0,
     response_time INTEGER,
     feedback VARCHAR(20) CHECK (feedback IN ('helpful', 'not_helpful', NULL)),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
-);
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    -- Assistant messages: how the answer was produced (backend/model_routing.py)
+    model VARCHAR(50),
+    model_route VARCHAR(20),
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cost_usd NUMERIC(12, 6),
+    PRIMARY KEY (message_id, created_at)
+) PARTITION BY RANGE (created_at);
 
 -- Indexes for messages table
-CREATE INDEX idx_messages_conversation_id ON messages(conversation_id);
-CREATE INDEX idx_messages_created_at ON messages(created_at);
+CREATE INDEX idx_messages_conversation_created ON messages(conversation_id, created_at, message_id);
+CREATE INDEX idx_messages_created_id ON messages(created_at, message_id);
 CREATE INDEX idx_messages_role ON messages(role);
 
+-- Catches messages outside every monthly partition, so the insert does not
+-- fail; should stay empty (backend/message_archive.py alerts otherwise)
+CREATE TABLE messages_default PARTITION OF messages DEFAULT;
+
+-- ============================================
+-- TABLE: messages_archive
+-- Messages of deleted conversations, moved out of the hot partitions
+-- by archive_conversation_messages(). Append-only; toast_tuple_target
+-- makes Postgres compress anything over 128 bytes
+-- ============================================
+CREATE TABLE messages_archive (
+    message_id UUID PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES conversations(conversation_id) ON DELETE CASCADE,
+    role VARCHAR(20) NOT NULL,
+    content TEXT NOT NULL,
+    sources JSONB,
+    attached_documents JSONB,
+    tokens_used INTEGER,
+    response_time INTEGER,
+    feedback VARCHAR(20),
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    archived_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    model VARCHAR(50),
+    model_route VARCHAR(20),
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cost_usd NUMERIC(12, 6)
+) WITH (toast_tuple_target = 128, fillfactor = 100);
+
+-- Indexes for messages_archive table
+CREATE INDEX idx_messages_archive_conversation_created ON messages_archive(conversation_id, created_at, message_id);
+CREATE INDEX idx_messages_archive_created_id ON messages_archive(created_at, message_id);
+
 -- ============================================
 -- TABLE: legal_documents
 -- Stores legal knowledge base documents (admin uploaded)
@@ -232,7 +294,7 @@ CREATE TABLE query_analytics (
     query_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID REFERENCES users(user_id) ON DELETE SET NULL,
     conversation_id UUID REFERENCES conversations(conversation_id) ON DELETE SET NULL,
-    message_id UUID REFERENCES messages(message_id) ON DELETE SET NULL,
+    message_id UUID,  -- SET NULL when the message is deleted, by delete_message_references()
     query TEXT NOT NULL,
     retrieved_documents JSONB DEFAULT '[]'::jsonb,
     relevance_scores JSONB DEFAULT '[]'::jsonb,
@@ -247,6 +309,7 @@ CREATE TABLE query_analytics (
 CREATE INDEX idx_query_analytics_user_id ON query_analytics(user_id);
 CREATE INDEX idx_query_analytics_created_at ON query_analytics(created_at);
 CREATE INDEX idx_query_analytics_error_occurred ON query_analytics(error_occurred);
+CREATE INDEX idx_query_analytics_message_id ON query_analytics(message_id);
 
 -- ============================================
 -- TABLE: user_feedback
@@ -255,7 +318,7 @@ CREATE INDEX idx_query_analytics_error_occurred ON query_analytics(error_occurre
 CREATE TABLE user_feedback (
     feedback_id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
     user_id UUID NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
-    message_id UUID NOT NULL REFERENCES messages(message_id) ON DELETE CASCADE,
+    message_id UUID NOT NULL,  -- deleted with the message, by delete_message_references()
     rating INTEGER CHECK (rating BETWEEN 1 AND 5),
     comment TEXT,
     feedback_type VARCHAR(20) CHECK (feedback_type IN ('helpful', 'not_helpful', 'incorrect', 'offensive')),
@@ -283,9 +346,42 @@ CREATE TABLE admin_logs (
 
 -- Indexes for admin_logs table
 CREATE INDEX idx_admin_logs_admin_id ON admin_logs(admin_id);
-CREATE INDEX idx_admin_logs_created_at ON admin_logs(created_at);
+CREATE INDEX idx_admin_logs_created_id ON admin_logs(created_at, log_id);
 CREATE INDEX idx_admin_logs_action ON admin_logs(action);
 
+-- ============================================
+-- TABLE: revoked_tokens
+-- Revoked JWTs and per-user revocation cutoffs
+-- Mirrored in memory by each API worker
+-- ============================================
+CREATE TABLE revoked_tokens (
+    revocation_id BIGSERIAL PRIMARY KEY,
+    token_hash CHAR(64),
+    user_id UUID,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    revoked_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    CHECK (token_hash IS NOT NULL OR user_id IS NOT NULL)
+);
+
+-- Indexes for revoked_tokens table
+CREATE INDEX idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+CREATE INDEX idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+
+-- ============================================
+-- TABLE: daily_stats
+-- Per-day rollup read by the admin dashboard
+-- Maintained by refresh_daily_stats() (see FUNCTIONS below)
+-- ============================================
+CREATE TABLE daily_stats (
+    stat_date DATE PRIMARY KEY,
+    new_users INTEGER NOT NULL DEFAULT 0,
+    new_conversations INTEGER NOT NULL DEFAULT 0,
+    messages INTEGER NOT NULL DEFAULT 0,
+    active_users INTEGER NOT NULL DEFAULT 0,
+    revenue DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
 -- ============================================
 -- TRIGGERS: Auto-update timestamps
 -- ============================================
@@ -312,10 +408,284 @@ CREATE TRIGGER update_conversations_updated_at BEFORE UPDATE ON conversations
 CREATE TRIGGER update_legal_documents_updated_at BEFORE UPDATE ON legal_documents
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- ============================================
+-- TRIGGERS: References to messages
+-- messages is partitioned, so user_feedback and query_analytics cannot
+-- hold a foreign key to it - these keep the ON DELETE behaviour instead
+-- ============================================
+
+-- A message that was only moved to messages_archive keeps its feedback and analytics
+CREATE OR REPLACE FUNCTION delete_message_references()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM messages_archive WHERE message_id = OLD.message_id) THEN
+        RETURN OLD;
+    END IF;
+    DELETE FROM user_feedback WHERE message_id = OLD.message_id;
+    UPDATE query_analytics SET message_id = NULL WHERE message_id = OLD.message_id;
+    RETURN OLD;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER delete_messages_references AFTER DELETE ON messages
+    FOR EACH ROW EXECUTE FUNCTION delete_message_references();
+
+CREATE TRIGGER delete_messages_archive_references AFTER DELETE ON messages_archive
+    FOR EACH ROW EXECUTE FUNCTION delete_message_references();
+
+-- ============================================
+-- TRIGGERS: Conversation counters
+-- message_count, the per-role counts and last_message_at are updated
+-- atomically, once per conversation per statement
+-- ============================================
+
+CREATE OR REPLACE FUNCTION count_inserted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations c SET
+        message_count = COALESCE(c.message_count, 0) + n.total,
+        user_message_count = c.user_message_count + n.user_messages,
+        assistant_message_count = c.assistant_message_count + n.assistant_messages,
+        last_message_at = GREATEST(c.last_message_at, n.latest),
+        messages_archived_at = NULL
+    FROM (
+        SELECT conversation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE role = 'user') AS user_messages,
+               COUNT(*) FILTER (WHERE role = 'assistant') AS assistant_messages,
+               MAX(created_at) AS latest
+        FROM new_messages
+        GROUP BY conversation_id
+    ) n
+    WHERE c.conversation_id = n.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Messages moved to messages_archive still count
+CREATE OR REPLACE FUNCTION count_deleted_messages()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE conversations c SET
+        message_count = GREATEST(COALESCE(c.message_count, 0) - n.total, 0),
+        user_message_count = GREATEST(c.user_message_count - n.user_messages, 0),
+        assistant_message_count = GREATEST(c.assistant_message_count - n.assistant_messages, 0)
+    FROM (
+        SELECT o.conversation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE o.role = 'user') AS user_messages,
+               COUNT(*) FILTER (WHERE o.role = 'assistant') AS assistant_messages
+        FROM old_messages o
+        WHERE NOT EXISTS (SELECT 1 FROM messages_archive a WHERE a.message_id = o.message_id)
+        GROUP BY o.conversation_id
+    ) n
+    WHERE c.conversation_id = n.conversation_id;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER count_messages_insert AFTER INSERT ON messages
+    REFERENCING NEW TABLE AS new_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION count_inserted_messages();
+
+CREATE TRIGGER count_messages_delete AFTER DELETE ON messages
+    REFERENCING OLD TABLE AS old_messages
+    FOR EACH STATEMENT EXECUTE FUNCTION count_deleted_messages();
+
+-- ============================================
+-- FUNCTIONS: Rollup maintenance
+-- ============================================
+
+-- Recompute daily_stats rows from from_date (UTC) through today.
+-- Pass NULL to rebuild the whole history.
+CREATE OR REPLACE FUNCTION refresh_daily_stats(from_date DATE)
+RETURNS VOID AS $$
+DECLARE
+    start_date DATE;
+    start_ts TIMESTAMP WITH TIME ZONE;
+BEGIN
+    start_date := COALESCE(
+        from_date,
+        (SELECT (MIN(created_at) AT TIME ZONE 'UTC')::date FROM users),
+        (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date
+    );
+    start_ts := start_date::timestamp AT TIME ZONE 'UTC';
+
+    INSERT INTO daily_stats (stat_date, new_users, new_conversations, messages, active_users, revenue, updated_at)
+    SELECT
+        d.day,
+        COALESCE(u.n, 0),
+        COALESCE(c.n, 0),
+        COALESCE(m.n, 0),
+        COALESCE(m.active, 0),
+        COALESCE(p.amount, 0),
+        CURRENT_TIMESTAMP
+    FROM (
+        SELECT generate_series(start_date, (CURRENT_TIMESTAMP AT TIME ZONE 'UTC')::date, INTERVAL '1 day')::date AS day
+    ) d
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM users
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) u ON u.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS n
+        FROM conversations
+        WHERE created_at >= start_ts
+        GROUP BY 1
+    ) c ON c.day = d.day
+    LEFT JOIN (
+        SELECT (m.created_at AT TIME ZONE 'UTC')::date AS day,
+               COUNT(*) AS n,
+               COUNT(DISTINCT c.user_id) AS active
+        FROM all_messages m
+        JOIN conversations c ON c.conversation_id = m.conversation_id
+        WHERE m.created_at >= start_ts
+        GROUP BY 1
+    ) m ON m.day = d.day
+    LEFT JOIN (
+        SELECT (created_at AT TIME ZONE 'UTC')::date AS day, SUM(amount) AS amount
+        FROM payment_history
+        WHERE created_at >= start_ts AND status = 'succeeded'
+        GROUP BY 1
+    ) p ON p.day = d.day
+    ON CONFLICT (stat_date) DO UPDATE SET
+        new_users = EXCLUDED.new_users,
+        new_conversations = EXCLUDED.new_conversations,
+        messages = EXCLUDED.messages,
+        active_users = EXCLUDED.active_users,
+        revenue = EXCLUDED.revenue,
+        updated_at = EXCLUDED.updated_at;
+END;
+$$ LANGUAGE plpgsql;
+
+-- ============================================
+-- FUNCTIONS: Message partitions and archive
+-- Run periodically by the API (see backend/message_archive.py)
+-- ============================================
+
+-- Create the monthly partitions (messages_YYYY_MM) covering from_ts's month
+-- through months_ahead months past the current one. Returns how many were created.
+CREATE OR REPLACE FUNCTION ensure_messages_partitions(from_ts TIMESTAMP WITH TIME ZONE, months_ahead INTEGER)
+RETURNS INTEGER AS $$
+DECLARE
+    month_start DATE;
+    last_month DATE;
+    partition_name TEXT;
+    range_start TIMESTAMP WITH TIME ZONE;
+    range_end TIMESTAMP WITH TIME ZONE;
+    moving BOOLEAN;
+    created INTEGER := 0;
+BEGIN
+    month_start := date_trunc('month', COALESCE(from_ts, CURRENT_TIMESTAMP) AT TIME ZONE 'UTC')::date;
+    last_month := (date_trunc('month', CURRENT_TIMESTAMP AT TIME ZONE 'UTC') + make_interval(months => months_ahead))::date;
+
+    WHILE month_start <= last_month LOOP
+        partition_name := 'messages_' || to_char(month_start, 'YYYY_MM');
+        IF to_regclass(partition_name) IS NULL THEN
+            range_start := month_start::timestamp AT TIME ZONE 'UTC';
+            range_end := (month_start + INTERVAL '1 month')::timestamp AT TIME ZONE 'UTC';
+
+            -- The new partition cannot be created while messages_default holds
+            -- rows in its range, so set them aside first. They are moved, not
+            -- deleted: delete_message_references() must not run, and inserting
+            -- into the partition directly skips the counter triggers.
+            moving := EXISTS (
+                SELECT 1 FROM messages_default WHERE created_at >= range_start AND created_at < range_end
+            );
+            IF moving THEN
+                CREATE TEMP TABLE messages_moved (LIKE messages) ON COMMIT DROP;
+                ALTER TABLE messages_default DISABLE TRIGGER delete_messages_references;
+                WITH moved AS (
+                    DELETE FROM messages_default
+                    WHERE created_at >= range_start AND created_at < range_end
+                    RETURNING *
+                )
+                INSERT INTO messages_moved SELECT * FROM moved;
+                ALTER TABLE messages_default ENABLE TRIGGER delete_messages_references;
+            END IF;
+
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF messages FOR VALUES FROM (%L) TO (%L)',
+                partition_name, range_start, range_end
+            );
+
+            IF moving THEN
+                EXECUTE format('INSERT INTO %I SELECT * FROM messages_moved', partition_name);
+                DROP TABLE messages_moved;
+            END IF;
+            created := created + 1;
+        END IF;
+        month_start := (month_start + INTERVAL '1 month')::date;
+    END LOOP;
+
+    RETURN created;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Current month plus the next three
+SELECT ensure_messages_partitions(CURRENT_TIMESTAMP, 3);
+
+-- Move the messages of up to batch_size conversations deleted before
+-- archived_before into messages_archive, in this transaction
+CREATE OR REPLACE FUNCTION archive_conversation_messages(archived_before TIMESTAMP WITH TIME ZONE, batch_size INTEGER)
+RETURNS TABLE (archived_conversations INTEGER, archived_messages INTEGER) AS $$
+DECLARE
+    batch UUID[];
+    moved INTEGER;
+BEGIN
+    SELECT array_agg(c.conversation_id) INTO batch
+    FROM (
+        SELECT conversation_id FROM conversations
+        WHERE status = 'archived' AND messages_archived_at IS NULL AND updated_at < archived_before
+        ORDER BY updated_at
+        LIMIT batch_size
+        FOR UPDATE SKIP LOCKED
+    ) c;
+
+    IF batch IS NULL THEN
+        RETURN QUERY SELECT 0, 0;
+        RETURN;
+    END IF;
+
+    INSERT INTO messages_archive (message_id, conversation_id, role, content, sources, attached_documents,
+                                  tokens_used, response_time, feedback, created_at,
+                                  model, model_route, prompt_tokens, completion_tokens, cost_usd)
+    SELECT message_id, conversation_id, role, content, sources, attached_documents,
+           tokens_used, response_time, feedback, created_at,
+           model, model_route, prompt_tokens, completion_tokens, cost_usd
+    FROM messages
+    WHERE conversation_id = ANY(batch)
+    ON CONFLICT (message_id) DO NOTHING;
+
+    DELETE FROM messages WHERE conversation_id = ANY(batch);
+    GET DIAGNOSTICS moved = ROW_COUNT;
+
+    UPDATE conversations SET messages_archived_at = CURRENT_TIMESTAMP
+    WHERE conversation_id = ANY(batch);
+
+    RETURN QUERY SELECT cardinality(batch), moved;
+END;
+$$ LANGUAGE plpgsql;
+
 -- ============================================
 -- VIEWS: Useful queries
 -- ============================================
 
+-- Live and archived messages together, for admin views, exports and rollups
+CREATE VIEW all_messages AS
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at,
+       model, model_route, prompt_tokens, completion_tokens, cost_usd
+FROM messages
+UNION ALL
+SELECT message_id, conversation_id, role, content, sources, attached_documents,
+       tokens_used, response_time, feedback, created_at,
+       model, model_route, prompt_tokens, completion_tokens, cost_usd
+FROM messages_archive;
+
+
 -- Active users with their subscription status
 CREATE VIEW active_users_with_subscriptions AS
 SELECT 
@@ -341,12 +711,10 @@ SELECT
     c.title,
     c.created_at,
     c.last_message_at,
-    COUNT(m.message_id) as total_messages,
-    SUM(CASE WHEN m.role = 'user' THEN 1 ELSE 0 END) as user_messages,
-    SUM(CASE WHEN m.role = 'assistant' THEN 1 ELSE 0 END) as assistant_messages
-FROM conversations c
-LEFT JOIN messages m ON c.conversation_id = m.conversation_id
-GROUP BY c.conversation_id, c.user_id, c.title, c.created_at, c.last_message_at;
+    c.message_count as total_messages,
+    c.user_message_count as user_messages,
+    c.assistant_message_count as assistant_messages
+FROM conversations c;
 
 -- ============================================
 -- COMMENTS
@@ -355,7 +723,8 @@ GROUP BY c.conversation_id, c.user_id, c.title, c.created_at, c.last_message_at;
 COMMENT ON TABLE users IS 'Stores user account information and authentication data';
 COMMENT ON TABLE subscriptions IS 'Manages Stripe subscription plans and usage limits';
 COMMENT ON TABLE conversations IS 'Stores chat conversation sessions between users and AI';
-COMMENT ON TABLE messages IS 'Individual messages within conversations';
+COMMENT ON TABLE messages IS 'Individual messages within conversations, partitioned by month';
+COMMENT ON TABLE messages_archive IS 'Messages of deleted conversations, moved out of the hot partitions';
 COMMENT ON TABLE legal_documents IS 'Admin-uploaded legal knowledge base documents';
 COMMENT ON TABLE legal_document_chunks IS 'Vectorized chunks of legal documents for RAG retrieval';
 COMMENT ON TABLE user_documents IS 'User-uploaded documents for personalized queries';
@@ -363,6 +732,8 @@ COMMENT ON TABLE user_document_chunks IS 'Vectorized chunks of user documents fo
 COMMENT ON TABLE query_analytics IS 'Performance tracking and analytics for RAG queries';
 COMMENT ON TABLE user_feedback IS 'User feedback on AI responses for improvement';
 COMMENT ON TABLE admin_logs IS 'Audit trail of admin actions';
+COMMENT ON TABLE daily_stats IS 'Per-day rollup of users, conversations, messages, active users and revenue';
+COMMENT ON TABLE revoked_tokens IS 'Revoked JWTs (by SHA-256) and per-user revocation cutoffs';
 
 -- ============================================
 -- END OF SCHEMA
@@ -24,13 +24,11 @@ SELECT
     CURRENT_TIMESTAMP + INTERVAL '30 days'
 FROM users WHERE email = 'test@example.se';
 
--- Create sample conversation
-INSERT INTO conversations (user_id, title, message_count, last_message_at)
+-- Create sample conversation (message counts and last_message_at are set by the messages triggers)
+INSERT INTO conversations (user_id, title)
 SELECT 
     user_id,
-    'How does Swedish labor law work?',
-    2,
-    CURRENT_TIMESTAMP
+    'How does Swedish labor law work?'
 FROM users WHERE email = 'test@example.se';
 
 -- Create sample messages
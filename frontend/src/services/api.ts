@@ -35,6 +35,10 @@ export const api = axios.create({
   },
 });
 
+// Time of our last write, as reported by the API - sent back so that reads
+// right after a write are served from the primary database, not a replica
+let readAfter: string | null = null;
+
 // Request interceptor - add auth token
 api.interceptors.request.use(
   async (config) => {
@@ -54,6 +58,9 @@ api.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    if (readAfter) {
+      config.headers["X-Read-After"] = readAfter;
+    }
     return config;
   },
   (error) => {
@@ -63,7 +70,11 @@ api.interceptors.request.use(
 
 // Response interceptor - handle errors & token refresh
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    const writtenAt = response.headers["x-read-after"];
+    if (writtenAt) readAfter = writtenAt;
+    return response;
+  },
   async (error) => {
     const originalRequest = error.config;
 